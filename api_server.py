@@ -4,15 +4,24 @@ Flask API server for video processing.
 Deploy this to Railway/Render instead of running on Vercel.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, request, jsonify
 from flask_cors import CORS
 import subprocess
 import os
 import json
+import math
+import hashlib
+import tempfile
 import uuid
+import heapq
 from pathlib import Path
 import threading
+import time
 import atexit
+import contextlib
+
+from job_store import JobStore
+from transcription_service import WHISPER_MODEL
 
 app = Flask(__name__)
 # Allow Vercel frontend and any origin (for free tier flexibility)
@@ -26,8 +35,41 @@ OUTPUTS_DIR = BASE_DIR / 'outputs'
 UPLOADS_DIR.mkdir(exist_ok=True)
 OUTPUTS_DIR.mkdir(exist_ok=True)
 
-# In-memory job tracking (use Redis in production)
-jobs = {}
+# Job state lives in SQLite so every gunicorn worker (and each pipeline run) sees the same jobs
+job_store = JobStore()
+
+# Job queue (host-wide: every server process claims jobs from job_store)
+MAX_CONCURRENT_JOBS = int(os.environ.get('MAX_CONCURRENT_JOBS', '1'))  # video_to_narrative.py runs at once on this host
+MAX_QUEUED_JOBS = int(os.environ.get('MAX_QUEUED_JOBS', '8'))  # Waiting jobs before uploads get 429
+JOB_DURATION_ESTIMATE = 600  # Seconds per job for queue estimates until real runs have been timed
+JOB_HEARTBEAT_SECONDS = 15  # How often a running job's row is touched while its process runs
+JOB_STALE_SECONDS = 120  # A processing job untouched for this long lost its server (crash, redeploy)
+QUEUE_POLL_SECONDS = 1  # How often idle workers look for jobs queued by other server processes
+PROGRESS_STORE_SECONDS = 1  # Progress reports that only move the percentage reach the job store at most this often
+EVENTS_WATCH_SECONDS = 0.2  # How often a server checks the job store for other processes' writes (while streams are open)
+EVENTS_WATCH_OVERLAP_SECONDS = 1  # Look-back for rows committed just after the previous check
+EVENTS_KEEPALIVE_SECONDS = 15  # Comment sent on idle event streams so proxies keep them open
+# Host-wide concurrency per pipeline stage, enforced by video_to_narrative.py (see stage_slot)
+STAGE_LIMITS = os.environ.get('STAGE_LIMITS', 'transcribe=1')
+
+
+def pipeline_fingerprint():
+    """
+    Identifies what the pipeline makes of a given upload: its code (frame interval
+    policy, models, prompts) and the settings it takes from the environment.
+    Cached results are only reused under the same fingerprint.
+    """
+    digest = hashlib.sha256()
+    for name in ('video_to_narrative.py', 'transcription_service.py'):
+        digest.update((BASE_DIR / name).read_bytes())
+    digest.update(json.dumps({
+        'whisper_model': WHISPER_MODEL,
+        'frame_backend': os.environ.get('FRAME_BACKEND', 'opencv'),
+    }, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+PIPELINE_FINGERPRINT = pipeline_fingerprint()
 
 
 @app.route('/health', methods=['GET'])
@@ -36,14 +78,505 @@ def health():
     return jsonify({'status': 'ok', 'service': 'video-processing-api'})
 
 
+def run_job(job_id, video_path, output_path, resume=False):
+    """Run video_to_narrative.py for a claimed job and wait for it to finish."""
+    try:
+        script_path = BASE_DIR / 'video_to_narrative.py'
+        command = ['python3', str(script_path), str(video_path), '-o', str(output_path)]
+        if resume:
+            command.append('--resume')
+        
+        # Run the Python script (don't capture output so progress prints work)
+        # Use Popen instead of run to allow real-time output
+        # Progress comes back as JSON lines on its own pipe (PROGRESS_FD), apart from the log output
+        progress_read, progress_write = os.pipe()
+        try:
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,  # Line buffered
+                pass_fds=(progress_write,),
+                env={**os.environ, 'STAGE_LIMITS': STAGE_LIMITS, 'PROGRESS_FD': str(progress_write)},
+            )
+        except BaseException:
+            os.close(progress_read)
+            raise
+        finally:
+            os.close(progress_write)  # The child has its copy; EOF arrives when it exits
+        progress_thread = threading.Thread(target=live_progress.read, args=(job_id, progress_read), daemon=True)
+        progress_thread.start()
+        
+        # Stream output for logging (optional, but helpful for debugging)
+        def log_output():
+            # Log EVERYTHING so Render shows what's happening (ffmpeg, whisper, etc.)
+            try:
+                for line in process.stdout:
+                    print(f"[Job {job_id}] {line.rstrip()}", flush=True)
+            except Exception as e:
+                print(f"[Job {job_id}] log_output error: {e}", flush=True)
+        
+        log_thread = threading.Thread(target=log_output, daemon=True)
+        log_thread.start()
+        
+        # Wait for process to complete, storing coalesced progress and touching the
+        # job's row so it isn't taken for orphaned
+        touched = time.time()
+        while True:
+            try:
+                process.wait(timeout=PROGRESS_STORE_SECONDS)
+                break
+            except subprocess.TimeoutExpired:
+                if live_progress.flush(job_id):
+                    touched = time.time()
+                elif time.time() - touched >= JOB_HEARTBEAT_SECONDS:
+                    job_store.update(job_id)
+                    touched = time.time()
+        progress_thread.join(timeout=5)
+        live_progress.finish(job_id)
+        
+        if process.returncode == 0:
+            job_store.update(job_id, state='completed', progress=100, finished=time.time())
+            job_store.record_result(job_id)
+        else:
+            # The script reports its own failures as an 'Error: ...' status
+            status = (job_store.get(job_id) or {}).get('status') or ''
+            error = status[len('Error: '):] if status.startswith('Error: ') else 'Processing failed. Check logs for details.'
+            job_store.update(job_id, state='error', error=error, finished=time.time())
+    except Exception as e:
+        live_progress.finish(job_id)
+        job_store.update(job_id, state='error', error=str(e), finished=time.time())
+
+
+class QueueFull(Exception):
+    """The job queue is at MAX_QUEUED_JOBS; retry_after estimates when a place frees up."""
+    
+    def __init__(self, retry_after):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """
+    FIFO of jobs kept in the job store, run by worker threads that each run one
+    video_to_narrative.py process at a time.
+    
+    Every server process runs `workers` threads, but jobs are claimed through
+    JobStore.claim, which starts one only while fewer than `workers` are
+    processing, so the limit holds for the whole host however many gunicorn
+    workers there are.
+    
+    Start-time estimates assume every job takes the average of recent runs
+    (JOB_DURATION_ESTIMATE until one has finished) and hand each queued job to
+    whichever worker frees up first.
+    """
+    
+    def __init__(self, store, workers, max_queued):
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._next_recovery = 0
+    
+    def start(self):
+        """Start the worker threads (once gunicorn has forked; threads don't survive a fork)."""
+        with self._lock:
+            # A forked process (gunicorn --preload) inherits the parent's list, but none of its threads
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+    
+    def submit(self, job_id, video_path, output_path, resume=False, force=False, content_key=None):
+        """
+        Queue a job and return it. Raises QueueFull if MAX_QUEUED_JOBS are
+        already waiting, unless `force` (used for resumed jobs, which were
+        accepted before).
+        
+        With a content_key the job may instead come back 'completed' (identical
+        result cached) or 'attached' (identical job in flight); see JobStore.create.
+        """
+        job = self.store.create(job_id, video_path, output_path, resume=resume, content_key=content_key,
+                                max_queued=None if force else self.max_queued)
+        if job is None:
+            raise QueueFull(self.retry_after())
+        if job['state'] == 'queued':
+            self.start()
+            self._wake.set()
+        return job
+    
+    def is_full(self):
+        return self.store.count('queued') >= self.max_queued
+    
+    def retry_after(self):
+        # A place frees up when the first queued job starts
+        return max(1, math.ceil(self._free_times()[0] - time.time()))
+    
+    def queued(self, job_id):
+        """
+        (1-based queue position, estimated start in epoch seconds) for a waiting
+        job, or None if it isn't waiting (any more).
+        """
+        waiting = self.store.queued_ids()
+        if job_id not in waiting:
+            return None
+        free = self._free_times()
+        average = self._average_duration()
+        for index, queued_id in enumerate(waiting):
+            start = heapq.heappop(free)
+            if queued_id == job_id:
+                return index + 1, start
+            heapq.heappush(free, start + average)
+    
+    def _average_duration(self):
+        durations = self.store.recent_durations()
+        return sum(durations) / len(durations) if durations else JOB_DURATION_ESTIMATE
+    
+    def _free_times(self):
+        """When each worker is expected to be free, as a heap."""
+        now = time.time()
+        average = self._average_duration()
+        free = [max(now, started + average) for started in self.store.running_since()]
+        free += [now] * (self.workers - len(free))
+        heapq.heapify(free)
+        return free
+    
+    def _work(self):
+        while True:
+            try:
+                with self._lock:
+                    recover = time.time() >= self._next_recovery
+                    if recover:
+                        self._next_recovery = time.time() + JOB_HEARTBEAT_SECONDS
+                if recover:
+                    recover_stale_jobs()
+                job = self.store.claim(self.workers)
+            except Exception as e:
+                print(f"[Queue] Job store error: {e}", flush=True)
+                job = None
+            if job is None:
+                # Other server processes queue jobs too, so poll as well as waiting to be woken
+                self._wake.wait(QUEUE_POLL_SECONDS)
+                self._wake.clear()
+                continue
+            run_job(job['id'], job['video_path'], job['output_path'], bool(job['resume']))
+
+
+job_queue = JobQueue(job_store, MAX_CONCURRENT_JOBS, MAX_QUEUED_JOBS)
+
+
+class JobEvents:
+    """
+    Wakes /api/events streams when the jobs they follow change, instead of each
+    stream polling.
+    
+    Writes through this process's job_store are announced directly (JobStore.on_change).
+    Writes by other processes - pipeline runs reporting progress, other gunicorn
+    workers - are found by one watcher thread per process, which checks SQLite's
+    data_version every EVENTS_WATCH_SECONDS while any stream is open and then
+    reads only the rows updated since its last look.
+    """
+    
+    QUEUE = '*queue'  # Followed by queued jobs: bumped when any job joins, leaves or starts
+    
+    def __init__(self, store):
+        self.store = store
+        self._cond = threading.Condition()
+        self._versions = {}  # key -> change count, for keys with followers
+        self._followers = {}  # key -> open streams following it
+        self._watcher = None
+    
+    def notify(self, job_id, queue_moved=False):
+        with self._cond:
+            changed = False
+            for key in (job_id, self.QUEUE if queue_moved else None):
+                if key in self._followers:
+                    self._versions[key] += 1
+                    changed = True
+            if changed:
+                self._cond.notify_all()
+    
+    def _add(self, key, delta):
+        count = self._followers.get(key, 0) + delta
+        if count > 0:
+            self._followers[key] = count
+            self._versions.setdefault(key, 0)
+        else:
+            self._followers.pop(key, None)
+            self._versions.pop(key, None)
+    
+    @contextlib.contextmanager
+    def follow(self, job_ids):
+        """Follow `job_ids` for the duration of the block; yields a JobFollower."""
+        follower = JobFollower(self, list(job_ids))
+        with self._cond:
+            for key in follower.keys:
+                self._add(key, 1)
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, daemon=True)
+                self._watcher.start()
+        try:
+            yield follower
+        finally:
+            follower.queue(False)
+            with self._cond:
+                for key in follower.keys:
+                    self._add(key, -1)
+    
+    def _watch(self):
+        data_version = None
+        since = time.time()
+        while True:
+            time.sleep(EVENTS_WATCH_SECONDS)
+            with self._cond:
+                if not self._followers:
+                    continue
+            try:
+                current = self.store.data_version()
+                if current == data_version:
+                    continue
+                data_version = current
+                # `updated` is stamped before commit, so look back a little for late commits
+                checked = time.time()
+                for job_id, queue_moved in self.store.changed_since(since - EVENTS_WATCH_OVERLAP_SECONDS):
+                    self.notify(job_id, queue_moved)
+                since = checked
+            except Exception as e:
+                print(f"[Events] Job store watch error: {e}", flush=True)
+
+
+class JobFollower:
+    """One stream's view of JobEvents: wait() for a change to the jobs it follows."""
+    
+    def __init__(self, events, keys):
+        self.events = events
+        self.keys = keys
+        self._queue = False
+    
+    def queue(self, following):
+        """Also wake when the queue moves (while the job is queued)."""
+        if following != self._queue:
+            with self.events._cond:
+                self.events._add(JobEvents.QUEUE, 1 if following else -1)
+            self._queue = following
+    
+    def _version(self):
+        keys = self.keys + ([JobEvents.QUEUE] if self._queue else [])
+        return tuple(self.events._versions.get(key, 0) for key in keys)
+    
+    def version(self):
+        with self.events._cond:
+            return self._version()
+    
+    def wait(self, seen, timeout):
+        """
+        Block until a followed job changes after `seen` (from version() or an
+        earlier wait()) or `timeout` passes; returns the current version.
+        """
+        with self.events._cond:
+            self.events._cond.wait_for(lambda: self._version() != seen, timeout)
+            return self._version()
+
+
+job_events = JobEvents(job_store)
+job_store.on_change = job_events.notify
+
+
+class LiveProgress:
+    """
+    Latest progress of the jobs this server process is running, as their runs
+    report it on the progress channel (see ProgressReporter in video_to_narrative.py).
+    
+    Status reads overlay it on the stored row and this process's event streams
+    are woken on every report. The job store gets a coalesced copy, so other
+    server processes follow along too: at once when the status text changes,
+    otherwise from flush(), which run_job calls every PROGRESS_STORE_SECONDS.
+    """
+    
+    def __init__(self, store, events):
+        self.store = store
+        self.events = events
+        self._lock = threading.Lock()  # Also orders store writes, so an older report never lands last
+        self._jobs = {}  # job_id -> [latest progress columns, whether the store has them]
+    
+    def read(self, job_id, fd):
+        """Consume a job's progress channel until its run closes it."""
+        with os.fdopen(fd, 'r', encoding='utf-8') as channel:
+            for line in channel:
+                try:
+                    self.report(job_id, json.loads(line))
+                except Exception as e:
+                    print(f"[Job {job_id}] Bad progress report ({e}): {line.rstrip()}", flush=True)
+    
+    def report(self, job_id, message):
+        if message.get('type') == 'stage_timings':
+            self.store.add_stage_timings(job_id, message['timings'])
+            return
+        if message.get('type') != 'progress':
+            return
+        chunk_progress = message.get('chunk_progress') or {}
+        fields = {
+            'status': message['status'],
+            'progress': int(message['progress']),
+            'status_index': int(message.get('status_index', 0)),
+            'chunk_current': int(chunk_progress.get('current', 0)),
+            'chunk_total': int(chunk_progress.get('total', 1)),
+        }
+        with self._lock:
+            previous = self._jobs.get(job_id)
+            stored = previous is None or previous[0]['status'] != fields['status']
+            self._jobs[job_id] = [fields, stored]
+            if stored:
+                self.store.update(job_id, **fields)  # Wakes event streams through on_change
+        if not stored:
+            self.events.notify(job_id)
+    
+    def flush(self, job_id):
+        """Store the job's latest progress if the store is behind; True if it wrote."""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None or entry[1]:
+                return False
+            self.store.update(job_id, **entry[0])
+            entry[1] = True
+            return True
+    
+    def finish(self, job_id):
+        """Flush and forget a job whose run has exited."""
+        self.flush(job_id)
+        with self._lock:
+            self._jobs.pop(job_id, None)
+    
+    def overlay(self, job):
+        """`job` with the progress reported since its row was last stored, if this process runs it."""
+        if job['state'] != 'processing':
+            return job
+        with self._lock:
+            entry = self._jobs.get(job['source_job'] or job['id'])
+            return {**job, **entry[0]} if entry else job
+
+
+live_progress = LiveProgress(job_store, job_events)
+
+
+def recover_stale_jobs():
+    """
+    Deal with jobs whose server died while they were processing (crash or redeploy).
+    
+    A processing job whose row hasn't been touched for JOB_STALE_SECONDS has no
+    server waiting on it. If no run holds its checkpoint's lock, it is marked
+    completed when its output was written, re-queued with --resume when its
+    upload is still there, and failed otherwise. The update only applies while
+    the job is still stale, so servers recovering at the same time can't both
+    re-queue it.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    
+    for job in job_store.stale(JOB_STALE_SECONDS):
+        job_id = job['id']
+        output_path = Path(job['output_path'])
+        
+        # A live run holds this lock; if we can take it, nobody is working on the job
+        if fcntl is not None:
+            try:
+                with open(output_path.parent / f"{output_path.stem}_checkpoint.lock", 'a') as job_lock:
+                    fcntl.flock(job_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(job_lock, fcntl.LOCK_UN)
+            except OSError:
+                continue
+        
+        if output_path.exists():
+            if job_store.update_if_stale(job_id, JOB_STALE_SECONDS, state='completed', progress=100,
+                                         finished=time.time()):
+                job_store.record_result(job_id)
+        elif Path(job['video_path']).exists():
+            if job_store.update_if_stale(job_id, JOB_STALE_SECONDS, state='queued', resume=1,
+                                         status=None, progress=0):
+                print(f"[Resume] Resuming orphaned job {job_id}", flush=True)
+                job_queue._wake.set()
+        else:
+            job_store.update_if_stale(job_id, JOB_STALE_SECONDS, state='error',
+                                      error='Processing was interrupted and the upload is gone',
+                                      finished=time.time())
+
+
+def queue_full_response(retry_after):
+    response = jsonify({'error': 'Too many videos are being processed, please retry later',
+                        'retryAfter': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+class HashedUpload:
+    """
+    Where Werkzeug writes an uploaded file while it parses the request body: a
+    .part file in UPLOADS_DIR, hashed as it's written, so the upload is
+    stored (and hashed) once rather than spooled to a temp file and copied.
+    """
+    
+    def __init__(self):
+        fd, self.name = tempfile.mkstemp(dir=UPLOADS_DIR, suffix='.part')
+        self.file = os.fdopen(fd, 'w+b')
+        self.digest = hashlib.sha256()
+        self.kept = False
+    
+    def write(self, data):
+        self.digest.update(data)
+        return self.file.write(data)
+    
+    def keep(self, path: Path) -> str:
+        """Move the upload to `path`, returning its SHA-256."""
+        self.file.flush()
+        os.replace(self.name, path)
+        self.kept = True
+        return self.digest.hexdigest()
+    
+    def close(self):
+        self.file.close()
+        if not self.kept:
+            Path(self.name).unlink(missing_ok=True)
+    
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashedUpload()
+
+
+app.request_class = UploadRequest
+
+
+def save_upload(video_file, path: Path) -> str:
+    """Store an upload (already written to UPLOADS_DIR by HashedUpload) at `path`, returning its SHA-256."""
+    return video_file.stream.keep(path)
+
+
 @app.route('/api/process-video', methods=['POST'])
 def process_video():
     """
     Start video processing.
     Expects multipart/form-data with 'video' file.
-    Returns job_id for status tracking.
+    Returns job_id for status tracking, or 429 with Retry-After when the job queue is full.
+    
+    A video identical to an earlier upload (same content and pipeline fingerprint)
+    isn't processed again: the job completes at once from the cached narrative,
+    or follows the identical job already queued or running.
     """
     try:
+        # Refuse before reading the upload when there's no room
+        if job_queue.is_full():
+            return queue_full_response(job_queue.retry_after())
+        
         if 'video' not in request.files:
             return jsonify({'error': 'No video file provided'}), 400
         
@@ -54,173 +587,89 @@ def process_video():
         # Generate job ID
         job_id = f"job_{uuid.uuid4().hex[:12]}"
         
-        # Save uploaded file
+        # Save uploaded file, hashing it on the way
         video_path = UPLOADS_DIR / f"{job_id}.mp4"
-        video_file.save(str(video_path))
+        content_key = f"{save_upload(video_file, video_path)}-{PIPELINE_FINGERPRINT}"
         
         # Output path
         output_path = OUTPUTS_DIR / f"{job_id}.txt"
         
-        # Initialize job status
-        jobs[job_id] = {
-            'status': 'processing',
-            'progress': 0,
-            'video_path': str(video_path),
-            'output_path': str(output_path),
-        }
+        try:
+            job = job_queue.submit(job_id, video_path, output_path, content_key=content_key)
+        except QueueFull as e:
+            video_path.unlink(missing_ok=True)
+            return queue_full_response(e.retry_after)
         
-        # Start processing in background thread
-        def run_processing():
-            try:
-                script_path = BASE_DIR / 'video_to_narrative.py'
-                
-                # Run the Python script (don't capture output so progress prints work)
-                # Use Popen instead of run to allow real-time output
-                process = subprocess.Popen(
-                    ['python3', str(script_path), str(video_path), '-o', str(output_path)],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,  # Line buffered
-                )
-                
-                # Stream output for logging (optional, but helpful for debugging)
-                import threading
-                def log_output():
-                    # Log EVERYTHING so Render shows what's happening (ffmpeg, whisper, etc.)
-                    try:
-                        for line in process.stdout:
-                            print(f"[Job {job_id}] {line.rstrip()}", flush=True)
-                    except Exception as e:
-                        print(f"[Job {job_id}] log_output error: {e}", flush=True)
-                
-                log_thread = threading.Thread(target=log_output, daemon=True)
-                log_thread.start()
-                
-                # Wait for process to complete
-                # Note: wait() doesn't support timeout in Python < 3.3, so we'll let it run
-                # The timeout is handled by the subprocess.run timeout if needed
-                process.wait()
-                
-                if process.returncode == 0:
-                    jobs[job_id]['status'] = 'completed'
-                    jobs[job_id]['progress'] = 100
-                else:
-                    jobs[job_id]['status'] = 'error'
-                    jobs[job_id]['error'] = 'Processing failed. Check logs for details.'
-            except subprocess.TimeoutExpired:
-                process.kill()
-                jobs[job_id]['status'] = 'error'
-                jobs[job_id]['error'] = 'Processing timed out after 1 hour'
-            except Exception as e:
-                jobs[job_id]['status'] = 'error'
-                jobs[job_id]['error'] = str(e)
-        
-        thread = threading.Thread(target=run_processing)
-        thread.daemon = True
-        thread.start()
+        if job['source_job']:
+            # Served by an identical job, so this copy of the video isn't needed
+            video_path.unlink(missing_ok=True)
+        if job['state'] == 'completed':
+            print(f"[Dedupe] {job_id}: identical to {job['source_job']}, served from the result cache", flush=True)
+            return jsonify({
+                'job_id': job_id,
+                'status': 'completed',
+                'progress': 100,
+                'cached': True,
+                'message': 'Identical video already processed'
+            })
+        if job['source_job']:
+            print(f"[Dedupe] {job_id}: identical to {job['source_job']}, attached to it", flush=True)
         
         return jsonify({
             'job_id': job_id,
-            'status': 'processing',
-            'message': 'Video processing started'
+            'status': 'queued' if job['state'] == 'queued' else 'processing',
+            'queuePosition': (job_queue.queued(job['source_job'] or job_id) or (0,))[0],
+            'message': 'Video queued for processing'
         }), 202
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def job_status(job_id, job):
+    """The /api/status body for a job (also sent by /api/events)."""
+    job = live_progress.overlay(job)
+    # An attached job waits in the place of the job it follows
+    place = job_queue.queued(job['source_job'] or job_id) if job['state'] == 'queued' else None
+    if place is not None:
+        position, estimated_start = place
+        return {
+            'job_id': job_id,
+            'status': 'queued',
+            'progress': 0,
+            'queuePosition': position,
+            'estimatedStartTime': estimated_start,
+            'estimatedStartIn': max(0, round(estimated_start - time.time())),
+        }
+    
+    # While processing, the status is the pipeline's own step text (written by video_to_narrative.py);
+    # it says 'completed' only once the output file has been written
+    status = job['state']
+    if status == 'processing':
+        status = (job['status'] or 'processing').lower()
+    
+    response = {
+        'job_id': job_id,
+        'status': status,
+        'progress': job['progress'],
+        'statusIndex': job['status_index'],
+        'chunkProgress': {'current': job['chunk_current'], 'total': job['chunk_total']},
+    }
+    if job['stage_timings']:
+        response['stageTimings'] = job['stage_timings']
+    if job['error']:
+        response['error'] = job['error']
+    return response
+
+
 @app.route('/api/status/<job_id>', methods=['GET'])
 def get_status(job_id):
     """Get processing status for a job."""
     try:
-        # Check if job exists in memory
-        if job_id not in jobs:
-            # Job not in memory - check if output files exist (might have been restarted)
-            output_path = OUTPUTS_DIR / f"{job_id}.txt"
-            progress_path = OUTPUTS_DIR / f"{job_id}_progress.json"
-            
-            if output_path.exists():
-                # File exists, job is completed
-                return jsonify({
-                    'job_id': job_id,
-                    'status': 'completed',
-                    'progress': 100,
-                })
-            elif progress_path.exists():
-                # Progress file exists, try to read it
-                try:
-                    with open(progress_path, 'r') as f:
-                        progress_data = json.load(f)
-                    return jsonify({
-                        'job_id': job_id,
-                        'status': progress_data.get('status', 'processing'),
-                        'progress': progress_data.get('progress', 0),
-                        'statusIndex': progress_data.get('status_index', 0),
-                        'chunkProgress': progress_data.get('chunk_progress', {'current': 0, 'total': 1}),
-                    })
-                except:
-                    pass
-            
-            # Job not found and no files exist
+        job = job_store.get(job_id)
+        if job is None:
             return jsonify({'error': 'Job not found'}), 404
-        
-        job = jobs[job_id]
-        
-        # Try to read progress from JSON file (written by video processing script)
-        # Replace .txt with _progress.json
-        output_path_obj = Path(job['output_path'])
-        progress_path = output_path_obj.parent / f"{output_path_obj.stem}_progress.json"
-        if progress_path.exists():
-            try:
-                with open(progress_path, 'r') as f:
-                    progress_data = json.load(f)
-                    job['status'] = progress_data.get('status', job['status'])
-                    job['progress'] = progress_data.get('progress', job.get('progress', 0))
-                    job['status_index'] = progress_data.get('status_index', 0)
-                    job['chunk_progress'] = progress_data.get('chunk_progress', {'current': 0, 'total': 1})
-            except json.JSONDecodeError as e:
-                # If JSON is invalid, log but continue with existing status
-                print(f"[Warning] Could not parse progress JSON for {job_id}: {e}")
-            except Exception as e:
-                # If we can't read progress file, continue with existing job status
-                print(f"[Warning] Could not read progress file for {job_id}: {e}")
-    
-        # Check if output file exists (completed)
-        output_path = Path(job['output_path'])
-        if output_path.exists():
-            # If output file exists, mark as completed regardless of current status
-            job['status'] = 'completed'
-            job['progress'] = 100
-        elif job.get('progress', 0) >= 100 and job['status'].lower() in ['completed', 'complete', 'done']:
-            # If progress is 100% and status indicates completion, but file doesn't exist yet
-            # Wait a bit more - file might still be writing
-            job['status'] = 'processing'  # Keep as processing until file exists
-        elif job.get('progress', 0) >= 100:
-            # Progress is 100% but status doesn't indicate completion
-            # Check if file exists one more time
-            if output_path.exists():
-                job['status'] = 'completed'
-            else:
-                # File not ready yet, keep processing
-                job['status'] = 'processing'
-        
-        response = {
-            'job_id': job_id,
-            'status': job['status'].lower() if isinstance(job['status'], str) else job['status'],
-            'progress': job.get('progress', 0),
-        }
-        
-        # Include status index and chunk progress if available
-        if 'status_index' in job:
-            response['statusIndex'] = job['status_index']
-        if 'chunk_progress' in job:
-            response['chunkProgress'] = job['chunk_progress']
-        
-        if 'error' in job:
-            response['error'] = job['error']
-        
-        return jsonify(response)
+        return jsonify(job_status(job_id, job))
     except Exception as e:
         print(f"[Error] Status endpoint error for {job_id}: {e}")
         import traceback
@@ -228,17 +677,135 @@ def get_status(job_id):
         return jsonify({'error': str(e)}), 500
 
 
+def stream_job_events(job_id: str, job_ids: list):
+    """
+    Yield a job's status as Server-Sent Events: a `status` event whenever it
+    changes, until it is completed or failed. Waits on job_events between
+    changes (with a keepalive comment every EVENTS_KEEPALIVE_SECONDS).
+    """
+    sent = None
+    # Queued jobs also wake when the queue moves, so their position stays current
+    with job_events.follow(job_ids) as follow:
+        seen = follow.version()  # Taken before each read, so no change slips between read and wait
+        while True:
+            job = job_store.get(job_id)
+            if job is None:
+                return
+            follow.queue(job['state'] == 'queued')
+            status = job_status(job_id, job)
+            if status != sent:
+                sent = status
+                yield f"event: status\ndata: {json.dumps(status)}\n\n"
+            if job['state'] in ('completed', 'error'):
+                return
+            version = follow.wait(seen, EVENTS_KEEPALIVE_SECONDS)
+            if version == seen:
+                yield ": keepalive\n\n"
+            seen = version
+
+
+@app.route('/api/events/<job_id>', methods=['GET'])
+def get_events(job_id):
+    """
+    Stream a job's status as Server-Sent Events (text/event-stream).
+    
+    Each `status` event carries what /api/status/<job_id> would return, sent as
+    soon as the job's progress, statusIndex, chunkProgress or state changes; the
+    stream ends after the completed or error event. /api/status stays for
+    clients that poll.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    job_ids = [job_id] + ([job['source_job']] if job['source_job'] else [])
+    return Response(stream_job_events(job_id, job_ids), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def partial_result_path(output_path: Path) -> Path:
+    """Where video_to_narrative.py streams the narrative while it is still being written."""
+    return output_path.parent / f"{output_path.stem}_partial.txt"
+
+
+def _whole_chars(data: bytes) -> bytes:
+    """`data` without a trailing UTF-8 sequence the writer hasn't finished yet."""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 != 0x80:  # ASCII or the lead byte of a sequence
+            length = 1 if byte < 0x80 else 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return data if length <= back else data[:-back]
+    return data
+
+
+def stream_partial_result(job_id: str, output_path: Path):
+    """
+    Yield the narrative as Server-Sent Events while it is written: a `text` event
+    with each piece appended to the partial file, and a `reset` event carrying the
+    whole text whenever what was sent so far no longer holds - the partial file
+    starts over on every retry, and the final output can differ slightly after
+    post-processing. The stream ends with the final text and a `done` event.
+    """
+    partial_path = partial_result_path(output_path)
+    sent = b''  # Everything sent so far, to tell appends from rewrites
+    while True:
+        final = output_path.exists()
+        try:
+            with open(output_path if final else partial_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            data = None  # Not written yet, or removed once the output appeared
+        if data is not None:
+            data = data if final else _whole_chars(data)
+            if data.startswith(sent):
+                if len(data) > len(sent):
+                    yield f"event: text\ndata: {json.dumps(data[len(sent):].decode('utf-8', errors='replace'))}\n\n"
+            else:
+                yield f"event: reset\ndata: {json.dumps(data.decode('utf-8', errors='replace'))}\n\n"
+            sent = data
+        if final:
+            yield "event: done\ndata: {}\n\n"
+            return
+        if (job_store.get(job_id) or {}).get('state') == 'error':
+            return
+        time.sleep(0.5)
+
+
 @app.route('/api/result/<job_id>', methods=['GET'])
 def get_result(job_id):
-    """Get the processed narrative result."""
-    if job_id not in jobs:
+    """
+    Get the processed narrative result.
+    
+    While the narrative is still being generated, returns the text streamed so far
+    with status 'partial'; with ?stream=1 the response is an event stream (see
+    stream_partial_result) that lasts until the narrative is finished.
+    """
+    job = job_store.get(job_id)
+    if job is None:
         return jsonify({'error': 'Job not found'}), 404
     
-    job = jobs[job_id]
     output_path = Path(job['output_path'])
     
     if not output_path.exists():
-        return jsonify({'error': 'Result not ready yet'}), 404
+        partial_path = partial_result_path(output_path)
+        if not partial_path.exists():
+            return jsonify({'error': 'Result not ready yet'}), 404
+        if request.args.get('stream') in ('1', 'true'):
+            return Response(stream_partial_result(job_id, output_path), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        try:
+            with open(partial_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            # Finished (and cleaned up) between the two checks
+            return get_result(job_id)
+        # The writer may be in the middle of a character
+        narrative = _whole_chars(data).decode('utf-8', errors='replace')
+        return jsonify({
+            'job_id': job_id,
+            'narrative': narrative,
+            'status': 'partial',
+            'partial': True,
+        })
     
     try:
         with open(output_path, 'r', encoding='utf-8') as f:
@@ -253,6 +820,10 @@ def get_result(job_id):
         return jsonify({'error': str(e)}), 500
 
 
+# Pick up jobs left queued (or orphaned) by a previous server
+job_queue.start()
+
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
     app.run(host='0.0.0.0', port=port, debug=False)
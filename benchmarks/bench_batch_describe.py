@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-frame vs batched vision requests against a local mock of the
+chat-completions endpoint.
+
+The mock counts requests and prompt tokens (text ~4 chars/token plus a fixed
+cost per image), sleeps for a simulated latency (per-request overhead plus a
+per-token cost) and answers with one "[n] sentence" line per image.
+
+For each batch size, 100 synthetic frames are described sequentially with
+describe_frames_batch and the script reports requests, prompt tokens and wall
+time per 100 frames.
+
+Usage:
+    python3 benchmarks/bench_batch_describe.py
+    python3 benchmarks/bench_batch_describe.py --batch-sizes 1 4 8 --overhead 0.4 --malformed 0.1
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import cv2
+import numpy as np
+from openai import OpenAI
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+FRAMES = 100
+
+
+class MockStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.prompt_tokens = 0
+
+
+def make_handler(stats: MockStats, args):
+    rng = random.Random(0)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            images = 0
+            text_chars = 0
+            for message in body['messages']:
+                content = message['content']
+                if isinstance(content, str):
+                    text_chars += len(content)
+                    continue
+                for part in content:
+                    if part['type'] == 'image_url':
+                        images += 1
+                    else:
+                        text_chars += len(part['text'])
+            prompt_tokens = text_chars // 4 + images * args.image_tokens
+            with stats.lock:
+                stats.requests += 1
+                stats.prompt_tokens += prompt_tokens
+
+            time.sleep(args.overhead + prompt_tokens * args.per_token)
+
+            if images == 1:
+                content = 'A person walks across the room.'
+            else:
+                lines = [f'[{i + 1}] A person walks across the room.' for i in range(images)]
+                if rng.random() < args.malformed:
+                    lines.pop(rng.randrange(len(lines)))  # Drop one entry to exercise the fallback
+                content = '\n'.join(lines)
+            payload = json.dumps({
+                'id': 'mock', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': 12 * images,
+                          'total_tokens': prompt_tokens + 12 * images},
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def synthetic_frames(count: int) -> list[tuple[int, bytes]]:
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(count):
+        image = rng.integers(0, 255, (360, 640, 3), dtype=np.uint8)
+        _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        frames.append((i * 3, buffer.tobytes()))
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--overhead', type=float, default=0.3, help='Simulated per-request latency in seconds')
+    parser.add_argument('--per-token', type=float, default=0.00005, help='Simulated latency per prompt token')
+    parser.add_argument('--image-tokens', type=int, default=255, help='Prompt tokens charged per image')
+    parser.add_argument('--malformed', type=float, default=0.0, help='Probability a batched reply drops an entry')
+    args = parser.parse_args()
+
+    stats = MockStats()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(stats, args))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = OpenAI(api_key='mock', base_url=f'http://127.0.0.1:{server.server_port}/v1', max_retries=0)
+
+    frames = synthetic_frames(FRAMES)
+    rows = []
+    try:
+        for batch_size in args.batch_sizes:
+            stats.reset()
+            start = time.perf_counter()
+            described = 0
+            for i in range(0, len(frames), batch_size):
+                described += len(vtn.describe_frames_batch(client, frames[i:i + batch_size]))
+            elapsed = time.perf_counter() - start
+            scale = 100.0 / described
+            rows.append((batch_size, stats.requests * scale, stats.prompt_tokens * scale, elapsed * scale))
+    finally:
+        server.shutdown()
+
+    print()
+    print(f"Per 100 frames (mock: {args.overhead:.2f}s/request overhead, {args.image_tokens} tokens/image, "
+          f"{args.malformed:.0%} malformed batches)")
+    print(f"{'batch':>6} {'requests':>9} {'prompt tokens':>14} {'wall s':>8}")
+    print('-' * 40)
+    for batch_size, requests, prompt_tokens, elapsed in rows:
+        print(f"{batch_size:>6} {requests:>9.0f} {prompt_tokens:>14.0f} {elapsed:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: frame sampling strategies vs the old seek-per-frame loop.
+
+Generates synthetic videos of several lengths and GOP sizes, then times
+extract_frames_for_chunk with the legacy "seek" strategy against "auto"
+(and the forced strategies) and reports sampled frames per second.
+
+Usage:
+    python3 benchmarks/bench_frame_sampler.py
+    python3 benchmarks/bench_frame_sampler.py --lengths 60 600 --gops 12 250 --interval 3.33
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+FPS = 24
+SIZE = (640, 360)
+
+
+def make_video(path: str, seconds: int, gop: int) -> str:
+    """Write a synthetic video with the given GOP (gop=1 means intra-only)."""
+    if shutil.which('ffmpeg'):
+        codec = ['-c:v', 'mjpeg', '-q:v', '5'] if gop == 1 else \
+                ['-c:v', 'libx264', '-preset', 'ultrafast', '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0']
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi',
+             '-i', f'testsrc2=size={SIZE[0]}x{SIZE[1]}:rate={FPS}:duration={seconds}',
+             *codec, '-pix_fmt', 'yuvj420p' if gop == 1 else 'yuv420p', path],
+            check=True,
+        )
+        return path
+
+    # No ffmpeg binary - fall back to OpenCV's bundled encoder
+    if gop == 1:
+        path = str(Path(path).with_suffix('.avi'))
+        writer = cv2.VideoWriter(path, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*'MJPG'), FPS, SIZE)
+    else:
+        writer = cv2.VideoWriter(path, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*'mp4v'), FPS, SIZE,
+                                 [cv2.VIDEOWRITER_PROP_KEY_INTERVAL, gop])
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (SIZE[1], SIZE[0], 3), dtype=np.uint8)
+    for i in range(seconds * FPS):
+        frame = np.roll(base, i * 4, axis=1)
+        cv2.putText(frame, str(i), (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def time_strategy(path: str, duration: float, interval: float, strategy: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    frames = list(vtn.extract_frames_for_chunk(path, 0, duration, FPS, interval, strategy=strategy))
+    return time.perf_counter() - start, len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lengths', type=int, nargs='+', default=[60, 300, 900], help='Video lengths in seconds')
+    parser.add_argument('--gops', type=int, nargs='+', default=[1, 12, 48, 250], help='GOP sizes in frames (1 = intra-only)')
+    parser.add_argument('--interval', type=float, default=10.0 / 3.0, help='Sampling interval in seconds')
+    parser.add_argument('--strategies', nargs='+', default=['seek', 'auto', 'grab', 'keyframe'])
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='bench_sampler_')
+    rows = []
+    try:
+        for seconds in args.lengths:
+            for gop in args.gops:
+                path = make_video(os.path.join(tmp_dir, f'synthetic_{seconds}s_gop{gop}.mp4'), seconds, gop)
+                keyframes = vtn.probe_keyframes(path, FPS)
+                picked = vtn.choose_sampling_strategy(FPS, args.interval, keyframes, seconds * FPS)
+                baseline = None
+                for strategy in args.strategies:
+                    elapsed, count = time_strategy(path, seconds, args.interval, strategy)
+                    fps = count / elapsed if elapsed > 0 else float('inf')
+                    if strategy == 'seek':
+                        baseline = fps
+                    rows.append((seconds, gop, strategy if strategy != 'auto' else f'auto->{picked}',
+                                 count, elapsed, fps, fps / baseline if baseline else None))
+                os.remove(path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print()
+    print(f"{'length':>7} {'gop':>5} {'strategy':<16} {'frames':>7} {'seconds':>8} {'frames/s':>9} {'vs seek':>8}")
+    print('-' * 66)
+    for seconds, gop, strategy, count, elapsed, fps, speedup in rows:
+        ratio = f'{speedup:.2f}x' if speedup else '-'
+        print(f'{seconds:>6}s {gop:>5} {strategy:<16} {count:>7} {elapsed:>8.2f} {fps:>9.1f} {ratio:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: list-based frame extraction vs the bounded streaming pipeline.
+
+Both paths run the same decode (extract_frames_for_chunk) and the same mock
+describe stage (base64-encode the JPEG, then sleep for the simulated API
+latency). Reported per path:
+
+- peak Python memory (tracemalloc, includes numpy/OpenCV buffers)
+- time until the first description comes back
+- total wall time
+
+Usage:
+    python3 benchmarks/bench_frame_streaming.py
+    python3 benchmarks/bench_frame_streaming.py --seconds 600 --width 1920 --height 1080 --latency 0.3
+"""
+
+import argparse
+import base64
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+FPS = 24
+
+
+def make_video(path: str, seconds: int, size: tuple[int, int]) -> str:
+    """Write a synthetic noisy video (noise keeps the JPEGs realistically large)."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), FPS, size)
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+    for i in range(seconds * FPS):
+        writer.write(np.roll(base, i * 4, axis=1))
+    writer.release()
+    return path
+
+
+def mock_describe(frame_bytes: bytes, latency: float) -> str:
+    payload = base64.b64encode(frame_bytes).decode('utf-8')  # Same copy describe_frame makes
+    time.sleep(latency)
+    return f"A frame of {len(payload)} base64 bytes."
+
+
+def run_list(path: str, seconds: int, interval: float, latency: float) -> tuple[float, float]:
+    start = time.perf_counter()
+    frames = list(vtn.extract_frames_for_chunk(path, 0, seconds, FPS, interval))
+    first = None
+    for timestamp, frame_bytes in frames:
+        mock_describe(frame_bytes, latency)
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def run_stream(path: str, seconds: int, interval: float, latency: float) -> tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    for timestamp, frame_bytes in vtn.prefetch_frames(vtn.extract_frames_for_chunk(path, 0, seconds, FPS, interval)):
+        mock_describe(frame_bytes, latency)
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def measure(fn, *args) -> tuple[float, float, float]:
+    tracemalloc.start()
+    first, total = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024, first, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=int, default=300, help='Synthetic video length in seconds')
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--interval', type=float, default=10.0 / 3.0, help='Sampling interval in seconds')
+    parser.add_argument('--latency', type=float, default=0.2, help='Simulated describe_frame latency in seconds')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='bench_stream_')
+    try:
+        path = make_video(os.path.join(tmp_dir, 'synthetic.mp4'), args.seconds, (args.width, args.height))
+        results = [
+            ('list', measure(run_list, path, args.seconds, args.interval, args.latency)),
+            ('stream', measure(run_stream, path, args.seconds, args.interval, args.latency)),
+        ]
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print()
+    print(f"{args.seconds}s {args.width}x{args.height} video, 1 frame / {args.interval:.2f}s, "
+          f"{args.latency:.2f}s simulated latency, queue size {vtn.FRAME_QUEUE_SIZE}")
+    print(f"{'path':<8} {'peak MB':>9} {'first desc s':>13} {'total s':>9}")
+    print('-' * 42)
+    for name, (peak, first, total) in results:
+        print(f"{name:<8} {peak:>9.1f} {first:>13.2f} {total:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
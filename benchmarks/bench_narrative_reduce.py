@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serial chunk narratives + one combine call vs parallel chunk
+narratives + tree-reduce combining, against a local mock of the
+chat-completions endpoint.
+
+The mock sleeps for a simulated latency (per-request overhead plus a cost per
+completion token, since narrative calls are dominated by generation) and
+answers with a ~600 character narrative. It tracks the largest prompt it saw,
+which bounds the size of any single combine call.
+
+Usage:
+    python3 benchmarks/bench_narrative_reduce.py
+    python3 benchmarks/bench_narrative_reduce.py --chunks 10 40 --concurrency 8 --group-size 4
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from openai import OpenAI
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+NARRATIVE = ('Someone walks slowly across the room, pausing by the window as the light '
+             'shifts across the floor. ') * 6
+
+
+class MockStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.max_prompt_chars = 0
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.max_prompt_chars = 0
+
+
+def make_handler(stats: MockStats, args):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            prompt_chars = sum(len(message['content']) for message in body['messages'])
+            with stats.lock:
+                stats.requests += 1
+                stats.max_prompt_chars = max(stats.max_prompt_chars, prompt_chars)
+
+            time.sleep(args.overhead + len(NARRATIVE) / 4 * args.per_token)
+
+            payload = json.dumps({
+                'id': 'mock', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': NARRATIVE},
+                             'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': prompt_chars // 4, 'completion_tokens': len(NARRATIVE) // 4,
+                          'total_tokens': (prompt_chars + len(NARRATIVE)) // 4},
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def synthetic_chunks(count: int) -> list[tuple[list[tuple[int, str]], list[str]]]:
+    return [([(c * 180 + i * 10, 'A person walks across the room.') for i in range(18)],
+             ['We should leave before it gets dark.'])
+            for c in range(count)]
+
+
+def run_serial(client: OpenAI, chunks) -> str:
+    narratives = [vtn.create_chunk_narrative(client, descs, i + 1, dialogue)
+                  for i, (descs, dialogue) in enumerate(chunks)]
+    return vtn.combine_narratives(client, narratives)
+
+
+def run_parallel(client: OpenAI, chunks, concurrency: int, group_size: int) -> str:
+    narratives = vtn.create_chunk_narratives(client, chunks, concurrency)
+    return vtn.reduce_narratives(client, narratives, group_size, concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunks', type=int, nargs='+', default=[4, 16, 40])
+    parser.add_argument('--concurrency', type=int, default=vtn.NARRATIVE_CONCURRENCY)
+    parser.add_argument('--group-size', type=int, default=vtn.COMBINE_GROUP_SIZE)
+    parser.add_argument('--overhead', type=float, default=0.2, help='Simulated per-request latency in seconds')
+    parser.add_argument('--per-token', type=float, default=0.002, help='Simulated latency per completion token')
+    args = parser.parse_args()
+
+    stats = MockStats()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(stats, args))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = OpenAI(api_key='mock', base_url=f'http://127.0.0.1:{server.server_port}/v1', max_retries=0)
+
+    rows = []
+    try:
+        for count in args.chunks:
+            chunks = synthetic_chunks(count)
+            for mode in ('serial', 'tree'):
+                stats.reset()
+                start = time.perf_counter()
+                if mode == 'serial':
+                    run_serial(client, chunks)
+                else:
+                    run_parallel(client, chunks, args.concurrency, args.group_size)
+                rows.append((count, mode, stats.requests, stats.max_prompt_chars // 4,
+                             time.perf_counter() - start))
+    finally:
+        server.shutdown()
+
+    print()
+    print(f"Mock: {args.overhead:.2f}s/request + {args.per_token * 1000:.1f}ms/completion token; "
+          f"tree = {args.concurrency} in flight, groups of {args.group_size}")
+    print(f"{'chunks':>7} {'mode':<7} {'requests':>9} {'max prompt tok':>15} {'wall s':>8}")
+    print('-' * 50)
+    for count, mode, requests, max_prompt, elapsed in rows:
+        print(f"{count:>7} {mode:<7} {requests:>9} {max_prompt:>15} {elapsed:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
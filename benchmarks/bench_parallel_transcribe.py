@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Whisper real-time factor against worker count for segmented
+transcription.
+
+Decodes the soundtrack of a media file once, then transcribes it with one
+whole-file Whisper call (the old path) and with split_windows + a process pool
+of each requested size. Each pool has its models loaded before the clock
+starts, and the CPU's threads are shared equally between its workers. Real-time
+factor is transcription seconds per second of audio (lower is faster);
+"agreement" is the word-level similarity of each transcript to the whole-file
+one, to show what the splits cost in accuracy.
+
+Needs openai-whisper and a file with speech in it.
+
+Usage:
+    python3 benchmarks/bench_parallel_transcribe.py movie.mp4
+    python3 benchmarks/bench_parallel_transcribe.py movie.mp4 --workers 1 2 4 8 --model base --seconds 1200
+"""
+
+import argparse
+import difflib
+import os
+import sys
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import transcription_service as ts  # noqa: E402
+import video_to_narrative as vtn  # noqa: E402
+
+
+def warm_pool(workers: int, model: str, threads: int):
+    pool = get_context('spawn').Pool(workers, initializer=ts._init_worker, initargs=(model, threads))
+    errors = [e for e in pool.map(ts._ping, range(workers), chunksize=1) if e]
+    if errors:
+        pool.terminate()
+        raise RuntimeError(f"Whisper failed to load: {errors[0]}")
+    return pool
+
+
+def agreement(reference: list[tuple[float, float, str]], segments: list[tuple[float, float, str]]) -> float:
+    words = lambda segs: ' '.join(text for _, _, text in segs).lower().split()  # noqa: E731
+    return difflib.SequenceMatcher(None, words(reference), words(segments), autojunk=False).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('media', help='Video or audio file with speech')
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, os.cpu_count() or 1])
+    parser.add_argument('--model', default=ts.WHISPER_MODEL)
+    parser.add_argument('--seconds', type=float, help='Only use the first N seconds of audio')
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    samples = vtn.load_audio(args.media)
+    if args.seconds:
+        samples = samples[:int(args.seconds * ts.SAMPLE_RATE)]
+    audio_seconds = len(samples) / ts.SAMPLE_RATE
+    print(f"{audio_seconds:.0f}s of audio, Whisper '{args.model}', {cores} cores")
+
+    rows = []
+    reference = None
+    for workers in [1] + sorted(set(w for w in args.workers if w > 1)):
+        pool = warm_pool(workers, args.model, max(1, cores // workers))
+        try:
+            start = time.perf_counter()
+            if workers == 1:
+                segments = pool.apply(ts._transcribe_in_worker, (samples,))
+                reference = segments
+                windows = 1
+            else:
+                segments = ts.transcribe_segmented(pool, samples, workers)
+                windows = len(ts.split_windows(samples, workers))
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.terminate()
+        rows.append((workers, windows, len(segments), elapsed, agreement(reference, segments)))
+        print(f"  {workers} worker(s): {elapsed:.1f}s", flush=True)
+
+    baseline = rows[0][3]
+    print()
+    print(f"{'workers':>8} {'threads':>8} {'windows':>8} {'segments':>9} {'seconds':>8} {'RTF':>7} {'speedup':>8} {'agreement':>10}")
+    print('-' * 74)
+    for workers, windows, count, elapsed, similar in rows:
+        print(f"{workers:>8} {max(1, cores // workers):>8} {windows:>8} {count:>9} {elapsed:>8.1f} "
+              f"{elapsed / audio_seconds:>7.3f} {baseline / elapsed:>7.2f}x {similar:>9.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Report: bytes uploaded and image tokens per frame, before and after payload shaping.
+
+"Before" is the old encode path (native resolution, JPEG quality 85, default
+detail, which bills like high detail); "after" is the current VISION_MAX_EDGE /
+VISION_JPEG_QUALITY / VISION_IMAGE_DETAIL settings. Frames come from a real
+video if one is given, otherwise from synthetic 1080p and 4K frames.
+
+Usage:
+    python3 benchmarks/bench_vision_payload.py
+    python3 benchmarks/bench_vision_payload.py movie.mp4 --max-edge 768 --quality 75 --detail low
+"""
+
+import argparse
+import base64
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+
+def sample_frames(video_path: str | None, count: int) -> list[tuple[str, np.ndarray]]:
+    if video_path:
+        fps, total_frames, duration = vtn.get_video_info(video_path)
+        cap = cv2.VideoCapture(video_path)
+        frames = []
+        for i in range(count):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(total_frames * (i + 0.5) / count))
+            ret, frame = cap.read()
+            if ret:
+                frames.append((f'{frame.shape[1]}x{frame.shape[0]}', frame))
+        cap.release()
+        return frames
+
+    rng = np.random.default_rng(0)
+    frames = []
+    for width, height in [(1920, 1080), (3840, 2160)]:
+        # Smooth gradient plus mild noise compresses roughly like camera footage
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        base = np.stack([x + 0 * y, (x + y) / 2, y + 0 * x], axis=-1)
+        for _ in range(count // 2 or 1):
+            noise = rng.normal(0, 12, base.shape).astype(np.float32)
+            frames.append((f'{width}x{height}', np.clip(base + noise, 0, 255).astype(np.uint8)))
+    return frames
+
+
+def measure(frames: list[tuple[str, np.ndarray]], max_edge: int, quality: int, detail: str) -> dict:
+    vtn.VISION_MAX_EDGE, vtn.VISION_JPEG_QUALITY, vtn.VISION_IMAGE_DETAIL = max_edge, quality, detail
+    per_resolution = {}
+    for label, frame in frames:
+        start = time.perf_counter()
+        jpeg = vtn._encode_jpeg(frame)
+        payload = len(base64.b64encode(jpeg))
+        encode_ms = (time.perf_counter() - start) * 1000
+        width, height = vtn._jpeg_size(jpeg)
+        tokens = vtn.estimate_image_tokens(width, height, 'high' if detail == 'auto' else detail)
+        stats = per_resolution.setdefault(label, {'n': 0, 'bytes': 0, 'tokens': 0, 'ms': 0.0, 'out': f'{width}x{height}'})
+        stats['n'] += 1
+        stats['bytes'] += payload
+        stats['tokens'] += tokens
+        stats['ms'] += encode_ms
+    return per_resolution
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video', nargs='?', help='Optional video to sample frames from')
+    parser.add_argument('--frames', type=int, default=10)
+    parser.add_argument('--max-edge', type=int, default=vtn.VISION_MAX_EDGE)
+    parser.add_argument('--quality', type=int, default=vtn.VISION_JPEG_QUALITY)
+    parser.add_argument('--detail', default=vtn.VISION_IMAGE_DETAIL, choices=['low', 'high', 'auto'])
+    args = parser.parse_args()
+
+    frames = sample_frames(args.video, args.frames)
+    before = measure(frames, 0, 85, 'auto')
+    after = measure(frames, args.max_edge, args.quality, args.detail)
+
+    print()
+    print(f"{'source':>10} {'setting':<28} {'sent as':>10} {'KB/frame':>9} {'tokens/frame':>13} {'encode ms':>10}")
+    print('-' * 86)
+    for label in before:
+        for name, result in (('before (native, q85, auto)', before), 
+                             (f'after ({args.max_edge or "native"}px, q{args.quality}, {args.detail})', after)):
+            stats = result[label]
+            n = stats['n']
+            print(f"{label:>10} {name:<28} {stats['out']:>10} {stats['bytes'] / n / 1024:>9.1f} "
+                  f"{stats['tokens'] / n:>13.0f} {stats['ms'] / n:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
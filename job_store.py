@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Persistent job store shared by every API server process.
+
+One SQLite table in WAL mode (readers never block the writer, and every gunicorn
+worker opens the same file) holds each job's state, progress, stage timings and
+error. api_server.py queues and claims jobs through it and stores the progress
+its runs report, so a status request is one indexed row read.
+
+States: queued -> processing -> completed | error. A job whose upload is
+identical to one already in flight is 'attached' to it (source_job) and reports
+that job's state instead of running again.
+
+A second table indexes finished narratives by content key (upload hash plus
+pipeline fingerprint, see api_server.py), so an identical upload completes
+from the cached result.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+JOB_STORE_PATH = os.environ.get("JOB_STORE_PATH", str(Path(__file__).parent / 'outputs' / 'jobs.sqlite'))
+
+_COLUMNS = ('id', 'state', 'status', 'progress', 'status_index', 'chunk_current', 'chunk_total',
+            'video_path', 'output_path', 'resume', 'error', 'stage_timings',
+            'created', 'started', 'finished', 'updated', 'content_key', 'source_job')
+
+# Columns an attached job reports from the job doing the work
+_SHARED_COLUMNS = ('state', 'status', 'progress', 'status_index', 'chunk_current', 'chunk_total',
+                   'error', 'stage_timings', 'started', 'finished')
+
+
+class JobStore:
+    """
+    SQLite-backed job table. One connection per instance, shared across threads
+    behind a lock; separate processes each open their own instance.
+
+    on_change, if set, is called as on_change(job_id, queue_moved) after every
+    write made through this instance; queue_moved is True when the job entered
+    or left a state other than processing (which can shift queue positions).
+    Other processes' writes are found with data_version() and changed_since().
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or JOB_STORE_PATH
+        self.on_change = None
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit; claim() opens its own write transaction
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, state TEXT NOT NULL, status TEXT,"
+            " progress INTEGER NOT NULL DEFAULT 0, status_index INTEGER NOT NULL DEFAULT 0,"
+            " chunk_current INTEGER NOT NULL DEFAULT 0, chunk_total INTEGER NOT NULL DEFAULT 1,"
+            " video_path TEXT NOT NULL, output_path TEXT NOT NULL, resume INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT, stage_timings TEXT,"
+            " created REAL NOT NULL, started REAL, finished REAL, updated REAL NOT NULL,"
+            " content_key TEXT, source_job TEXT)"
+        )
+        # Stores created before upload dedupe lack its columns
+        existing = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column in ('content_key', 'source_job'):
+            if column not in existing:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_content ON jobs (content_key, state)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " content_key TEXT PRIMARY KEY, job_id TEXT NOT NULL, output_path TEXT NOT NULL, created REAL NOT NULL)"
+        )
+
+    def _row(self, row) -> dict | None:
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        job['stage_timings'] = json.loads(job['stage_timings']) if job['stage_timings'] else {}
+        return job
+
+    def _changed(self, job_id: str, queue_moved: bool = False):
+        if self.on_change is not None:
+            self.on_change(job_id, queue_moved)
+
+    def create(self, job_id: str, video_path: str, output_path: str, resume: bool = False,
+               content_key: str = None, max_queued: int = None) -> dict | None:
+        """
+        Add a queued job (or re-queue an existing one from scratch).
+
+        With a content_key, an identical job is reused when there is one: the
+        new job is created 'completed' on the cached result, or 'attached' to
+        the identical job still queued or processing. Lookup and insert are one
+        transaction, so identical uploads arriving together start one run.
+
+        Returns:
+            The new job, or None if it would have had to queue behind
+            `max_queued` waiting jobs
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                job = self._create(job_id, str(video_path), str(output_path), resume, content_key, max_queued, now)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if job is not None:
+            self._changed(job_id, True)
+        return job
+
+    def _create(self, job_id, video_path, output_path, resume, content_key, max_queued, now):
+        if content_key:
+            cached = self._db.execute("SELECT job_id, output_path FROM results WHERE content_key = ?",
+                                      (content_key,)).fetchone()
+            if cached and os.path.exists(cached[1]):
+                self._db.execute(
+                    "INSERT OR REPLACE INTO jobs (id, state, status, progress, status_index, video_path, output_path,"
+                    " created, finished, updated, content_key, source_job)"
+                    " VALUES (?, 'completed', 'completed', 100, 4, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, video_path, cached[1], now, now, now, content_key, cached[0]))
+                return self._get(job_id)
+            if cached:
+                self._db.execute("DELETE FROM results WHERE content_key = ?", (content_key,))
+            running = self._db.execute(
+                "SELECT id, video_path, output_path FROM jobs"
+                " WHERE content_key = ? AND state IN ('queued', 'processing') ORDER BY created LIMIT 1",
+                (content_key,)).fetchone()
+            if running:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO jobs (id, state, video_path, output_path, created, updated,"
+                    " content_key, source_job) VALUES (?, 'attached', ?, ?, ?, ?, ?, ?)",
+                    (job_id, running[1], running[2], now, now, content_key, running[0]))
+                return self._get(job_id)
+        if max_queued is not None:
+            waiting = self._db.execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+            if waiting >= max_queued:
+                return None
+        self._db.execute(
+            "INSERT OR REPLACE INTO jobs (id, state, video_path, output_path, resume, created, updated, content_key)"
+            " VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)",
+            (job_id, video_path, output_path, int(resume), now, now, content_key))
+        return self._get(job_id)
+
+    def _get(self, job_id):
+        job = self._row(self._db.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone())
+        if job and job['state'] == 'attached':
+            source = self._get(job['source_job'])
+            if source:
+                job.update({name: source[name] for name in _SHARED_COLUMNS})
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        """A job by id; an attached job reports the state and progress of the job it is attached to."""
+        with self._lock:
+            return self._get(job_id)
+
+    def record_result(self, job_id: str):
+        """Index a completed job's output under its content key, for identical uploads to reuse."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (content_key, job_id, output_path, created)"
+                " SELECT content_key, id, output_path, ? FROM jobs WHERE id = ? AND content_key IS NOT NULL",
+                (time.time(), job_id))
+
+    def update(self, job_id: str, **fields):
+        """Set columns on a job; `updated` is bumped (it doubles as the heartbeat)."""
+        fields['updated'] = time.time()
+        if 'stage_timings' in fields:
+            fields['stage_timings'] = json.dumps(fields['stage_timings'])
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                             (*fields.values(), job_id))
+        self._changed(job_id, 'state' in fields)
+
+    def update_if_stale(self, job_id: str, older_than: float, **fields) -> bool:
+        """
+        update() a processing job only if it is still stale (see stale()), so two
+        processes recovering the same job can't both act on it.
+        """
+        now = time.time()
+        fields['updated'] = now
+        with self._lock:
+            cursor = self._db.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)}"
+                " WHERE id = ? AND state = 'processing' AND updated < ?",
+                (*fields.values(), job_id, now - older_than))
+        if cursor.rowcount == 1:
+            self._changed(job_id, True)
+        return cursor.rowcount == 1
+
+    def add_stage_timings(self, job_id: str, timings: dict):
+        """Merge {stage: seconds} into the job's stage timings."""
+        with self._lock:
+            row = self._db.execute("SELECT stage_timings FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            merged = {**(json.loads(row[0]) if row[0] else {}), **timings}
+            self._db.execute("UPDATE jobs SET stage_timings = ?, updated = ? WHERE id = ?",
+                             (json.dumps(merged), time.time(), job_id))
+        self._changed(job_id)
+
+    def claim(self, max_running: int) -> dict | None:
+        """
+        Atomically move the oldest queued job to processing, unless `max_running`
+        jobs are already processing (across every process using the store).
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                running = self._db.execute("SELECT COUNT(*) FROM jobs WHERE state = 'processing'").fetchone()[0]
+                row = None
+                if running < max_running:
+                    row = self._db.execute(
+                        "UPDATE jobs SET state = 'processing', started = ?, updated = ?"
+                        " WHERE id = (SELECT id FROM jobs WHERE state = 'queued' ORDER BY created, id LIMIT 1)"
+                        f" RETURNING {', '.join(_COLUMNS)}", (now, now)).fetchone()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if row is not None:
+            self._changed(row[0], True)
+        return self._row(row)
+
+    def count(self, state: str) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (state,)).fetchone()[0]
+
+    def queued_ids(self) -> list[str]:
+        """Queued job ids in the order they will be claimed."""
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT id FROM jobs WHERE state = 'queued' ORDER BY created, id")]
+
+    def running_since(self) -> list[float]:
+        """Start times of the jobs being processed."""
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT started FROM jobs WHERE state = 'processing'")]
+
+    def recent_durations(self, limit: int = 20) -> list[float]:
+        """Run times of the most recently completed jobs."""
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT finished - started FROM jobs WHERE state = 'completed' AND started IS NOT NULL"
+                " ORDER BY finished DESC LIMIT ?", (limit,))]
+
+    def stale(self, older_than: float) -> list[dict]:
+        """Processing jobs whose heartbeat (`updated`) is older than `older_than` seconds."""
+        with self._lock:
+            return [self._row(row) for row in self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE state = 'processing' AND updated < ?",
+                (time.time() - older_than,))]
+
+    def data_version(self) -> int:
+        """Changes whenever another connection commits to the store (cheap; reads no table)."""
+        with self._lock:
+            return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed_since(self, since: float) -> list[tuple[str, bool]]:
+        """
+        (job id, queue_moved) for jobs updated after `since`; queue_moved as for
+        on_change, approximated as not processing or claimed since then.
+        """
+        with self._lock:
+            return [(row[0], bool(row[1])) for row in self._db.execute(
+                "SELECT id, state != 'processing' OR started > ? FROM jobs WHERE updated > ?", (since, since))]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,49 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { createClient } from '@/lib/supabase/server';
+
+export const dynamic = 'force-dynamic';
+
+// Relays the backend's Server-Sent Events stream of a job's status (`status` events
+// carrying the same fields as /api/status), so the processing page doesn't have to poll
+export async function GET(request: NextRequest) {
+  const supabase = await createClient();
+  const { data: { user } } = await supabase.auth.getUser();
+
+  if (!user) {
+    return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
+  }
+
+  const jobId = request.nextUrl.searchParams.get('jobId');
+  if (!jobId) {
+    return NextResponse.json({ error: 'No jobId provided' }, { status: 400 });
+  }
+
+  const externalApiUrl = process.env.NODE_ENV === 'production' && process.env.EXTERNAL_API_URL
+    ? process.env.EXTERNAL_API_URL
+    : 'http://localhost:8080';
+
+  let response: Response;
+  try {
+    response = await fetch(`${externalApiUrl}/api/events/${jobId}`, {
+      cache: 'no-store',
+      // Stop reading from the backend when the browser goes away
+      signal: request.signal,
+    });
+  } catch (fetchError: any) {
+    console.error('[Events] Fetch error:', fetchError);
+    return NextResponse.json({ error: 'Backend API not accessible' }, { status: 502 });
+  }
+
+  if (!response.ok || !response.body) {
+    const errorText = await response.text().catch(() => 'Unknown error');
+    return NextResponse.json({ error: `Backend error: ${errorText}` }, { status: response.status || 502 });
+  }
+
+  return new Response(response.body, {
+    headers: {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache, no-transform',
+      'X-Accel-Buffering': 'no',
+    },
+  });
+}
@@ -39,56 +39,86 @@ function ProcessingContent() {
       setFunFact(funFacts[Math.floor(Math.random() * funFacts.length)]);
     }, 5000);
 
-    // Poll for actual progress
-    const pollInterval = setInterval(() => {
-      fetch(`/api/status-external?jobId=${jobId}`)
-        .then((res) => res.json())
-        .then((data) => {
-          // Check for completion: status is 'completed' OR progress is 100%
-          // When progress is 100%, verify the result file actually exists
-          const isCompleted = data.status === 'completed' || data.progress === 100;
-          
-          if (isCompleted) {
-            // Verify the result file exists before redirecting
-            fetch(`/api/result-external?jobId=${jobId}`)
-              .then((res) => {
-                if (res.ok) {
-                  // File exists, safe to redirect
-                  clearInterval(pollInterval);
-                  clearInterval(factInterval);
-                  router.push(`/result?jobId=${jobId}`);
-                } else {
-                  // File not ready yet, keep polling but show 100%
-                  console.log('Result file not ready yet, continuing to poll...');
-                  setProgress(100);
-                }
-              })
-              .catch(() => {
-                // If check fails, wait a bit more then redirect anyway
-                setTimeout(() => {
-                  clearInterval(pollInterval);
-                  clearInterval(factInterval);
-                  router.push(`/result?jobId=${jobId}`);
-                }, 3000);
-              });
-          } else if (data.progress !== undefined) {
-            setProgress(data.progress);
-            setCurrentStatus(data.statusIndex || 0);
-            if (data.chunkProgress) {
-              setChunkProgress(data.chunkProgress);
-            }
-            if (data.estimatedTime) {
-              setEstimatedTime(data.estimatedTime);
-            }
-          }
-        })
-        .catch(() => {});
-    }, 2000);
+    let pollInterval: ReturnType<typeof setInterval> | undefined;
+    let events: EventSource | undefined;
+    let finished = false;
 
-    return () => {
+    const stop = () => {
+      finished = true;
+      events?.close();
       clearInterval(pollInterval);
       clearInterval(factInterval);
     };
+
+    const handleStatus = (data: any) => {
+      if (finished) return;
+      // Check for completion: status is 'completed' OR progress is 100%
+      // When progress is 100%, verify the result file actually exists
+      const isCompleted = data.status === 'completed' || data.progress === 100;
+
+      if (isCompleted) {
+        // Verify the result file exists before redirecting
+        fetch(`/api/result-external?jobId=${jobId}`)
+          .then((res) => {
+            if (res.ok) {
+              // File exists, safe to redirect
+              stop();
+              router.push(`/result?jobId=${jobId}`);
+            } else {
+              // File not ready yet, keep polling but show 100%
+              console.log('Result file not ready yet, continuing to poll...');
+              setProgress(100);
+              startPolling();
+            }
+          })
+          .catch(() => {
+            // If check fails, wait a bit more then redirect anyway
+            setTimeout(() => {
+              stop();
+              router.push(`/result?jobId=${jobId}`);
+            }, 3000);
+          });
+      } else if (data.progress !== undefined) {
+        setProgress(data.progress);
+        setCurrentStatus(data.statusIndex || 0);
+        if (data.chunkProgress) {
+          setChunkProgress(data.chunkProgress);
+        }
+        if (data.estimatedTime) {
+          setEstimatedTime(data.estimatedTime);
+        }
+      }
+    };
+
+    // Poll for actual progress (fallback when the event stream isn't available)
+    const startPolling = () => {
+      events?.close();
+      if (pollInterval !== undefined || finished) return;
+      pollInterval = setInterval(() => {
+        fetch(`/api/status-external?jobId=${jobId}`)
+          .then((res) => res.json())
+          .then(handleStatus)
+          .catch(() => {});
+      }, 2000);
+    };
+
+    // Progress is pushed as it happens; the stream closes once the job is done
+    if (typeof EventSource !== 'undefined') {
+      events = new EventSource(`/api/events-external?jobId=${jobId}`);
+      events.addEventListener('status', (event) => {
+        handleStatus(JSON.parse((event as MessageEvent).data));
+      });
+      events.onerror = () => {
+        // Stream unavailable or dropped: fall back to polling
+        if (!finished) startPolling();
+      };
+    } else {
+      startPolling();
+    }
+
+    return () => {
+      stop();
+    };
   }, [jobId, router]);
 
   return (
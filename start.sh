@@ -13,16 +13,24 @@ else
   API_PORT=8080
 fi
 
+# Start the warm Whisper service in background: it keeps WHISPER_WORKERS models loaded
+# so jobs don't each pay for loading Whisper (jobs load it themselves until it's ready)
+# The service unpickles requests, so clients authenticate with a secret made fresh for this run
+export TRANSCRIBE_AUTHKEY="${TRANSCRIBE_AUTHKEY:-$(python3 -c 'import secrets; print(secrets.token_hex(32))')}"
+echo "🎙️  Starting transcription service (${WHISPER_WORKERS:-1} x Whisper ${WHISPER_MODEL:-tiny})..."
+PYTHONUNBUFFERED=1 python3 transcription_service.py > /tmp/transcription_service.log 2>&1 &
+
 # Start Python API server in background (internal port)
 echo "📡 Starting Python API server on port $API_PORT..."
 # Use a production WSGI server (Gunicorn) instead of Flask dev server.
 # Also tee to a file so we can inspect logs if needed.
 # Note: keep workers modest to avoid memory pressure on small instances.
+# Each open /api/events stream holds a thread (idle until its job changes), so threads are plentiful.
 PYTHONUNBUFFERED=1 \
 gunicorn \
   --bind "0.0.0.0:${API_PORT}" \
   --workers "${GUNICORN_WORKERS:-2}" \
-  --threads "${GUNICORN_THREADS:-4}" \
+  --threads "${GUNICORN_THREADS:-32}" \
   --timeout "${GUNICORN_TIMEOUT:-3600}" \
   --access-logfile "-" \
   --error-logfile "-" \
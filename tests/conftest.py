@@ -0,0 +1,15 @@
+"""
+Shared test setup: the repository root is importable, and api_server's job
+store and stage locks live in a scratch directory instead of outputs/.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_SCRATCH = tempfile.mkdtemp(prefix='movietobook-tests-')
+os.environ.setdefault('JOB_STORE_PATH', os.path.join(_SCRATCH, 'jobs.sqlite'))
+os.environ.setdefault('STAGE_LOCK_DIR', _SCRATCH)
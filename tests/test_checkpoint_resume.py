@@ -0,0 +1,108 @@
+"""
+Resuming from a checkpoint whose frame descriptions finished out of order.
+
+Frames are described concurrently, so the checkpoint records them in whatever
+order their requests finish, and failed descriptions aren't recorded at all. A
+resumed run has to pick up at the first sample without a description, not after
+the latest one recorded.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+SETTINGS = {'frames': {'interval': 5}, 'narrative': {'chunk_tokens': 4000}}
+
+
+def sample_timestamps(duration=60, interval=5):
+    return [ts for ts, _ in vtn._sample_targets(0, duration, 25, interval)]
+
+
+def interrupted_checkpoint(path, timestamps):
+    """
+    A run describing pairs of frames, where the batches finished in a shuffled order,
+    one batch failed, and the run crashed with two batches still in flight.
+    """
+    batches = [timestamps[i:i + 2] for i in range(0, len(timestamps), 2)]
+    finished = [batches[3], batches[0], batches[5]]  # batches[1] failed; 2 and 4 were in flight
+    checkpoint = vtn.RunCheckpoint(str(path), 'video', SETTINGS)
+    for batch in finished:
+        for ts in batch:
+            checkpoint.record_frame(ts, f"frame at {ts}s", [ts], False)
+    checkpoint.close()  # Crash: no frames_done record
+    return batches
+
+
+def test_resume_starts_at_first_gap(tmp_path):
+    path = tmp_path / 'job_checkpoint.jsonl'
+    timestamps = sample_timestamps()
+    batches = interrupted_checkpoint(path, timestamps)
+
+    checkpoint = vtn.RunCheckpoint(str(path), 'video', SETTINGS, resume=True)
+    resume_from = checkpoint.resume_from(timestamps)
+    # The first batch finished, the second failed: resume at its first frame,
+    # not after the last batch recorded
+    assert resume_from == batches[1][0]
+
+    checkpoint.keep_frames_before(resume_from)
+    assert sorted(checkpoint.frames) == batches[0]
+    checkpoint.close()
+
+
+def test_resumed_run_leaves_no_gaps(tmp_path):
+    path = tmp_path / 'job_checkpoint.jsonl'
+    timestamps = sample_timestamps()
+    interrupted_checkpoint(path, timestamps)
+
+    checkpoint = vtn.RunCheckpoint(str(path), 'video', SETTINGS, resume=True)
+    resume_from = checkpoint.resume_from(timestamps)
+    checkpoint.keep_frames_before(resume_from)
+    # The resumed run describes every sample from the gap on
+    for ts in timestamps[timestamps.index(resume_from):]:
+        checkpoint.record_frame(ts, f"frame at {ts}s (resumed)", [ts], False)
+    checkpoint.record_frames_done()
+    checkpoint.close()
+
+    reloaded = vtn.RunCheckpoint(str(path), 'video', SETTINGS, resume=True)
+    assert reloaded.frames_done
+    assert reloaded.resume_from(timestamps) is None
+    assert sorted(reloaded.frames) == timestamps
+    reloaded.discard()
+    assert not os.path.exists(path)
+
+
+def test_frames_done_with_a_gap_is_resumed(tmp_path):
+    path = tmp_path / 'job_checkpoint.jsonl'
+    timestamps = sample_timestamps()
+    checkpoint = vtn.RunCheckpoint(str(path), 'video', SETTINGS)
+    for ts in timestamps:
+        if ts != timestamps[4]:  # Its description failed, so it was never recorded
+            checkpoint.record_frame(ts, f"frame at {ts}s", [ts], False)
+    checkpoint.record_frames_done()
+    checkpoint.close()
+
+    resumed = vtn.RunCheckpoint(str(path), 'video', SETTINGS, resume=True)
+    assert resumed.resume_from(timestamps) == timestamps[4]
+    resumed.keep_frames_before(timestamps[4])
+    assert not resumed.frames_done
+    assert sorted(resumed.frames) == timestamps[:4]
+    resumed.close()
+
+
+def test_switching_frame_backend_keeps_only_the_transcript(tmp_path):
+    path = tmp_path / 'job_checkpoint.jsonl'
+    opencv = {'frames': {'interval': 5, 'backend': 'opencv'}, 'narrative': {'chunk_tokens': 4000}}
+    ffmpeg = {'frames': {'interval': 5, 'backend': 'ffmpeg'}, 'narrative': {'chunk_tokens': 4000}}
+    checkpoint = vtn.RunCheckpoint(str(path), 'video', opencv)
+    checkpoint.record_transcript([(0.0, 2.0, "Hello.")])
+    for ts in sample_timestamps()[:4]:
+        checkpoint.record_frame(ts, f"frame at {ts}s", [ts], False)
+    checkpoint.close()
+
+    resumed = vtn.RunCheckpoint(str(path), 'video', ffmpeg, resume=True)
+    assert resumed.transcript is not None
+    assert resumed.frames == {}
+    resumed.close()
@@ -0,0 +1,90 @@
+"""
+describe_frames_batch / describe_frames_batch_async: a failed batch falls back
+to one request per frame, and a frame whose fallback fails too only costs that
+frame - cached and successfully described neighbours are kept.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+FRAMES = [(0, b'frame-a'), (3, b'frame-b'), (6, b'frame-c')]
+
+
+def reply(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=None)
+
+
+def requested_timestamps(messages):
+    """Timestamps of the frames in a request, read back from its prompt."""
+    text = ' '.join(part['text'] for part in messages[0]['content'] if part['type'] == 'text')
+    return [ts for ts, _ in FRAMES if f"frame at {ts}s" in text]
+
+
+class FakeCompletions:
+    """Fails every batch request, and single-frame requests for `broken` timestamps."""
+
+    def __init__(self, broken):
+        self.broken = broken
+        self.requests = []
+
+    def create(self, messages, **kwargs):
+        timestamps = requested_timestamps(messages)
+        self.requests.append(timestamps)
+        if len(timestamps) > 1 or timestamps[0] in self.broken:
+            raise RuntimeError("request failed")
+        return reply(f"Frame {timestamps[0]} described.")
+
+
+class FakeAsyncCompletions(FakeCompletions):
+    async def create(self, messages, **kwargs):
+        return FakeCompletions.create(self, messages, **kwargs)
+
+
+def fake_client(completions):
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+def test_failed_fallback_only_loses_its_own_frame():
+    completions = FakeCompletions(broken={3})
+    descs = vtn.describe_frames_batch(fake_client(completions), FRAMES)
+    assert descs == ["Frame 0 described.", "[Could not analyze]", "Frame 6 described."]
+    assert completions.requests == [[0, 3, 6], [0], [3], [6]]
+
+
+def test_cached_frames_survive_a_failed_frame(tmp_path):
+    cache = vtn.DescriptionCache(str(tmp_path / 'cache.sqlite'))
+    cache.store([FRAMES[0]], ["Cached description."])
+    completions = FakeCompletions(broken={6})
+    descs = vtn.describe_frames_batch(fake_client(completions), FRAMES, cache)
+    assert descs == ["Cached description.", "Frame 3 described.", "[Could not analyze]"]
+    # Only frames the cache didn't know were sent, and the failure wasn't cached
+    assert completions.requests == [[3, 6], [3], [6]]
+    assert cache.lookup(FRAMES) == ["Cached description.", "Frame 3 described.", None]
+    cache.close()
+
+
+def test_single_uncached_frame_failing_keeps_the_cached_ones(tmp_path):
+    cache = vtn.DescriptionCache(str(tmp_path / 'cache.sqlite'))
+    cache.store(FRAMES[:2], ["Cached A.", "Cached B."])
+    descs = vtn.describe_frames_batch(fake_client(FakeCompletions(broken={6})), FRAMES, cache)
+    assert descs == ["Cached A.", "Cached B.", "[Could not analyze]"]
+    cache.close()
+
+
+def test_async_batch_handles_failures_per_frame(tmp_path):
+    cache = vtn.DescriptionCache(str(tmp_path / 'cache.sqlite'))
+    cache.store([FRAMES[0]], ["Cached description."])
+    completions = FakeAsyncCompletions(broken={6})
+    descs = asyncio.run(vtn.describe_frames_batch_async(fake_client(completions), FRAMES, cache=cache))
+    assert descs == ["Cached description.", "Frame 3 described.", "[Could not analyze]"]
+
+    # A lone uncached frame that fails doesn't take the cached ones with it
+    descs = asyncio.run(vtn.describe_frames_batch_async(
+        fake_client(FakeAsyncCompletions(broken={6})), FRAMES, cache=cache))
+    assert descs == ["Cached description.", "Frame 3 described.", "[Could not analyze]"]
+    cache.close()
@@ -0,0 +1,41 @@
+"""
+JPEG buffers handed to the vision payload: OpenCV 4.x's imencode returns an
+(N, 1) array, whose memoryview can't be indexed by byte.
+"""
+
+import base64
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+
+def encoded_jpeg(width=64, height=48) -> bytes:
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[:, ::2] = 200
+    return bytes(vtn._encode_jpeg(frame))
+
+
+def test_encode_jpeg_returns_a_flat_view(monkeypatch):
+    jpeg = np.frombuffer(encoded_jpeg(), dtype=np.uint8)
+    # What OpenCV 4.x returns from imencode
+    monkeypatch.setattr(vtn.cv2, 'imencode', lambda *args: (True, jpeg.reshape(-1, 1)))
+    data = vtn._encode_jpeg(np.zeros((48, 64, 3), dtype=np.uint8))
+    assert data.ndim == 1
+    assert bytes(data) == jpeg.tobytes()
+    assert vtn._jpeg_size(data) == (64, 48)
+
+
+def test_jpeg_size_reads_an_n_by_1_buffer():
+    jpeg = np.frombuffer(encoded_jpeg(), dtype=np.uint8).reshape(-1, 1)
+    assert vtn._jpeg_size(jpeg.data) == (64, 48)
+
+
+def test_image_part_accepts_an_n_by_1_buffer():
+    raw = encoded_jpeg()
+    part = vtn._image_part(np.frombuffer(raw, dtype=np.uint8).reshape(-1, 1).data)
+    url = part['image_url']['url']
+    assert base64.b64decode(url.split(',', 1)[1]) == raw
@@ -0,0 +1,72 @@
+"""
+Folding runs of near-identical frames (static shots, title cards, black frames)
+by difference hash, so each run is described once.
+"""
+
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+
+def jpeg(image) -> bytes:
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    assert ok
+    return buffer.tobytes()
+
+
+def shot(seed, noise=0):
+    """A 320x240 frame of random blocks; `noise` adds per-pixel jitter to the same shot."""
+    blocks = np.random.default_rng(seed).integers(0, 256, (12, 16), dtype=np.uint8)
+    image = cv2.resize(blocks, (320, 240), interpolation=cv2.INTER_NEAREST).astype(np.int16)
+    if noise:
+        image += np.random.default_rng(seed + noise).integers(-3, 4, image.shape, dtype=np.int16)
+    return jpeg(cv2.cvtColor(np.clip(image, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR))
+
+
+def black():
+    return jpeg(np.zeros((240, 320, 3), dtype=np.uint8))
+
+
+def test_signature_is_stable_across_reencodes():
+    a = vtn.frame_signature(shot(1))
+    b = vtn.frame_signature(shot(1, noise=1))
+    assert vtn.frames_are_similar(a, b)
+    assert not vtn.frames_are_similar(a, vtn.frame_signature(shot(2)))
+    assert vtn.frame_signature(b'not a jpeg') is None
+
+
+def test_runs_fold_into_their_first_frame():
+    frames = [(0.0, shot(1)), (5.0, shot(1, noise=1)), (10.0, shot(1, noise=2)),
+              (15.0, shot(2)), (20.0, black()), (25.0, black()), (30.0, shot(1))]
+    folded = list(vtn.fold_duplicate_frames(frames))
+    assert [(ts, covered) for ts, _, covered in folded] == [
+        (0.0, [0.0, 5.0, 10.0]), (15.0, [15.0]), (20.0, [20.0, 25.0]), (30.0, [30.0])]
+    # The first frame of each run is the one described
+    assert [data for _, data, _ in folded] == [frames[0][1], frames[3][1], frames[4][1], frames[6][1]]
+
+
+def test_disabled_folding_still_reports_scene_cuts():
+    frames = [(0.0, shot(1)), (5.0, shot(1, noise=1)), (10.0, shot(2))]
+    scene_cuts = []
+    folded = list(vtn.fold_duplicate_frames(frames, max_distance=-1, scene_cuts=scene_cuts))
+    assert [covered for _, _, covered in folded] == [[0.0], [5.0], [10.0]]
+    assert scene_cuts == [10.0]
+
+
+def test_undecodable_frames_are_never_folded():
+    frames = [(0.0, b'broken'), (5.0, b'broken'), (10.0, shot(1))]
+    assert [covered for _, _, covered in vtn.fold_duplicate_frames(frames)] == [[0.0], [5.0], [10.0]]
+
+
+def test_slow_drift_is_compared_against_the_run_start(monkeypatch):
+    # Each frame is 3 bits from the one before it, so 6 bits from the one before that
+    signatures = {bytes([i]): ((1 << (3 * i)) - 1, 100.0) for i in range(4)}
+    monkeypatch.setattr(vtn, 'frame_signature', signatures.get)
+    frames = [(i * 5.0, bytes([i])) for i in range(4)]
+    folded = list(vtn.fold_duplicate_frames(frames, max_distance=5))
+    assert [covered for _, _, covered in folded] == [[0.0, 5.0], [10.0, 15.0]]
@@ -0,0 +1,38 @@
+"""
+JobQueue worker threads: started once per process, and restarted in a process
+that was forked from one where they were already running.
+"""
+
+import threading
+
+import api_server
+from job_store import JobStore
+
+
+def dead_thread():
+    thread = threading.Thread(target=lambda: None)
+    thread.start()
+    thread.join()
+    return thread
+
+
+def alive(queue):
+    return [thread for thread in queue._threads if thread.is_alive()]
+
+
+def test_start_is_idempotent(tmp_path):
+    queue = api_server.JobQueue(JobStore(str(tmp_path / 'jobs.sqlite')), workers=2, max_queued=4)
+    queue.start()
+    threads = list(queue._threads)
+    queue.start()
+    assert queue._threads == threads
+    assert len(alive(queue)) == 2
+
+
+def test_start_replaces_threads_lost_in_a_fork(tmp_path):
+    queue = api_server.JobQueue(JobStore(str(tmp_path / 'jobs.sqlite')), workers=2, max_queued=4)
+    # What a child of gunicorn --preload inherits: the parent's list, none of its threads
+    queue._threads = [dead_thread(), dead_thread()]
+    queue.start()
+    assert len(queue._threads) == 2
+    assert len(alive(queue)) == 2
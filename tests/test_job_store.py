@@ -0,0 +1,158 @@
+"""
+The SQLite job store shared by the server processes: queueing and claiming,
+upload dedupe by content key, and recovery of jobs whose server died.
+"""
+
+import fcntl
+import threading
+import time
+
+import pytest
+
+import api_server
+from job_store import JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite'))
+    yield store
+    store.close()
+
+
+def create(store, tmp_path, job_id, **kwargs):
+    return store.create(job_id, tmp_path / f"{job_id}.mp4", tmp_path / f"{job_id}.txt", **kwargs)
+
+
+def backdate(store, job_id, seconds):
+    """Make a job's heartbeat `seconds` old, as if its server stopped touching it."""
+    store._db.execute("UPDATE jobs SET updated = ? WHERE id = ?", (time.time() - seconds, job_id))
+
+
+def test_claim_is_fifo_and_bounded(store, tmp_path):
+    for job_id in ('a', 'b', 'c'):
+        assert create(store, tmp_path, job_id)['state'] == 'queued'
+    assert store.queued_ids() == ['a', 'b', 'c']
+    assert store.claim(2)['id'] == 'a'
+    assert store.claim(2)['id'] == 'b'
+    assert store.claim(2) is None  # Two already processing
+    store.update('a', state='completed', finished=time.time())
+    claimed = store.claim(2)
+    assert claimed['id'] == 'c' and claimed['state'] == 'processing' and claimed['started']
+    assert store.claim(2) is None  # Nothing queued
+    assert store.count('processing') == 2
+
+
+def test_create_refuses_past_max_queued(store, tmp_path):
+    assert create(store, tmp_path, 'a', max_queued=2)
+    assert create(store, tmp_path, 'b', max_queued=2)
+    assert create(store, tmp_path, 'c', max_queued=2) is None
+    assert store.get('c') is None
+    store.claim(1)
+    assert create(store, tmp_path, 'c', max_queued=2)['state'] == 'queued'
+
+
+def test_identical_upload_attaches_to_the_running_job(store, tmp_path):
+    first = create(store, tmp_path, 'first', content_key='k')
+    store.claim(1)
+    second = create(store, tmp_path, 'second', content_key='k', max_queued=0)
+    assert second['state'] == 'processing' and second['source_job'] == 'first'
+    assert second['output_path'] == first['output_path']
+    assert store.queued_ids() == []  # Attached jobs don't take a queue place
+    store.update('first', progress=40, status='Describing frames')
+    attached = store.get('second')
+    assert (attached['state'], attached['progress'], attached['status']) == ('processing', 40, 'Describing frames')
+    store.update('first', state='error', error='boom')
+    assert store.get('second')['error'] == 'boom'
+    # Once the first job failed, an identical upload runs again
+    assert create(store, tmp_path, 'third', content_key='k')['state'] == 'queued'
+
+
+def test_identical_upload_completes_from_the_result_cache(store, tmp_path):
+    create(store, tmp_path, 'first', content_key='k')
+    store.claim(1)
+    (tmp_path / 'first.txt').write_text("The narrative.")
+    store.update('first', state='completed', progress=100, finished=time.time())
+    store.record_result('first')
+    cached = create(store, tmp_path, 'second', content_key='k')
+    assert cached['state'] == 'completed' and cached['source_job'] == 'first'
+    assert cached['output_path'] == str(tmp_path / 'first.txt')
+    assert create(store, tmp_path, 'other', content_key='other-k')['state'] == 'queued'
+    # A cached result whose file is gone is dropped, and the upload runs again
+    (tmp_path / 'first.txt').unlink()
+    assert create(store, tmp_path, 'third', content_key='k')['state'] == 'queued'
+    assert store._db.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 0
+
+
+def test_concurrent_processes_start_one_run_per_upload(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite')
+    stores = [JobStore(path) for _ in range(4)]
+    created, claimed = [], []
+
+    def server(index, store):
+        for n in range(5):
+            created.append(create(store, tmp_path, f"job_{index}_{n}", content_key=f"upload_{n}"))
+        while (job := store.claim(100)) is not None:
+            claimed.append(job['id'])
+
+    threads = [threading.Thread(target=server, args=(index, store)) for index, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    runs = [job for job in created if job['source_job'] is None]
+    assert sorted(job['content_key'] for job in runs) == [f"upload_{n}" for n in range(5)]
+    assert sorted(claimed) == sorted(job['id'] for job in runs)
+    for store in stores:
+        store.close()
+
+
+@pytest.fixture
+def stale_store(store, monkeypatch):
+    monkeypatch.setattr(api_server, 'job_store', store)
+    return store
+
+
+def stale_job(store, tmp_path, job_id):
+    create(store, tmp_path, job_id, content_key=f"{job_id}-key")
+    store.claim(100)
+    backdate(store, job_id, api_server.JOB_STALE_SECONDS + 10)
+
+
+def test_stale_job_with_output_completes(stale_store, tmp_path):
+    stale_job(stale_store, tmp_path, 'done')
+    (tmp_path / 'done.txt').write_text("The narrative.")
+    api_server.recover_stale_jobs()
+    assert stale_store.get('done')['state'] == 'completed'
+    assert create(stale_store, tmp_path, 'again', content_key='done-key')['source_job'] == 'done'
+
+
+def test_stale_job_with_upload_is_resumed(stale_store, tmp_path):
+    stale_job(stale_store, tmp_path, 'orphan')
+    (tmp_path / 'orphan.mp4').write_bytes(b'video')
+    api_server.recover_stale_jobs()
+    job = stale_store.get('orphan')
+    assert (job['state'], job['resume']) == ('queued', 1)
+    assert stale_store.claim(1)['id'] == 'orphan'
+
+
+def test_stale_job_without_upload_fails(stale_store, tmp_path):
+    stale_job(stale_store, tmp_path, 'lost')
+    api_server.recover_stale_jobs()
+    job = stale_store.get('lost')
+    assert job['state'] == 'error' and job['error']
+
+
+def test_jobs_still_running_are_left_alone(stale_store, tmp_path):
+    stale_job(stale_store, tmp_path, 'locked')
+    (tmp_path / 'locked.mp4').write_bytes(b'video')
+    create(stale_store, tmp_path, 'fresh')
+    stale_store.claim(100)
+    # A run still holds its checkpoint lock, even though its heartbeat stopped
+    with open(tmp_path / 'locked_checkpoint.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        api_server.recover_stale_jobs()
+    assert stale_store.get('locked')['state'] == 'processing'
+    assert stale_store.get('fresh')['state'] == 'processing'
+    api_server.recover_stale_jobs()
+    assert stale_store.get('locked')['state'] == 'queued'
@@ -0,0 +1,102 @@
+"""
+Narrative chunks sized by prompt tokens: they cover the whole video without
+gaps, stay within the budget, and close at pauses and scene cuts.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # One token per word, so costs don't depend on whether tiktoken is installed
+    monkeypatch.setattr(vtn, 'count_tokens', lambda text: len(text.split()))
+
+
+def description(t, words=8):
+    return (t, ' '.join(['word'] * words))
+
+
+def chunk_cost(timeline, start, end):
+    """Prompt tokens plan_narrative_chunks charges to the descriptions in [start, end)."""
+    cost = sum(vtn.count_tokens(vtn.format_snapshot(item)) + 2 for item in timeline.snapshots_between(start, end))
+    for seg_start, _, text in timeline.segments:
+        if start <= timeline.times[max(0, timeline.description_index(seg_start))] < end:
+            cost += vtn.count_tokens(f"- {text}") + 1
+    return cost
+
+
+def assert_covers(chunks, timeline, duration):
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == max(duration, timeline.times[-1] + 1)
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+    for start, end in chunks:
+        assert start < end
+        assert timeline.descriptions_between(start, end)  # No chunk is empty
+
+
+def test_everything_fits_in_one_chunk():
+    timeline = vtn.Timeline([description(t) for t in range(0, 50, 5)], [])
+    assert vtn.plan_narrative_chunks(timeline, 50.0, budget=1000) == [(0, 50.0)]
+    assert vtn.plan_narrative_chunks(vtn.Timeline(), 50.0, budget=10) == [(0, 50.0)]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_chunks_cover_the_video_within_budget(seed):
+    rng = random.Random(seed)
+    times = sorted(rng.sample(range(0, 600), 80))
+    segments = []
+    for k in range(40):
+        start = rng.uniform(0, 590)
+        segments.append((start, start + rng.uniform(0.5, 8), ' '.join(['said'] * rng.randint(1, 12))))
+    timeline = vtn.Timeline([description(t, rng.randint(3, 20)) for t in times], segments)
+    budget = 150
+    cuts = rng.sample(times, 10)
+    chunks = vtn.plan_narrative_chunks(timeline, 600.0, scene_cuts=cuts, budget=budget)
+    assert len(chunks) > 1
+    assert_covers(chunks, timeline, 600.0)
+    for start, end in chunks:
+        assert chunk_cost(timeline, start, end) <= budget
+    assert sum(chunk_cost(timeline, start, end) for start, end in chunks) == chunk_cost(timeline, 0, 601)
+
+
+def test_oversized_description_gets_a_chunk_of_its_own():
+    descriptions = [description(t) for t in range(0, 100, 5)]
+    descriptions[10] = description(50, words=500)
+    timeline = vtn.Timeline(descriptions, [])
+    chunks = vtn.plan_narrative_chunks(timeline, 100.0, budget=60)
+    assert_covers(chunks, timeline, 100.0)
+    assert (50, 55) in chunks
+    for start, end in chunks:
+        if (start, end) != (50, 55):
+            assert chunk_cost(timeline, start, end) <= 60
+
+
+def test_oversized_first_and_last_descriptions():
+    timeline = vtn.Timeline([description(0, 500), description(5), description(10, 500)], [])
+    chunks = vtn.plan_narrative_chunks(timeline, 12.0, budget=60)
+    assert chunks == [(0, 5), (5, 10), (10, 12.0)]
+
+
+def test_boundary_avoids_dialogue_and_prefers_a_scene_cut():
+    # 11 tokens per description: a budget of 120 fits ten, and min fill lets a chunk close after seven
+    descriptions = [description(t) for t in range(0, 200, 10)]
+    speech = [(55.0, 95.0, "A long speech."), (105.0, 125.0, "Another one.")]
+    timeline = vtn.Timeline(descriptions, speech)
+    # 70-90 are mid-speech, so the first chunk ends at 100, the one point outside dialogue
+    assert vtn.plan_narrative_chunks(timeline, 200.0, budget=120)[0] == (0, 100)
+    # A hard cut in the middle of a line doesn't beat a pause
+    assert vtn.plan_narrative_chunks(timeline, 200.0, scene_cuts=[80], budget=120)[0] == (0, 100)
+    # Without the speech, a hard cut wins over a later boundary
+    timeline = vtn.Timeline(descriptions, [])
+    assert vtn.plan_narrative_chunks(timeline, 200.0, scene_cuts=[70], budget=120)[0] == (0, 70)
+    assert vtn.plan_narrative_chunks(timeline, 200.0, budget=120)[0] == (0, 100)
+    # Below the minimum fill, a cut is ignored
+    assert vtn.plan_narrative_chunks(timeline, 200.0, scene_cuts=[30], budget=120)[0] == (0, 100)
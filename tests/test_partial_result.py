@@ -0,0 +1,20 @@
+"""
+Reading the narrative while video_to_narrative.py is still writing it: the
+partial file can end part-way through a UTF-8 character.
+"""
+
+import api_server
+
+
+def test_partial_result_cut_mid_character(tmp_path, monkeypatch):
+    output_path = tmp_path / 'job.txt'
+    text = "Chapter 1: Café — "
+    encoded = text.encode('utf-8')
+    api_server.partial_result_path(output_path).write_bytes(encoded + "é".encode('utf-8')[:1])
+    monkeypatch.setattr(api_server.job_store, 'get',
+                        lambda job_id: {'output_path': str(output_path), 'state': 'processing'})
+
+    response = api_server.app.test_client().get('/api/result/job_partial')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'partial'
+    assert response.get_json()['narrative'] == text
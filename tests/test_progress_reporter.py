@@ -0,0 +1,107 @@
+"""
+Progress reporting from a run: every update goes out on the PROGRESS_FD pipe,
+while <output>_progress.json is only rewritten on step changes, at the end,
+and otherwise at most every snapshot_interval seconds.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+
+@pytest.fixture
+def channel():
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    yield read_fd, write_fd
+    os.close(read_fd)
+
+
+def received(read_fd):
+    data = b''
+    while True:
+        try:
+            chunk = os.read(read_fd, 65536)
+        except BlockingIOError:
+            break
+        if not chunk:
+            break
+        data += chunk
+    return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+
+def snapshot(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_every_update_is_sent_but_snapshots_are_throttled(tmp_path, channel):
+    read_fd, write_fd = channel
+    path = str(tmp_path / 'job_progress.json')
+    reporter = vtn.ProgressReporter(path, write_fd, snapshot_interval=3600)
+
+    reporter.update('Starting...', 0, 0)
+    assert snapshot(path)['status'] == 'Starting...'  # The first update always writes
+    reporter.update('Describing frames', 30, 2, {'current': 1, 'total': 10})
+    assert snapshot(path)['status_index'] == 2  # A new step writes
+    for current in range(2, 10):
+        reporter.update('Describing frames', 30 + current, 2, {'current': current, 'total': 10})
+    # Same step, within the interval: the snapshot still holds the step's first update
+    assert snapshot(path)['progress'] == 30
+
+    sent = received(read_fd)
+    assert [message['type'] for message in sent] == ['progress'] * 10
+    assert [message['progress'] for message in sent] == [0, 30] + list(range(32, 40))
+    assert sent[-1]['chunk_progress'] == {'current': 9, 'total': 10}
+
+    reporter.flush()  # Brings the snapshot up to date
+    assert snapshot(path)['progress'] == 39
+    assert not os.path.exists(path + '.tmp')
+
+    reporter.event('stage_timings', timings={'demux': 1.5})
+    assert received(read_fd) == [{'type': 'stage_timings', 'timings': {'demux': 1.5}}]
+    assert snapshot(path)['progress'] == 39  # Events don't touch the snapshot
+
+
+def test_the_end_and_errors_always_write(tmp_path):
+    path = str(tmp_path / 'job_progress.json')
+    reporter = vtn.ProgressReporter(path, snapshot_interval=3600)
+    reporter.update('Writing narrative', 80, 3)
+    reporter.update('Writing narrative', 90, 3)
+    assert snapshot(path)['progress'] == 80
+    reporter.update('Error: vision API down', 90, 3)
+    assert snapshot(path)['status'] == 'Error: vision API down'
+    reporter.update('Completed', 100, 3)
+    assert snapshot(path)['progress'] == 100
+
+
+def test_snapshot_interval_elapsed(tmp_path, monkeypatch):
+    path = str(tmp_path / 'job_progress.json')
+    reporter = vtn.ProgressReporter(path, snapshot_interval=5)
+    clock = [1000.0]
+    monkeypatch.setattr(vtn.time, 'time', lambda: clock[0])
+    reporter.update('Transcribing', 10, 1)
+    clock[0] += 4.9
+    reporter.update('Transcribing', 15, 1)
+    assert snapshot(path)['progress'] == 10
+    clock[0] += 0.1
+    reporter.update('Transcribing', 20, 1)
+    assert snapshot(path)['progress'] == 20
+
+
+def test_closed_channel_falls_back_to_the_snapshot(tmp_path, capsys):
+    read_fd, write_fd = os.pipe()
+    path = str(tmp_path / 'job_progress.json')
+    reporter = vtn.ProgressReporter(path, write_fd, snapshot_interval=0)
+    os.close(read_fd)  # Whoever was reading has gone away
+    reporter.update('Transcribing', 10, 1)
+    reporter.update('Transcribing', 20, 1)
+    assert snapshot(path)['progress'] == 20
+    assert reporter._channel is None
+    assert capsys.readouterr().out.count('Progress channel closed') == 1
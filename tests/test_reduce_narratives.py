@@ -0,0 +1,80 @@
+"""
+reduce_narratives: merges run level by level in groups of at most group_size,
+and an empty merge reply is retried instead of being passed up the tree.
+"""
+
+import re
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+
+def reply(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class FakeCompletions:
+    """
+    Merges by joining the chapters it was given; the first `empty` calls reply
+    with nothing.
+    """
+
+    def __init__(self, empty=0):
+        self.empty = empty
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def create(self, messages, **kwargs):
+        prompt = messages[-1]['content']
+        with self._lock:
+            self.prompts.append(prompt)
+            if self.empty:
+                self.empty -= 1
+                return reply("")
+        chapters = re.findall(r'Chapter \d+:\n(.*?)(?=\n\n---\n\n|\n\nWrite the complete)', prompt, re.S)
+        return reply(' + '.join(chapters))
+
+
+@pytest.fixture(autouse=True)
+def no_waiting(monkeypatch):
+    monkeypatch.setattr(vtn.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(vtn, 'PROVIDER_BREAKER', vtn.CircuitBreaker())
+
+
+def narratives(count):
+    return [f"Part {i} of the story. " + "They walk across the room and look out of the window. " * 10
+            for i in range(count)]
+
+
+def client(completions):
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+def test_merges_every_part_in_order_in_groups():
+    completions = FakeCompletions()
+    levels = []
+    story = vtn.reduce_narratives(client(completions), narratives(10), group_size=3, concurrency=4,
+                                  on_level=lambda *level: levels.append(level))
+    assert story == ' + '.join(narratives(10))
+    assert levels == [(1, 10, 4), (2, 4, 2), (3, 2, 1)]
+    assert all(len(re.findall(r'Chapter \d+:', prompt)) <= 3 for prompt in completions.prompts)
+
+
+def test_empty_merge_is_retried_not_passed_up():
+    completions = FakeCompletions(empty=2)
+    story = vtn.reduce_narratives(client(completions), narratives(8), group_size=2, concurrency=1)
+    assert story == ' + '.join(narratives(8))
+    assert "[No final narrative generated]" not in ''.join(completions.prompts)
+    assert len(completions.prompts) == 7 + 2
+
+
+def test_merge_that_never_succeeds_fails_the_reduce():
+    completions = FakeCompletions(empty=10 ** 6)
+    with pytest.raises(RuntimeError, match="Combining narratives failed"):
+        vtn.reduce_narratives(client(completions), narratives(4), group_size=2, concurrency=1)
@@ -0,0 +1,73 @@
+"""
+The shared retry policy: what _plan_retry retries, and RETRY_STATS counting
+from many threads at once.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+
+class APIError(Exception):
+    def __init__(self, message, status_code=None, code=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+@pytest.fixture(autouse=True)
+def no_breaker(monkeypatch):
+    monkeypatch.setattr(vtn, 'PROVIDER_BREAKER', vtn.CircuitBreaker())
+
+
+@pytest.mark.parametrize('retry_all_errors', [False, True])
+def test_quota_errors_are_never_retried(retry_all_errors):
+    error = APIError("You exceeded your current quota", status_code=429, code='insufficient_quota')
+    assert vtn._classify_error(error) == "fatal"
+    assert vtn._plan_retry(error, None, retry_all_errors) is None
+
+
+@pytest.mark.parametrize('status', [400, 401, 403, 404])
+def test_bad_requests_fail_even_when_retrying_all_errors(status):
+    assert vtn._plan_retry(APIError("nope", status_code=status), None, True) is None
+
+
+def test_rate_limits_are_retried():
+    assert vtn._plan_retry(APIError("Rate limit reached", status_code=429), None, False) is not None
+
+
+def test_other_errors_only_retried_when_retrying_all():
+    error = APIError("empty narrative")
+    assert vtn._plan_retry(error, None, False) is None
+    assert vtn._plan_retry(error, None, True) is not None
+
+
+def test_quota_error_fails_call_with_retries_on_first_attempt(monkeypatch):
+    monkeypatch.setattr(vtn.time, 'sleep', lambda seconds: pytest.fail("should not back off"))
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        raise APIError("insufficient_quota", status_code=429, code='insufficient_quota')
+
+    with pytest.raises(APIError):
+        vtn.call_with_retries(call, retry_all_errors=True)
+    assert len(attempts) == 1
+
+
+def test_retry_stats_count_every_thread(monkeypatch):
+    monkeypatch.setattr(vtn, 'RETRY_STATS', dict.fromkeys(vtn.RETRY_STATS, 0))
+    threads = [threading.Thread(target=lambda: [vtn._count_retry_stats(retries=1, retry_wait_seconds=0.5)
+                                                for _ in range(2000)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert vtn.RETRY_STATS['retries'] == 16000
+    assert vtn.RETRY_STATS['retry_wait_seconds'] == 8000
@@ -0,0 +1,70 @@
+"""
+spool_frames: the producer drains into a temp file without waiting on the
+consumer, and the consumer still sees every frame, in order.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+
+def test_producer_finishes_before_anything_is_consumed():
+    drained = threading.Event()
+
+    def frames():
+        for i in range(50):
+            yield i * 3, bytes([i]) * (1000 + i)
+        drained.set()
+
+    stream = vtn.spool_frames(frames())
+    # Nothing has been consumed, yet the whole source is drained
+    assert drained.wait(5)
+    assert list(stream) == [(i * 3, bytes([i]) * (1000 + i)) for i in range(50)]
+
+
+def test_consumer_waits_for_frames_still_being_produced():
+    release = threading.Event()
+
+    def frames():
+        yield 0, b'first'
+        release.wait(5)
+        yield 3, b'second'
+
+    stream = vtn.spool_frames(frames())
+    assert next(stream) == (0, b'first')
+    threading.Timer(0.1, release.set).start()
+    assert list(stream) == [(3, b'second')]
+
+
+def test_errors_reach_the_consumer_after_the_spooled_frames():
+    def frames():
+        yield 0, b'ok'
+        raise RuntimeError("decoder failed")
+
+    stream = vtn.spool_frames(frames())
+    assert next(stream) == (0, b'ok')
+    with pytest.raises(RuntimeError, match="decoder failed"):
+        next(stream)
+
+
+def test_closing_early_closes_the_source():
+    closed = threading.Event()
+
+    def frames():
+        try:
+            i = 0
+            while True:
+                yield i, b'x' * 100
+                i += 1
+        finally:
+            closed.set()
+
+    stream = vtn.spool_frames(frames())
+    assert next(stream)[0] == 0
+    stream.close()
+    assert closed.wait(5)
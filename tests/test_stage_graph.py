@@ -0,0 +1,155 @@
+"""
+The pipeline's stage graph: stages start once their dependencies finish,
+independent branches overlap, and a failure stops the graph. BranchProgress
+merges the branches' progress into one report.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def stage(self, name, result=None, delay=0.0, error=None):
+        def fn(*args):
+            with self._lock:
+                self.events.append(('start', name, args))
+            time.sleep(delay)
+            with self._lock:
+                self.events.append(('end', name, args))
+            if error is not None:
+                raise error
+            return result if result is not None else name
+        return fn
+
+    def index(self, kind, name):
+        return next(i for i, event in enumerate(self.events) if event[:2] == (kind, name))
+
+    def started(self):
+        return {name for kind, name, _ in self.events if kind == 'start'}
+
+
+def test_stages_wait_for_their_dependencies():
+    recorder = Recorder()
+    # demux feeds two branches that meet again in write
+    stages = {
+        'write': (recorder.stage('write'), ['narrate', 'transcribe']),
+        'demux': (recorder.stage('demux', delay=0.05), []),
+        'transcribe': (recorder.stage('transcribe', delay=0.05), ['demux']),
+        'describe': (recorder.stage('describe', delay=0.02), ['demux']),
+        'narrate': (recorder.stage('narrate'), ['describe', 'transcribe']),
+    }
+    timings = {}
+    results = vtn.run_stage_graph(stages, timings=timings)
+    assert results == {'write': 'write'}  # Only stages nothing depends on
+    for name, (_, deps) in stages.items():
+        for dep in deps:
+            assert recorder.index('end', dep) < recorder.index('start', name)
+    # Dependencies' results arrive in the order they are listed
+    assert ('start', 'narrate', ('describe', 'transcribe')) in recorder.events
+    assert set(timings) == set(stages)
+    assert timings['demux'] >= 0.05
+
+
+def test_independent_branches_overlap():
+    both_running = threading.Barrier(2, timeout=5)
+
+    def branch(name):
+        def fn(audio):
+            both_running.wait()  # Deadlocks (and times out) if the branches ran one after the other
+            return f"{name} of {audio}"
+        return fn
+
+    results = vtn.run_stage_graph({
+        'demux': (lambda: 'audio', []),
+        'transcribe': (branch('transcript'), ['demux']),
+        'describe': (branch('frames'), ['demux']),
+    })
+    assert results == {'transcribe': 'transcript of audio', 'describe': 'frames of audio'}
+
+
+def test_failure_stops_the_graph():
+    recorder = Recorder()
+    abort = threading.Event()
+    error = RuntimeError("vision API down")
+    stages = {
+        'demux': (recorder.stage('demux'), []),
+        'describe': (recorder.stage('describe', error=error), ['demux']),
+        'transcribe': (recorder.stage('transcribe', delay=0.1), ['demux']),
+        'narrate': (recorder.stage('narrate'), ['describe', 'transcribe']),
+        'after_transcript': (recorder.stage('after_transcript'), ['transcribe']),
+    }
+    timings = {}
+    with pytest.raises(vtn.StageError) as failure:
+        vtn.run_stage_graph(stages, abort=abort, timings=timings)
+    assert failure.value.stage == 'describe'
+    assert failure.value.error is error
+    assert abort.is_set()
+    # The stage already running finished; nothing new started after the failure
+    assert ('end', 'transcribe', ('demux',)) in recorder.events
+    assert recorder.started() == {'demux', 'describe', 'transcribe'}
+    assert 'describe' in timings and 'transcribe' in timings
+
+
+def test_first_failure_is_reported():
+    stages = {
+        'fast': (Recorder().stage('fast', error=ValueError("first")), []),
+        'slow': (Recorder().stage('slow', delay=0.1, error=ValueError("second")), []),
+    }
+    with pytest.raises(vtn.StageError) as failure:
+        vtn.run_stage_graph(stages)
+    assert failure.value.stage == 'fast'
+
+
+def test_unsatisfiable_dependencies_are_rejected():
+    with pytest.raises(ValueError, match='never start'):
+        vtn.run_stage_graph({'a': (lambda b: b, ['b']), 'b': (lambda a: a, ['a'])})
+    with pytest.raises(ValueError, match='never start'):
+        vtn.run_stage_graph({'a': (lambda: 1, []), 'b': (lambda x: x, ['missing'])})
+
+
+def test_branch_progress_merges_branches():
+    reports = []
+    progress = vtn.BranchProgress(lambda *args: reports.append(args), 10,
+                                  {'transcribe': (30, 1), 'describe': (60, 2)})
+    progress.update('describe', "Describing frames", 0.5)
+    assert reports[-1] == ("Describing frames", 40, 2)
+    progress.update('transcribe', "Transcribing", 0.5)
+    # Statuses are ordered by step, and the earliest step in progress is reported
+    assert reports[-1] == ("Transcribing | Describing frames", 55, 1)
+    progress.update('describe', "Describing frames", 0.25)  # Never steps backwards
+    assert reports[-1] == ("Transcribing | Describing frames", 55, 1)
+    progress.finish('transcribe')
+    assert reports[-1] == ("Describing frames", 70, 2)
+    count = len(reports)
+    progress.finish('describe')
+    assert len(reports) == count  # Nothing left running: the next stage reports on its own
+
+
+def test_branch_progress_from_threads_only_moves_forward():
+    reports = []
+    progress = vtn.BranchProgress(lambda *args: reports.append(args), 0,
+                                  {name: (25, index) for index, name in enumerate('abcd')})
+
+    def branch(name):
+        for step in range(1, 201):
+            progress.update(name, f"{name} {step}", step / 200)
+
+    threads = [threading.Thread(target=branch, args=(name,)) for name in 'abcd']
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    values = [value for _, value, _ in reports]
+    assert values == sorted(values)
+    assert reports[-1] == ("a 200 | b 200 | c 200 | d 200", 100, 0)
@@ -0,0 +1,133 @@
+"""
+Timeline range queries against a brute-force scan, its JSON round trip, and
+the compaction of repeated descriptions and dialogue lines.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import video_to_narrative as vtn  # noqa: E402
+
+
+def random_timeline(rng):
+    # Small integer times, so queries land on boundaries and segments share starts and ends
+    descriptions = [(t, f"frame {t}") for t in rng.sample(range(0, 60, 2), rng.randint(0, 20))]
+    segments = []
+    for k in range(rng.randint(0, 25)):
+        start = rng.randint(0, 55)
+        segments.append((float(start), float(start + rng.randint(0, 8)), f"line {k}"))
+    return descriptions, segments
+
+
+def ranges(rng, count=40):
+    for _ in range(count):
+        start = rng.randint(-5, 65)
+        yield start, start + rng.randint(0, 20)
+
+
+@pytest.mark.parametrize('seed', range(25))
+def test_range_queries_match_a_scan(seed):
+    rng = random.Random(seed)
+    descriptions, segments = random_timeline(rng)
+    timeline = vtn.Timeline(descriptions, segments)
+    descriptions, segments = sorted(descriptions), sorted(segments, key=lambda seg: seg[0])
+    for start, end in ranges(rng):
+        assert timeline.descriptions_between(start, end) == [(t, text) for t, text in descriptions
+                                                             if start <= t < end]
+        expected = [seg for seg in segments if seg[0] < end and seg[1] > start]
+        assert timeline.segments_between(start, end) == expected
+        assert timeline.dialogue_between(start, end) == vtn.get_dialogue_for_time_range(segments, start, end)
+        assert vtn.get_dialogue_for_time_range(timeline, start, end) == [text for _, _, text in expected]
+
+
+@pytest.mark.parametrize('seed', range(25))
+def test_point_queries_match_a_scan(seed):
+    rng = random.Random(seed)
+    descriptions, segments = random_timeline(rng)
+    timeline = vtn.Timeline(descriptions, segments)
+    times = sorted(t for t, _ in descriptions)
+    for t in [x / 2 for x in range(-4, 130)]:
+        assert timeline.description_index(t) == sum(1 for ts in times if ts <= t) - 1
+        inside = any(start < t < end for start, end, _ in segments)
+        # Touching segments are one stretch of speech: the boundary between them is inside too
+        joined = (any(start < t == end for start, end, _ in segments)
+                  and any(start == t for start, _, _ in segments))
+        assert timeline.in_dialogue(t) == (inside or joined)
+
+
+def test_empty_timeline():
+    timeline = vtn.Timeline()
+    assert timeline.descriptions_between(0, 100) == []
+    assert timeline.segments_between(0, 100) == []
+    assert timeline.description_index(10) == -1
+    assert not timeline.in_dialogue(10)
+
+
+def test_round_trip(tmp_path):
+    spans = [(0, 10, "A kitchen."), (15, 15, "A door opens."), (20, 35, "A street at night.")]
+    segments = [(1.5, 4.0, "Hello."), (3.0, 9.25, "Who's there?"), (21.0, 22.0, "Café — ouvert")]
+    timeline = vtn.Timeline(spans, segments)
+    path = str(tmp_path / 'timeline.json')
+    timeline.save(path)
+    for loaded in (vtn.Timeline.from_dict(timeline.to_dict()), vtn.Timeline.load(path)):
+        assert loaded.snapshots == spans
+        assert loaded.segments == segments
+        assert loaded.snapshots_between(10, 20) == [(15, 15, "A door opens.")]
+    assert not (tmp_path / 'timeline.json.tmp').exists()
+
+
+def test_round_trip_of_point_descriptions():
+    timeline = vtn.Timeline([(0, "A"), (5, "B")], [])
+    loaded = vtn.Timeline.from_dict(timeline.to_dict())
+    assert loaded.descriptions == [(0, "A"), (5, "B")]
+    assert loaded.snapshots == [(0, 0, "A"), (5, 5, "B")]
+
+
+def test_unknown_version_is_rejected():
+    data = vtn.Timeline([(0, "A")], []).to_dict()
+    data['version'] = vtn.Timeline.VERSION + 1
+    with pytest.raises(ValueError):
+        vtn.Timeline.from_dict(data)
+
+
+def test_compact_descriptions_merges_runs():
+    descriptions = [
+        (0, "A man sits at a kitchen table reading a newspaper."),
+        (5, "A man sits at a kitchen table, reading a newspaper."),
+        (10, "A man sits at the kitchen table reading the newspaper."),
+        (15, "A red car speeds down a wet highway at night."),
+        (20, "A man sits at a kitchen table reading a newspaper."),
+    ]
+    spans = vtn.compact_descriptions(descriptions, similarity=0.9)
+    assert spans == [(0, 10, descriptions[0][1]), (15, 15, descriptions[3][1]), (20, 20, descriptions[4][1])]
+    assert [vtn.format_snapshot(span) for span in spans[:2]] == [
+        f"[0–10s] {descriptions[0][1]}", f"[15s] {descriptions[3][1]}"]
+    # A similarity of 0 turns compaction off
+    assert vtn.compact_descriptions(descriptions, similarity=0) == [(t, t, text) for t, text in descriptions]
+
+
+def test_compact_descriptions_compares_with_the_run_start():
+    # Each text is close to the one before it, but the last is far from the first
+    descriptions = [(0, "aaaaaaaaaa"), (5, "aaaaaaaaab"), (10, "aaaaaaaabb"), (15, "aaaaaaabbb")]
+    assert vtn.compact_descriptions(descriptions, similarity=0.85) == [
+        (0, 5, "aaaaaaaaaa"), (10, 15, "aaaaaaaabb")]
+
+
+def test_compact_dialogue_collapses_repeated_lines():
+    segments = [(0.0, 2.0, "Thank you."), (2.0, 4.0, "thank you"), (4.0, 6.0, "Thank you!"),
+                (6.0, 7.0, "..."), (7.0, 8.0, "..."), (8.0, 9.0, "Goodbye."), (10.0, 11.0, "Thank you.")]
+    assert vtn.compact_dialogue(segments) == [
+        (0.0, 6.0, "Thank you."), (6.0, 7.0, "..."), (7.0, 8.0, "..."),
+        (8.0, 9.0, "Goodbye."), (10.0, 11.0, "Thank you.")]
+
+
+def test_compacted_timeline_queries_by_span_start():
+    spans = vtn.compact_descriptions([(0, "Same."), (5, "Same."), (10, "Other."), (15, "Other.")])
+    timeline = vtn.Timeline(spans, [])
+    assert timeline.snapshots_between(0, 10) == [(0, 5, "Same.")]
+    assert timeline.description_index(7) == 0
+    assert timeline.description_index(12) == 1
@@ -0,0 +1,36 @@
+"""
+Uploads are hashed while the request body is parsed and renamed into place,
+not spooled by Werkzeug and then copied.
+"""
+
+import hashlib
+import io
+
+import api_server
+
+
+def upload_context(data):
+    return api_server.app.test_request_context(
+        '/api/process-video', method='POST', content_type='multipart/form-data',
+        data={'video': (io.BytesIO(data), 'clip.mp4'), 'note': 'hello'})
+
+
+def test_upload_is_hashed_while_parsing(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_server, 'UPLOADS_DIR', tmp_path)
+    data = bytes(range(256)) * 8192  # 2 MB, several parser buffers
+    with upload_context(data):
+        video_file = api_server.request.files['video']
+        assert isinstance(video_file.stream, api_server.HashedUpload)
+        path = tmp_path / 'job.mp4'
+        assert api_server.save_upload(video_file, path) == hashlib.sha256(data).hexdigest()
+        assert api_server.request.form['note'] == 'hello'
+    assert path.read_bytes() == data
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_unsaved_upload_is_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_server, 'UPLOADS_DIR', tmp_path)
+    with upload_context(b'not a video'):
+        assert api_server.request.files['video'].read() == b'not a video'
+        assert len(list(tmp_path.glob('*.part'))) == 1
+    assert list(tmp_path.iterdir()) == []
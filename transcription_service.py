@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Warm Whisper transcription service.
+
+Loading Whisper (torch import, model deserialization, possibly a download) costs
+several seconds, and api_server.py starts a fresh video_to_narrative.py per job.
+This daemon keeps a pool of worker processes with the model already loaded and
+serves transcription requests over a local Unix socket. video_to_narrative.py
+uses it when the socket is up and falls back to loading Whisper itself otherwise.
+
+Requests are pickled, so the socket is only created with owner-only permissions
+and clients must authenticate with the TRANSCRIBE_AUTHKEY secret; the service
+won't start without one.
+
+Requests carry either a path to an audio file or a float32 NumPy array of 16 kHz
+mono samples; replies are the same (start, end, text) segments transcribe_audio
+returns. A request marked `segmented` has its array split at silences into
+overlapping windows that all workers transcribe at once (see split_windows).
+
+Usage:
+    python3 transcription_service.py --workers 2 --model tiny --threads 2
+"""
+
+import argparse
+import os
+import sys
+import threading
+from bisect import bisect_right
+from multiprocessing import AuthenticationError, get_context
+from multiprocessing.connection import Client, Listener
+
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "tiny")  # tiny | base | small | ... (accuracy vs speed)
+WHISPER_WORKERS = int(os.environ.get("WHISPER_WORKERS", "1"))  # Resident models (one per worker process)
+WHISPER_THREADS = int(os.environ.get("WHISPER_THREADS", "0"))  # Torch threads per worker, 0 = torch default
+TRANSCRIBE_WINDOW_SECONDS = 300  # Longest window when one transcription is split across workers
+TRANSCRIBE_OVERLAP_SECONDS = 5  # Audio shared by neighbouring windows, so no word is cut in half
+TRANSCRIBE_SPLIT_SEARCH_SECONDS = 15  # How far from each nominal boundary to look for silence
+TRANSCRIBE_MIN_SPLIT_SECONDS = 120  # Shorter audio is never split
+VAD_FRAME_MS = 30  # Speech-detection frame length
+VAD_THRESHOLD_DB = 10  # A frame is a speech candidate this far above the soundtrack's noise floor...
+VAD_MIN_DBFS = -50  # ...and at least this loud
+VAD_AGGRESSIVENESS = 2  # webrtcvad mode 0-3 when it is installed (higher rejects more music/noise)
+VAD_MIN_SPEECH_SECONDS = 0.3  # Shorter bursts are treated as noise
+VAD_PAD_SECONDS = 0.5  # Kept around each speech region so word edges aren't clipped
+VAD_MERGE_GAP_SECONDS = 2.0  # Regions closer than this are transcribed as one
+VAD_JOIN_SILENCE_SECONDS = 0.5  # Silence inserted between regions when they're packed together
+SAMPLE_RATE = 16000
+TRANSCRIBE_SOCKET = os.environ.get("TRANSCRIBE_SOCKET", "/tmp/movietobook-transcribe.sock")
+TRANSCRIBE_AUTHKEY = os.environ.get("TRANSCRIBE_AUTHKEY", "").encode()  # Shared secret; start.sh makes one per run
+
+_model = None  # Loaded once per worker process
+_load_error = None  # Why _model failed to load, raised by every task instead
+
+
+def load_whisper_model(name: str = None, threads: int = None):
+    """
+    Load a Whisper model, optionally pinning torch to `threads` threads.
+
+    Raises:
+        RuntimeError: If Whisper isn't installed
+    """
+    try:
+        import whisper
+    except ImportError:
+        raise RuntimeError("Whisper not installed. Run: pip install openai-whisper")
+
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return whisper.load_model(name or WHISPER_MODEL)
+
+
+def transcribe_with_model(model, audio) -> list[tuple[float, float, str]]:
+    """
+    Transcribe a file path or 16 kHz float32 array with a loaded Whisper model.
+
+    Returns:
+        List of tuples: (start_time, end_time, dialogue_text)
+    """
+    # Use more aggressive settings to catch quiet audio
+    result = model.transcribe(
+        audio,
+        word_timestamps=False,
+        fp16=False,  # Use FP32 for better accuracy
+        language=None,  # Auto-detect language
+        task="transcribe",  # Transcribe speech, not translate
+        verbose=False
+    )
+
+    # Extract segments with timestamps
+    segments = []
+    for segment in result.get("segments", []):
+        start = segment["start"]
+        end = segment["end"]
+        text = segment["text"].strip()
+        # Filter out very short segments (likely noise) but keep meaningful dialogue
+        if text and len(text) > 2:  # Only include non-empty segments with at least 3 chars
+            segments.append((start, end, text))
+    return segments
+
+
+def split_windows(samples, workers: int, window_seconds: float = None,
+                  overlap_seconds: float = None) -> list[tuple[int, int, int, int]]:
+    """
+    Plan overlapping windows over 16 kHz samples, cut at the quietest point near
+    each boundary.
+
+    There are enough windows to give every worker one and none is longer than
+    `window_seconds`. Each boundary moves to the lowest-energy half second within
+    TRANSCRIBE_SPLIT_SEARCH_SECONDS, and the windows on both sides extend
+    `overlap_seconds` past it.
+
+    Returns:
+        (start, end, owns_from, owns_to) sample indices per window: the window
+        decodes [start, end) but only keeps segments centred in [owns_from, owns_to)
+    """
+    import numpy as np
+
+    window_seconds = window_seconds or TRANSCRIBE_WINDOW_SECONDS
+    overlap_seconds = TRANSCRIBE_OVERLAP_SECONDS if overlap_seconds is None else overlap_seconds
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    total = len(samples)
+    count = max(workers, -(-total // int(window_seconds * SAMPLE_RATE)))
+    if total < TRANSCRIBE_MIN_SPLIT_SECONDS * SAMPLE_RATE or count < 2:
+        return [(0, total, 0, total)]
+
+    # Mean power per 20 ms frame, smoothed over half a second
+    hop = SAMPLE_RATE // 50
+    frames = np.asarray(samples[:total - total % hop], dtype=np.float32).reshape(-1, hop)
+    energy = np.convolve(np.square(frames).mean(axis=1), np.ones(25) / 25, mode='same')
+    search = int(TRANSCRIBE_SPLIT_SEARCH_SECONDS * 50)
+
+    cuts = []
+    for k in range(1, count):
+        nominal = k * len(energy) // count
+        low, high = max(nominal - search, 1), min(nominal + search, len(energy) - 1)
+        cuts.append((low + int(np.argmin(energy[low:high]))) * hop)
+
+    edges = [0] + cuts + [total]
+    return [(max(0, edges[i] - overlap), min(total, edges[i + 1] + overlap), edges[i], edges[i + 1])
+            for i in range(len(edges) - 1)]
+
+
+def detect_speech(samples) -> list[tuple[int, int]]:
+    """
+    Find the spans of 16 kHz samples that may contain speech.
+
+    Frames louder than both VAD_MIN_DBFS and the soundtrack's noise floor (its
+    10th-percentile frame energy) plus VAD_THRESHOLD_DB are candidates. If
+    webrtcvad is installed, candidates must also pass its speech classifier,
+    which rejects most music; without it only silence and quiet ambience are
+    skipped. Bursts shorter than VAD_MIN_SPEECH_SECONDS are dropped, the rest
+    are padded by VAD_PAD_SECONDS and merged across gaps under
+    VAD_MERGE_GAP_SECONDS.
+
+    Returns:
+        (start, end) sample indices of each region, in order
+    """
+    import numpy as np
+
+    hop = SAMPLE_RATE * VAD_FRAME_MS // 1000
+    count = len(samples) // hop
+    if count == 0:
+        return []
+    frames = np.asarray(samples[:count * hop], dtype=np.float32).reshape(count, hop)
+    energy = 10 * np.log10(np.square(frames).mean(axis=1) + 1e-10)
+    voiced = energy > max(VAD_MIN_DBFS, np.percentile(energy, 10) + VAD_THRESHOLD_DB)
+
+    try:
+        import webrtcvad
+    except ImportError:
+        webrtcvad = None
+    if webrtcvad is not None and voiced.any():
+        vad = webrtcvad.Vad(VAD_AGGRESSIVENESS)
+        pcm = (np.clip(frames, -1.0, 1.0) * 32767).astype('<i2')
+        for i in np.flatnonzero(voiced):
+            voiced[i] = vad.is_speech(pcm[i].tobytes(), SAMPLE_RATE)
+
+    # Runs of voiced frames -> padded sample spans, merged across short gaps
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    min_frames = VAD_MIN_SPEECH_SECONDS * 1000 / VAD_FRAME_MS
+    pad = int(VAD_PAD_SECONDS * SAMPLE_RATE)
+    gap = int(VAD_MERGE_GAP_SECONDS * SAMPLE_RATE)
+    regions = []
+    for first, last in zip(edges[::2], edges[1::2]):
+        if last - first < min_frames:
+            continue
+        start, end = max(0, first * hop - pad), min(len(samples), last * hop + pad)
+        if regions and start - regions[-1][1] < gap:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+
+def pack_speech(samples, regions: list[tuple[int, int]]):
+    """
+    Concatenate the speech regions of `samples`, separated by
+    VAD_JOIN_SILENCE_SECONDS of silence, for a single Whisper pass.
+
+    Returns:
+        (packed samples, offsets) where offsets hold (packed_start, start, length)
+        in seconds per region, for unpack_timestamps
+    """
+    import numpy as np
+
+    join = int(VAD_JOIN_SILENCE_SECONDS * SAMPLE_RATE)
+    packed = np.zeros(sum(end - start for start, end in regions) + join * (len(regions) - 1), dtype=np.float32)
+    offsets = []
+    position = 0
+    for start, end in regions:
+        packed[position:position + end - start] = samples[start:end]
+        offsets.append((position / SAMPLE_RATE, start / SAMPLE_RATE, (end - start) / SAMPLE_RATE))
+        position += end - start + join
+    return packed, offsets
+
+
+def unpack_timestamps(segments: list[tuple[float, float, str]],
+                      offsets: list[tuple[float, float, float]]) -> list[tuple[float, float, str]]:
+    """Map segments timed on packed audio back onto the original soundtrack."""
+    starts = [packed_start for packed_start, _, _ in offsets]
+
+    def original(t: float) -> float:
+        # Times in the inserted silence clamp to the end of the region before it
+        packed_start, start, length = offsets[max(0, bisect_right(starts, t) - 1)]
+        return start + min(max(t - packed_start, 0.0), length)
+
+    return [(original(start), original(end), text) for start, end, text in segments]
+
+
+def _normalized(text: str) -> str:
+    return ''.join(ch for ch in text.lower() if ch.isalnum())
+
+
+def merge_windows(windows: list[tuple[int, int, int, int]],
+                  results: list[list[tuple[float, float, str]]]) -> list[tuple[float, float, str]]:
+    """
+    Merge per-window segments (timed from their window's start) into one transcript.
+
+    Timestamps are rebased onto the whole file. Each window keeps only the
+    segments centred in the span it owns, and a segment repeating the text of the
+    one before it (the same line heard in both sides of an overlap) is dropped.
+    """
+    merged = []
+    for (start, _, owns_from, owns_to), segments in zip(windows, results):
+        offset = start / SAMPLE_RATE
+        for seg_start, seg_end, text in segments:
+            seg_start, seg_end = seg_start + offset, seg_end + offset
+            if not owns_from <= (seg_start + seg_end) / 2 * SAMPLE_RATE < owns_to:
+                continue
+            if merged and seg_start < merged[-1][1] + 1.0 and _normalized(text) == _normalized(merged[-1][2]):
+                continue
+            merged.append((seg_start, seg_end, text))
+    return merged
+
+
+def _init_worker(model_name: str, threads: int):
+    global _model, _load_error
+    # An initializer that raises makes the Pool respawn the worker forever
+    try:
+        _model = load_whisper_model(model_name, threads)
+    except Exception as e:
+        _load_error = f"{type(e).__name__}: {e}"
+
+
+def _transcribe_in_worker(audio) -> list[tuple[float, float, str]]:
+    if _model is None:
+        raise RuntimeError(f"Whisper failed to load in worker: {_load_error}")
+    return transcribe_with_model(_model, audio)
+
+
+def transcribe_segmented(pool, samples, workers: int) -> list[tuple[float, float, str]]:
+    """Split `samples` with split_windows, transcribe the windows on `pool` and merge them."""
+    windows = split_windows(samples, workers)
+    if len(windows) == 1:
+        return pool.apply(_transcribe_in_worker, (samples,))
+    results = pool.map(_transcribe_in_worker, [samples[start:end] for start, end, _, _ in windows], chunksize=1)
+    return merge_windows(windows, results)
+
+
+def transcribe_parallel(samples, workers: int, model_name: str = None,
+                        threads: int = None) -> list[tuple[float, float, str]]:
+    """
+    Transcribe 16 kHz samples on a throwaway pool of `workers` processes, for when
+    the service isn't running. Each worker loads its own model and gets an equal
+    share of the CPU's threads unless `threads` is given.
+    """
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    with get_context('spawn').Pool(workers, initializer=_init_worker,
+                                   initargs=(model_name or WHISPER_MODEL, threads)) as pool:
+        return transcribe_segmented(pool, samples, workers)
+
+
+def _ping(_=None) -> str | None:
+    return _load_error
+
+
+def transcribe_via_service(audio, socket_path: str = None,
+                           segmented: bool = False) -> list[tuple[float, float, str]] | None:
+    """
+    Transcribe through the running service.
+
+    Args:
+        audio: Path to an audio file, or a float32 array of 16 kHz mono samples
+        socket_path: Service socket (default: TRANSCRIBE_SOCKET)
+        segmented: Split a long array across all of the service's workers
+
+    Returns:
+        The segments, or None if no service is listening or TRANSCRIBE_AUTHKEY
+        isn't set (the caller should transcribe locally)
+
+    Raises:
+        RuntimeError: If the service accepted the request but transcription failed
+    """
+    socket_path = socket_path or TRANSCRIBE_SOCKET
+    if not TRANSCRIBE_AUTHKEY or not os.path.exists(socket_path):
+        return None
+    try:
+        conn = Client(socket_path, family='AF_UNIX', authkey=TRANSCRIBE_AUTHKEY)
+    except (OSError, EOFError, AuthenticationError):
+        return None
+    with conn:
+        if isinstance(audio, (str, os.PathLike)):
+            audio = os.path.abspath(audio)
+        else:
+            import numpy as np
+            audio = np.asarray(audio)  # A memmap would pickle its whole mapping as a subclass
+        conn.send({'audio': audio, 'segmented': segmented})
+        reply = conn.recv()
+    if 'error' in reply:
+        raise RuntimeError(f"Transcription service failed: {reply['error']}")
+    return reply['segments']
+
+
+def serve(socket_path: str = None, workers: int = None, model_name: str = None, threads: int = None):
+    """
+    Load `workers` models and answer requests on `socket_path` until interrupted.
+
+    Raises:
+        RuntimeError: If TRANSCRIBE_AUTHKEY isn't set, or Whisper fails to load
+    """
+    if not TRANSCRIBE_AUTHKEY:
+        raise RuntimeError("TRANSCRIBE_AUTHKEY isn't set; it must be shared with the clients")
+    socket_path = socket_path or TRANSCRIBE_SOCKET
+    workers = max(1, workers or WHISPER_WORKERS)
+    model_name = model_name or WHISPER_MODEL
+    threads = WHISPER_THREADS if threads is None else threads
+
+    # Spawn, not fork: each worker imports torch itself
+    pool = get_context('spawn').Pool(workers, initializer=_init_worker, initargs=(model_name, threads))
+    print(f"Loading {workers} x Whisper '{model_name}' ({threads or 'default'} threads each)...", flush=True)
+    # Block until the workers have their models loaded, so the first job doesn't pay for it
+    errors = [e for e in pool.map(_ping, range(workers), chunksize=1) if e]
+    if errors:
+        pool.terminate()
+        raise RuntimeError(f"Whisper failed to load: {errors[0]}")
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    # Created owner-only, so there's no moment where anyone else can connect
+    umask = os.umask(0o077)
+    try:
+        listener = Listener(socket_path, family='AF_UNIX', authkey=TRANSCRIBE_AUTHKEY)
+    finally:
+        os.umask(umask)
+    print(f"Transcription service listening on {socket_path}", flush=True)
+
+    def handle(conn):
+        with conn:
+            try:
+                request = conn.recv()
+                audio = request['audio']
+                if request.get('segmented') and workers > 1 and not isinstance(audio, str):
+                    segments = transcribe_segmented(pool, audio, workers)
+                else:
+                    segments = pool.apply(_transcribe_in_worker, (audio,))
+                conn.send({'segments': segments})
+            except Exception as e:
+                print(f"  Transcription failed: {e}", flush=True)
+                try:
+                    conn.send({'error': str(e)})
+                except OSError:
+                    pass
+
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:
+                # Bad authkey or a client that hung up mid-handshake
+                print(f"  Rejected connection: {e}", flush=True)
+                continue
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        pool.terminate()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Whisper transcriptions from resident models")
+    parser.add_argument("--socket", default=TRANSCRIBE_SOCKET, help=f"Unix socket path (default: {TRANSCRIBE_SOCKET})")
+    parser.add_argument("--workers", type=int, default=WHISPER_WORKERS,
+                        help=f"Worker processes, each with its own loaded model (default: {WHISPER_WORKERS})")
+    parser.add_argument("--model", default=WHISPER_MODEL, help=f"Whisper model size (default: {WHISPER_MODEL})")
+    parser.add_argument("--threads", type=int, default=WHISPER_THREADS,
+                        help="Torch threads per worker; 0 = torch default (default: %(default)s)")
+    args = parser.parse_args()
+    serve(args.socket, args.workers, args.model, args.threads)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(0)
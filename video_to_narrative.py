@@ -7,30 +7,80 @@ transcribes audio, and creates one flowing novel-like narrative.
 """
 
 import argparse
+import asyncio
 import base64
+import bisect
+import contextlib
+import difflib
+import itertools
+import hashlib
 import json
 import os
+import random
+import re
 import sys
 import time
 import math
 import subprocess
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import cv2
-from openai import OpenAI
+import numpy as np
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+import transcription_service  # noqa: E402 - reads WHISPER_* / TRANSCRIBE_* from the environment loaded above
+
 # Settings
-CHUNK_DURATION = 180  # 3 minutes — small chunks so narrative API calls finish (avoids stuck at 82%)
-MAX_DESCRIPTIONS_PER_CHUNK = 35  # Cap descriptions per chunk so prompt stays small and API returns
+NARRATIVE_CHUNK_TOKEN_BUDGET = 4000  # Prompt tokens of snapshots + dialogue per narrative call (--chunk-tokens)
+PROMPT_COMPACTION_SIMILARITY = 0.8  # Consecutive descriptions at least this similar share one [start–end s] line (--compact-similarity, 0 disables)
+NARRATIVE_CHUNK_MIN_FILL = 0.6  # A chunk may close early at a scene cut or pause once this full
+CHARS_PER_TOKEN = 4.0  # Token estimate for English prompts when tiktoken isn't installed
+SCENE_CUT_MIN_DISTANCE = 24  # dHash bits between consecutive frames that mark a hard cut
+TRANSCRIBE_WORKERS = int(os.environ.get("TRANSCRIBE_WORKERS", "1"))  # Processes splitting one transcription at silences (--transcribe-workers)
 REQUEST_DELAY = 0.2   # Seconds between API calls (reduced for speed)
+DESCRIBE_MODEL = "gpt-5-nano"
+DESCRIBE_CONCURRENCY = 8  # Frame descriptions in flight at once (--concurrency, 1 = sequential)
+DESCRIBE_RPM = 500  # Requests per minute budget for frame descriptions
+DESCRIBE_TPM = 200000  # Tokens per minute budget for frame descriptions
+DESCRIBE_TOKENS_ESTIMATE = 1200  # Prompt + image + completion tokens per frame, corrected from usage
+DESCRIBE_BATCH_SIZE = 4  # Consecutive frames per vision request (--batch-size, 1 = one frame per request)
+DESCRIPTION_CACHE_PATH = os.environ.get(
+    "DESCRIPTION_CACHE_PATH", str(Path(__file__).parent / 'cache' / 'frame_descriptions.sqlite'))
+DESCRIPTION_CACHE_MAX_ENTRIES = 500000  # LRU-evicted beyond this (~100 bytes per entry)
 MAX_RETRIES = 5
-INITIAL_RETRY_DELAY = 5
+INITIAL_RETRY_DELAY = 2  # Base for decorrelated-jitter backoff when the server sends no Retry-After
+MAX_RETRY_DELAY = 60  # Cap on a single backoff wait (seconds)
+CIRCUIT_BREAKER_THRESHOLD = 3  # Consecutive overload errors (5xx/529) before pausing every caller
+CIRCUIT_BREAKER_COOLDOWN = 30  # Seconds the breaker stays open after tripping
 NARRATIVE_API_TIMEOUT = 600  # 10 minutes per narrative API call (long episodes need time)
+NARRATIVE_CONCURRENCY = 4  # Chunk narratives / merges in flight at once (--narrative-concurrency)
+COMBINE_GROUP_SIZE = 4  # Narratives merged per combine call; larger stories are reduced level by level
+NARRATIVE_STREAM = True  # Stream the final narrative into <output>_partial.txt as it's generated (--no-stream)
+CHECKPOINT_VERSION = 1  # Bump when the checkpoint record format changes
+RESUME_MAX_ATTEMPTS = 3  # --resume gives up (and drops the checkpoint) after this many resumes
+NARRATIVE_MIN_LENGTH = 500  # Narrative replies shorter than this are treated as failed and retried
+FRAME_SAMPLING_STRATEGY = "auto"  # auto | grab | keyframe | seek (see choose_sampling_strategy)
+KEYFRAME_SEEK_GOP_FACTOR = 1.0  # Seek once the gap between samples is longer than this many GOPs
+ASSUMED_GOP_FRAMES = 250  # x264 default keyint, used when ffprobe can't tell us the real GOP
+VISION_MAX_EDGE = 512  # Long edge of frames sent to the vision model (--vision-max-edge, 0 = native)
+VISION_JPEG_QUALITY = 70  # JPEG quality of frames sent to the vision model (--vision-quality)
+VISION_IMAGE_DETAIL = "low"  # Vision image detail: low (fixed 85 tokens, 512px) | high | auto (--image-detail)
+FRAME_BACKEND = os.environ.get("FRAME_BACKEND", "opencv")  # opencv | ffmpeg (--frame-backend)
+AUDIO_SAMPLE_RATE = 16000  # Whisper's input rate
+AUDIO_MEMMAP_SECONDS = 3600  # Longer soundtracks are staged in a memory-mapped temp file
+STAGE_LIMITS = os.environ.get("STAGE_LIMITS", "")  # e.g. "transcribe=1,frames=2": runs on this host allowed in a stage at once
+STAGE_LOCK_DIR = os.environ.get("STAGE_LOCK_DIR", os.path.join(tempfile.gettempdir(), "movietobook-stages"))
+FRAME_QUEUE_SIZE = 4  # Frames decoded ahead of the describe stage (bounds peak memory)
+DEDUPE_MAX_DISTANCE = 5  # Max dHash bit difference (of 64) to treat frames as duplicates; -1 disables
+PROGRESS_SNAPSHOT_SECONDS = 5  # Min seconds between <output>_progress.json rewrites (step changes and the end always write)
+DEDUPE_MAX_BRIGHTNESS_DELTA = 24  # Flat frames (black, solid color) all hash to 0 - also compare mean brightness
 
 
 def calculate_frame_interval(duration: float) -> float:
@@ -78,142 +128,217 @@ def get_video_info(video_path: str) -> tuple[float, int, float]:
     return fps, total_frames, duration
 
 
-def extract_audio(video_path: str, output_path: str = None, progress_callback=None) -> str:
-    """Extract audio from video using FFmpeg and save as WAV."""
-    if output_path is None:
-        # Create temporary file
-        fd, output_path = tempfile.mkstemp(suffix='.wav')
-        os.close(fd)
-    
-    print(f"  Extracting audio to: {output_path}")
-    sys.stdout.flush()
+def _ffmpeg_error(returncode: int, stderr: str, video_path: str,
+                  expect_audio: bool = True) -> RuntimeError:
+    """Turn a failed FFmpeg run's stderr into a readable error."""
+    error_msg = (stderr or '').strip() or "FFmpeg returned non-zero exit code with no stderr output"
+    if "No such file" in error_msg:
+        return RuntimeError(f"Video file not found: {video_path}")
+    elif "Invalid data" in error_msg or "could not find codec" in error_msg:
+        return RuntimeError(f"Video file appears corrupted or unsupported")
+    elif expect_audio and ("No audio stream" in error_msg or "Stream #0" not in error_msg):
+        return RuntimeError(f"Video has no audio track")
+    else:
+        return RuntimeError(f"FFmpeg failed (code {returncode}): {error_msg[:300]}")
+
+
+def _start_progress_ticker(progress_callback):
+    """
+    Tick audio-extraction progress by elapsed time while FFmpeg runs.
     
-    try:
-        # Run FFmpeg with stderr captured (for errors). Do NOT capture stdout.
-        # While FFmpeg runs, tick progress via elapsed time so UI never sits at 10% forever.
-        import threading
+    Returns:
+        (stop_event, thread) - set the event and join the thread when FFmpeg exits
+    """
+    import threading
 
-        cmd = [
-            'ffmpeg', '-i', video_path,
-            '-vn',
-            '-acodec', 'pcm_s16le',
-            '-ar', '16000',
-            '-ac', '1',
-            '-y',
-            output_path,
-            '-loglevel', 'error'
-        ]
-
-        start_time = time.time()
-        stop_event = threading.Event()
-
-        def tick_progress():
-            if not progress_callback:
-                return
-            # Smoothly tick 10 -> 19 over ~90 seconds, then hold at 19 until done.
-            # (We only set 20 when FFmpeg has actually completed.)
-            while not stop_event.is_set():
-                elapsed = time.time() - start_time
-                # after 3s start ticking
-                if elapsed >= 3:
-                    pct = min(10 + int((elapsed - 3) / 10), 19)
-                    progress_callback(pct)
-                time.sleep(2)
-
-        t = threading.Thread(target=tick_progress, daemon=True)
-        t.start()
-
-        # Execute FFmpeg (timeout safety)
-        try:
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=3600,  # 1 hour max for audio extraction
-            )
-        finally:
-            stop_event.set()
-            t.join(timeout=2)
+    start_time = time.time()
+    stop_event = threading.Event()
 
-        # Mark end of audio extraction stage
-        if progress_callback:
-            progress_callback(20)
+    def tick_progress():
+        if not progress_callback:
+            return
+        # Smoothly tick 10 -> 19 over ~90 seconds, then hold at 19 until done.
+        # (We only set 20 when FFmpeg has actually completed.)
+        while not stop_event.is_set():
+            elapsed = time.time() - start_time
+            # after 3s start ticking
+            if elapsed >= 3:
+                pct = min(10 + int((elapsed - 3) / 10), 19)
+                progress_callback(pct)
+            time.sleep(2)
 
-        if result.returncode != 0:
-            error_msg = (result.stderr or '').strip() or "FFmpeg returned non-zero exit code with no stderr output"
-            if "No such file" in error_msg:
-                raise RuntimeError(f"Video file not found: {video_path}")
-            elif "Invalid data" in error_msg or "could not find codec" in error_msg:
-                raise RuntimeError(f"Video file appears corrupted or unsupported")
-            elif "No audio stream" in error_msg or "Stream #0" not in error_msg:
-                raise RuntimeError(f"Video has no audio track")
-            else:
-                raise RuntimeError(f"FFmpeg failed (code {result.returncode}): {error_msg[:300]}")
-        
-        # Verify output file was created and has content
-        if not os.path.exists(output_path):
-            raise RuntimeError("FFmpeg completed but output file was not created")
-        
-        file_size = os.path.getsize(output_path)
-        if file_size == 0:
-            raise RuntimeError("FFmpeg created empty audio file - video may have no audio track")
-        
-        print(f"  ✓ Audio extracted successfully ({file_size / 1024 / 1024:.2f} MB)")
-        sys.stdout.flush()
-        return output_path
-        
+    t = threading.Thread(target=tick_progress, daemon=True)
+    t.start()
+    return stop_event, t
+
+
+def _read_pcm(stream, duration: float = None) -> np.ndarray:
+    """
+    Read 16-bit little-endian mono PCM from a pipe straight into a float32 array.
+    
+    Samples are converted chunk by chunk into a buffer sized from `duration`, so
+    the int16 stream is never held in full. Audio longer than AUDIO_MEMMAP_SECONDS
+    goes into a memory-mapped (already unlinked) temp file instead of anonymous
+    memory.
+    
+    Returns:
+        float32 samples in [-1, 1) at AUDIO_SAMPLE_RATE
+    """
+    capacity = int((duration or 0) * AUDIO_SAMPLE_RATE * 1.01) + 5 * AUDIO_SAMPLE_RATE
+    if duration and duration > AUDIO_MEMMAP_SECONDS:
+        with tempfile.TemporaryFile() as backing:
+            samples = np.memmap(backing, dtype=np.float32, mode='w+', shape=(capacity,))
+    else:
+        samples = np.empty(capacity, dtype=np.float32)
+    
+    filled = 0
+    overflow = []  # Only used if the container under-reported its duration
+    carry = b''
+    while True:
+        data = stream.read(1 << 20)
+        if not data:
+            break
+        data = carry + data
+        usable = len(data) - len(data) % 2
+        carry = data[usable:]
+        chunk = np.frombuffer(data, dtype='<i2', count=usable // 2).astype(np.float32)
+        chunk /= 32768.0
+        room = min(len(chunk), capacity - filled)
+        samples[filled:filled + room] = chunk[:room]
+        filled += room
+        if room < len(chunk):
+            overflow.append(chunk[room:])
+    
+    if overflow:
+        return np.concatenate([samples[:filled], *overflow])
+    return samples[:filled]
+
+
+def load_audio(video_path: str, duration: float = None, progress_callback=None) -> np.ndarray:
+    """
+    Decode the video's audio to 16 kHz mono float32 in memory, ready for Whisper.
+    
+    FFmpeg writes raw s16le to a pipe that is read directly into a NumPy array,
+    replacing the temporary WAV (and Whisper's second FFmpeg decode of it).
+    
+    Args:
+        video_path: Path to video file
+        duration: Video duration in seconds, used to size the buffer
+        progress_callback: Optional callback(percent) ticked while FFmpeg runs
+    
+    Returns:
+        float32 samples at AUDIO_SAMPLE_RATE
+    """
+    print("  Decoding audio to memory (16 kHz mono)...")
+    sys.stdout.flush()
+    
+    cmd = [
+        'ffmpeg', '-nostdin', '-loglevel', 'error',
+        '-i', video_path,
+        '-map', '0:a:0', '-vn',
+        '-ac', '1',
+        '-ar', str(AUDIO_SAMPLE_RATE),
+        '-f', 's16le', '-',
+    ]
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     except FileNotFoundError:
         raise RuntimeError("FFmpeg not found. Please install FFmpeg: brew install ffmpeg")
-    except Exception as e:
-        if isinstance(e, RuntimeError):
-            raise
-        raise RuntimeError(f"Unexpected error extracting audio: {e}")
+    
+    # While FFmpeg runs, tick progress via elapsed time so UI never sits at 10% forever
+    stop_event, t = _start_progress_ticker(progress_callback)
+    try:
+        stderr_lines, stderr_thread = _drain_stderr(process)
+        samples = _read_pcm(process.stdout, duration)
+        process.wait(timeout=3600)  # 1 hour max for audio extraction
+        stderr_thread.join(timeout=2)
+    finally:
+        stop_event.set()
+        t.join(timeout=2)
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    
+    # Mark end of audio extraction stage
+    if progress_callback:
+        progress_callback(20)
+    
+    if process.returncode != 0:
+        raise _ffmpeg_error(process.returncode, ''.join(stderr_lines), video_path)
+    if len(samples) == 0:
+        raise RuntimeError("FFmpeg decoded no audio - video may have no audio track")
+    
+    print(f"  ✓ Audio decoded ({len(samples) / AUDIO_SAMPLE_RATE:.0f}s, {samples.nbytes / 1024 / 1024:.2f} MB in memory)")
+    sys.stdout.flush()
+    return samples
+
 
+TRANSCRIBE_STATS = {'audio_seconds': 0.0, 'speech_seconds': 0.0}
 
-def transcribe_audio(audio_path: str) -> list[tuple[float, float, str]]:
+
+def transcribe_audio(audio, workers: int = 1, vad: bool = True) -> list[tuple[float, float, str]]:
     """
     Transcribe audio using Whisper and return list of (start, end, text) segments.
     
+    `audio` is a file path or a 16 kHz float32 array from load_audio().
+    
+    Uses the warm transcription service (transcription_service.py) when it is
+    running, so the model isn't loaded again for every job; otherwise loads
+    WHISPER_MODEL in this process.
+    
+    With workers > 1 an array is split at silences into overlapping windows that
+    are transcribed in parallel (by all of the service's workers, or by a local
+    pool of `workers` processes) and merged back into one timeline.
+    
+    With `vad`, an array first goes through a speech-detection pass: only the
+    regions that may hold speech are packed together and sent to Whisper (and
+    timestamps mapped back), and Whisper is skipped entirely when there are none.
+    
     Returns:
         List of tuples: (start_time, end_time, dialogue_text)
     """
-    # Lazy import Whisper only when needed
-    try:
-        import whisper
-    except ImportError:
-        raise RuntimeError("Whisper not installed. Run: pip install openai-whisper")
+    offsets = None
+    if vad and not isinstance(audio, (str, os.PathLike)):
+        regions = transcription_service.detect_speech(audio)
+        speech = sum(end - start for start, end in regions)
+        TRANSCRIBE_STATS['audio_seconds'] = len(audio) / AUDIO_SAMPLE_RATE
+        TRANSCRIBE_STATS['speech_seconds'] = speech / AUDIO_SAMPLE_RATE
+        if not regions:
+            print("  No speech detected - skipping Whisper")
+            return []
+        print(f"  Speech detection: {len(regions)} regions, {TRANSCRIBE_STATS['speech_seconds']:.0f}s of "
+              f"{TRANSCRIBE_STATS['audio_seconds']:.0f}s audio sent to Whisper")
+        if speech < len(audio):
+            audio, offsets = transcription_service.pack_speech(audio, regions)
     
-    print("  Loading Whisper model (this may take a moment on first run - downloading ~75MB)...", end=' ', flush=True)
+    segments = None
     try:
-        # Use 'tiny' model for faster transcription (much faster than 'base')
-        model = whisper.load_model("tiny")
-        print("done")
+        print("  Transcribing audio via the transcription service...", end=' ', flush=True)
+        segments = transcription_service.transcribe_via_service(audio, segmented=workers > 1)
+        print("done" if segments is not None else "not running")
     except Exception as e:
         print(f"failed: {e}")
-        raise
     
-    print("  Transcribing audio (this may take a while)...", end=' ', flush=True)
-    # Use more aggressive settings to catch quiet audio
-    result = model.transcribe(
-        audio_path, 
-        word_timestamps=False,
-        fp16=False,  # Use FP32 for better accuracy
-        language=None,  # Auto-detect language
-        task="transcribe",  # Transcribe speech, not translate
-        verbose=False
-    )
-    print("done")
-    
-    # Extract segments with timestamps
-    segments = []
-    for segment in result.get("segments", []):
-        start = segment["start"]
-        end = segment["end"]
-        text = segment["text"].strip()
-        # Filter out very short segments (likely noise) but keep meaningful dialogue
-        if text and len(text) > 2:  # Only include non-empty segments with at least 3 chars
-            segments.append((start, end, text))
+    if segments is None and workers > 1 and not isinstance(audio, (str, os.PathLike)):
+        print(f"  Transcribing audio in parallel ({workers} Whisper '{transcription_service.WHISPER_MODEL}' workers)...", end=' ', flush=True)
+        segments = transcription_service.transcribe_parallel(audio, workers)
+        print("done")
+    
+    if segments is None:
+        print(f"  Loading Whisper model '{transcription_service.WHISPER_MODEL}' (this may take a moment on first run)...", end=' ', flush=True)
+        try:
+            model = transcription_service.load_whisper_model()
+            print("done")
+        except Exception as e:
+            print(f"failed: {e}")
+            raise
+        
+        print("  Transcribing audio (this may take a while)...", end=' ', flush=True)
+        segments = transcription_service.transcribe_with_model(model, audio)
+        print("done")
+    
+    if offsets:
+        segments = transcription_service.unpack_timestamps(segments, offsets)
     
     if len(segments) == 0:
         print("  ⚠️  WARNING: No dialogue detected. The video may have:")
@@ -225,14 +350,18 @@ def transcribe_audio(audio_path: str) -> list[tuple[float, float, str]]:
     return segments
 
 
-def get_dialogue_for_time_range(transcription: list[tuple[float, float, str]], 
+def get_dialogue_for_time_range(transcription: 'list[tuple[float, float, str]] | Timeline',
                                  start_time: float, end_time: float) -> list[str]:
     """
     Get dialogue segments that fall within the specified time range.
     
+    A Timeline answers with an indexed query; a plain segment list is scanned.
+    
     Returns:
         List of dialogue strings
     """
+    if isinstance(transcription, Timeline):
+        return transcription.dialogue_between(start_time, end_time)
     dialogue = []
     for seg_start, seg_end, text in transcription:
         # Check if segment overlaps with the time range
@@ -241,110 +370,1675 @@ def get_dialogue_for_time_range(transcription: list[tuple[float, float, str]],
     return dialogue
 
 
+class Timeline:
+    """
+    Frame descriptions and dialogue segments indexed by time.
+    
+    Times are kept in sorted NumPy arrays, so a range query is a binary search
+    plus a slice rather than a scan of every line. Descriptions are points
+    (timestamp, text), or spans (timestamp, until, text) after compaction, looked
+    up by their first timestamp; segments are intervals (start, end, text) sorted
+    by start, with a running maximum of their ends so an overlap query can jump
+    straight to the first segment that may still reach into the range.
+    
+    to_dict()/from_dict() and save()/load() give a columnar JSON form.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, descriptions=(), segments=()):
+        descriptions = sorted(descriptions, key=lambda item: item[0])
+        segments = sorted(segments, key=lambda item: item[0])
+        self.times = np.asarray([item[0] for item in descriptions], dtype=None if descriptions else np.float64)
+        self.until = np.asarray([item[-2] for item in descriptions], dtype=self.times.dtype)
+        self.texts = [item[-1] for item in descriptions]
+        self.starts = np.asarray([start for start, _, _ in segments], dtype=np.float64)
+        self.ends = np.asarray([end for _, end, _ in segments], dtype=np.float64)
+        self.lines = [text for _, _, text in segments]
+        self._reach = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+    
+    @property
+    def descriptions(self) -> list[tuple[int, str]]:
+        return list(zip(self.times.tolist(), self.texts))
+    
+    @property
+    def snapshots(self) -> list[tuple[int, int, str]]:
+        return list(zip(self.times.tolist(), self.until.tolist(), self.texts))
+    
+    @property
+    def segments(self) -> list[tuple[float, float, str]]:
+        return list(zip(self.starts.tolist(), self.ends.tolist(), self.lines))
+    
+    def descriptions_between(self, start: float, end: float) -> list[tuple[int, str]]:
+        """Descriptions with start <= timestamp < end."""
+        first, last = np.searchsorted(self.times, [start, end], side='left')
+        return list(zip(self.times[first:last].tolist(), self.texts[first:last]))
+    
+    def snapshots_between(self, start: float, end: float) -> list[tuple[int, int, str]]:
+        """(timestamp, until, text) for descriptions with start <= timestamp < end."""
+        first, last = np.searchsorted(self.times, [start, end], side='left')
+        return list(zip(self.times[first:last].tolist(), self.until[first:last].tolist(), self.texts[first:last]))
+    
+    def segments_between(self, start: float, end: float) -> list[tuple[float, float, str]]:
+        """Segments overlapping the range (segment start < end and segment end > start)."""
+        first = int(np.searchsorted(self._reach, start, side='right'))
+        last = int(np.searchsorted(self.starts, end, side='left'))
+        return [(self.starts[k].item(), self.ends[k].item(), self.lines[k])
+                for k in first + np.flatnonzero(self.ends[first:last] > start)]
+    
+    def dialogue_between(self, start: float, end: float) -> list[str]:
+        return [text for _, _, text in self.segments_between(start, end)]
+    
+    def description_index(self, t: float) -> int:
+        """Index of the last description at or before `t` (-1 if none)."""
+        return int(np.searchsorted(self.times, t, side='right')) - 1
+    
+    def in_dialogue(self, t: float) -> bool:
+        """Whether `t` falls inside continuous speech (touching segments count as one)."""
+        before = int(np.searchsorted(self.starts, t, side='left'))
+        if before == 0:
+            return False
+        reach = self._reach[before - 1]
+        return reach > t or (reach == t and before < len(self.starts) and self.starts[before] == t)
+    
+    def to_dict(self) -> dict:
+        return {'version': self.VERSION,
+                'descriptions': {'t': self.times.tolist(), 'until': self.until.tolist(), 'text': self.texts},
+                'segments': {'start': self.starts.tolist(), 'end': self.ends.tolist(), 'text': self.lines}}
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Timeline':
+        if data.get('version') != cls.VERSION:
+            raise ValueError(f"Unsupported timeline version: {data.get('version')}")
+        descriptions, segments = data['descriptions'], data['segments']
+        return cls(zip(descriptions['t'], descriptions.get('until', descriptions['t']), descriptions['text']),
+                   zip(segments['start'], segments['end'], segments['text']))
+    
+    def save(self, path: str):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path: str) -> 'Timeline':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def format_snapshot(item: tuple) -> str:
+    """Prompt line for a (timestamp, text) description or a (start, until, text) span."""
+    start, until, text = item if len(item) == 3 else (item[0], item[0], item[1])
+    return f"[{start}–{until}s] {text}" if until != start else f"[{start}s] {text}"
+
+
+def _similar(a: str, b: str, threshold: float) -> bool:
+    if a == b:
+        return True
+    matcher = difflib.SequenceMatcher(None, a.lower(), b.lower(), autojunk=False)
+    # Cheap upper bounds first - most consecutive pairs differ a lot or not at all
+    return (matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold
+            and matcher.ratio() >= threshold)
+
+
+def compact_descriptions(descriptions: list[tuple[int, str]],
+                         similarity: float = None) -> list[tuple[int, int, str]]:
+    """
+    Merge runs of consecutive near-identical descriptions into spans.
+    
+    Each description is compared with the first one of the current run (so a
+    slowly drifting scene doesn't chain forever) using difflib's ratio; runs keep
+    that first text and cover every timestamp up to their last member.
+    
+    Returns:
+        (start, until, text) per run, in time order
+    """
+    similarity = PROMPT_COMPACTION_SIMILARITY if similarity is None else similarity
+    runs = []
+    for ts, desc in descriptions:
+        if runs and similarity > 0 and _similar(runs[-1][2], desc, similarity):
+            runs[-1][1] = ts
+        else:
+            runs.append([ts, ts, desc])
+    return [tuple(run) for run in runs]
+
+
+def compact_dialogue(segments: list[tuple[float, float, str]]) -> list[tuple[float, float, str]]:
+    """Collapse consecutive segments repeating the same line (Whisper loops) into one."""
+    compacted = []
+    for start, end, text in segments:
+        key = ''.join(ch for ch in text.lower() if ch.isalnum())
+        if compacted and key and key == compacted[-1][3]:
+            compacted[-1][1] = max(compacted[-1][1], end)
+        else:
+            compacted.append([start, end, text, key])
+    return [(start, end, text) for start, end, text, _ in compacted]
+
+
+def probe_keyframes(video_path: str, fps: float) -> list[int] | None:
+    """
+    List the frame numbers of the video's keyframes using ffprobe.
+    
+    Only packet headers are read (no decoding), so this takes a second or two
+    even for feature-length files.
+    
+    Falls back to OpenCV's raw packet mode when ffprobe isn't installed.
+    
+    Returns:
+        Sorted keyframe frame numbers, or None if the keyframes can't be probed
+    """
+    if fps <= 0:
+        return None
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=p=0',
+        video_path,
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, timeout=300)
+    except FileNotFoundError:
+        return _probe_keyframes_opencv(video_path)
+    except subprocess.TimeoutExpired:
+        return None
+    if result.returncode != 0:
+        return None
+    
+    keyframes = []
+    packets = 0
+    for line in result.stdout.splitlines():
+        parts = line.strip().split(',')
+        if len(parts) < 2 or parts[0] in ('', 'N/A'):
+            continue
+        packets += 1
+        if 'K' in parts[1]:
+            keyframes.append(int(round(float(parts[0]) * fps)))
+    if not packets:
+        return None
+    keyframes.sort()
+    return keyframes
+
+
+def _probe_keyframes_opencv(video_path: str) -> list[int] | None:
+    """Fallback keyframe scan through OpenCV's raw (undecoded) packet mode."""
+    if not hasattr(cv2, 'CAP_PROP_LRF_HAS_KEY_FRAME'):
+        return None
+    cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    if not cap.isOpened():
+        return None
+    keyframes = []
+    index = 0
+    try:
+        while cap.grab():
+            if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(index)
+            index += 1
+    finally:
+        cap.release()
+    return keyframes if index else None
+
+
+def choose_sampling_strategy(fps: float, interval: float, keyframes: list[int] | None,
+                             total_frames: int = 0) -> str:
+    """
+    Pick how to walk the video for a given sampling interval.
+    
+    - "seek": intra-only codecs (every frame is a keyframe), so a seek costs one decode
+    - "grab": the gap between samples is shorter than a GOP, so grabbing forward
+      without converting frames is cheaper than seeking back to a keyframe
+    - "keyframe": the gap spans whole GOPs, so seek whenever a keyframe lies
+      between two samples and grab forward otherwise
+    
+    Returns:
+        One of "seek", "grab" or "keyframe"
+    """
+    step_frames = interval * fps
+    if keyframes is not None:
+        if total_frames and len(keyframes) >= total_frames * 0.95:
+            return "seek"
+        if len(keyframes) > 1:
+            gaps = sorted(b - a for a, b in zip(keyframes, keyframes[1:]) if b > a)
+            gop = gaps[len(gaps) // 2] if gaps else ASSUMED_GOP_FRAMES
+            if gop <= 1:
+                return "seek"
+        else:
+            # A single keyframe means one long GOP - seeking would decode from the start
+            return "grab"
+    else:
+        gop = ASSUMED_GOP_FRAMES
+    
+    if step_frames > gop * KEYFRAME_SEEK_GOP_FACTOR:
+        return "keyframe" if keyframes else "seek"
+    return "grab"
+
+
+def _encode_jpeg(frame) -> memoryview:
+    """
+    Shape a decoded BGR frame for the vision model: downscale to VISION_MAX_EDGE
+    and encode as JPEG at VISION_JPEG_QUALITY.
+    
+    Returns a zero-copy, flat view of the encoded buffer (bytes-like) instead of
+    copying it with tobytes(); OpenCV 4.x hands back an (N, 1) array.
+    """
+    height, width = frame.shape[:2]
+    if VISION_MAX_EDGE and max(height, width) > VISION_MAX_EDGE:
+        scale = VISION_MAX_EDGE / max(height, width)
+        frame = cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, VISION_JPEG_QUALITY])
+    return buffer.reshape(-1).data
+
+
+def _sample_targets(start_time: float, end_time: float, fps: float, 
+                    interval: float) -> list[tuple[int, int]]:
+    """Return (timestamp, frame_number) pairs for every sample in the range."""
+    targets = []
+    current_time = start_time
+    while current_time < end_time:
+        targets.append((int(current_time), int(current_time * fps)))
+        current_time += interval
+    return targets
+
+
+def _sample_frames_seek(cap, targets: list[tuple[int, int]]):
+    """Seek to every target frame (one decoder seek per sample). Yields (timestamp, frame_bytes)."""
+    for timestamp, frame_number in targets:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        ret, frame = cap.read()
+        if ret:
+            yield timestamp, _encode_jpeg(frame)
+
+
+def _sample_frames_forward(cap, targets: list[tuple[int, int]],
+                           keyframes: list[int] | None = None):
+    """
+    Walk forward through the video, grabbing (decoding without converting) every
+    frame and retrieving only the target ones. Yields (timestamp, frame_bytes).
+    
+    If keyframes are given, seek instead whenever a keyframe lies between the
+    current position and the target, so the decoder restarts from that keyframe
+    rather than decoding the whole gap.
+    """
+    pos = 0  # Index of the next frame grab() will return
+    last_number, last_bytes = -1, None
+    
+    if targets and targets[0][1] > 0 and not keyframes:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, targets[0][1])
+        pos = targets[0][1]
+    
+    for timestamp, frame_number in targets:
+        if frame_number == last_number:
+            # Sub-frame interval: same source frame as the previous sample
+            yield timestamp, last_bytes
+            continue
+        if keyframes:
+            # A keyframe between here and the target means a seek decodes less
+            # than grabbing through the gap (OpenCV's seek resumes from that keyframe)
+            k = bisect.bisect_right(keyframes, frame_number) - 1
+            if k >= 0 and keyframes[k] > pos:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                pos = frame_number
+        if frame_number < pos:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            pos = frame_number
+        
+        ok = True
+        while pos < frame_number:
+            if not cap.grab():
+                ok = False
+                break
+            pos += 1
+        if not ok or not cap.grab():
+            break  # End of stream (container frame count can overestimate)
+        pos += 1
+        ret, frame = cap.retrieve()
+        if not ret:
+            continue
+        last_number, last_bytes = frame_number, _encode_jpeg(frame)
+        yield timestamp, last_bytes
+
+
+def _ffmpeg_frame_output_args(interval: float) -> list[str]:
+    """FFmpeg output options that sample 1 frame per interval, downscale and emit MJPEG on stdout."""
+    filters = f"fps=fps=1/{interval!r}"
+    edge = VISION_MAX_EDGE
+    if edge:
+        filters += f",scale='if(gt(iw,ih),min(iw,{edge}),-2)':'if(gt(iw,ih),-2,min(ih,{edge}))'"
+    # mjpeg -q:v runs 2 (best) to 31 (worst); quality 85 ~ 3, 70 ~ 6
+    qscale = min(31, max(2, round((100 - VISION_JPEG_QUALITY) / 5)))
+    return [
+        '-map', '0:v:0',
+        '-vf', filters,
+        '-c:v', 'mjpeg',
+        '-q:v', str(qscale),
+        '-f', 'image2pipe',
+        'pipe:1',
+    ]
+
+
+def _read_jpeg_stream(stream, chunk_size: int = 1 << 16):
+    """
+    Split a concatenated MJPEG byte stream into individual JPEG images.
+    
+    FFmpeg's mjpeg encoder byte-stuffs 0xFF inside entropy-coded data, so the
+    end-of-image marker (FF D9) only appears at the end of each image.
+    """
+    buffer = bytearray()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        search_from = max(0, len(buffer) - 1)
+        buffer += chunk
+        while True:
+            end = buffer.find(b'\xff\xd9', search_from)
+            if end < 0:
+                break
+            start = buffer.find(b'\xff\xd8')
+            if 0 <= start < end:
+                yield bytes(buffer[start:end + 2])
+            del buffer[:end + 2]
+            search_from = 0
+
+
+def _iter_ffmpeg_frames(process, start_time: float, interval: float, max_frames: int):
+    """Read JPEG frames from an FFmpeg process' stdout and yield (timestamp, frame_bytes)."""
+    for i, jpeg in enumerate(_read_jpeg_stream(process.stdout)):
+        if i >= max_frames:
+            continue  # Keep draining so FFmpeg can finish writing other outputs
+        yield int(start_time + i * interval), jpeg
+
+
+def _drain_stderr(process):
+    """
+    Collect a process' stderr on a background thread (avoids pipe deadlocks while
+    the main thread reads stdout).
+    
+    Returns:
+        (lines, thread) - join the thread before reading lines
+    """
+    import threading
+    
+    lines = []
+    
+    def reader():
+        for line in iter(process.stderr.readline, b''):
+            lines.append(line.decode('utf-8', errors='replace'))
+    
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    return lines, thread
+
+
+def extract_frames_ffmpeg(video_path: str, start_time: float, end_time: float,
+                          interval: float = 10.0):
+    """
+    Extract frames with a single FFmpeg pass (fps filter + downscale + MJPEG pipe).
+    
+    Frames come back already JPEG-encoded at no more than VISION_MAX_EDGE on
+    the long side, so Python never touches full-resolution pixels.
+    
+    Yields:
+        (timestamp, frame_bytes) tuples as FFmpeg produces them
+    """
+    targets = _sample_targets(start_time, end_time, 1.0, interval)
+    cmd = [
+        'ffmpeg', '-loglevel', 'error',
+        '-ss', str(start_time),
+        '-t', str(end_time - start_time),
+        '-i', video_path,
+        *_ffmpeg_frame_output_args(interval),
+    ]
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("FFmpeg not found. Please install FFmpeg: brew install ffmpeg")
+    
+    stderr_lines, stderr_thread = _drain_stderr(process)
+    try:
+        yield from _iter_ffmpeg_frames(process, start_time, interval, len(targets))
+        process.wait()
+    finally:
+        if process.poll() is None:
+            # Consumer stopped early - don't leave FFmpeg blocked on a full pipe
+            process.kill()
+            process.wait()
+    stderr_thread.join(timeout=2)
+    if process.returncode != 0:
+        raise _ffmpeg_error(process.returncode, ''.join(stderr_lines), video_path, expect_audio=False)
+
+
+def extract_audio_and_frames(video_path: str, duration: float, interval: float = 10.0,
+                             progress_callback=None):
+    """
+    Demux the video once: a single FFmpeg run pipes 16 kHz mono PCM for Whisper
+    on one pipe and the sampled, downscaled JPEG frames on another.
+    
+    FFmpeg writes both pipes as it goes, so the frames are drained into a temp
+    file by spool_frames: the audio finishes at decode speed however slowly the
+    frames are described, and no frames pile up in memory.
+    
+    Returns:
+        (wait_audio, frames): a function that blocks until the audio is decoded and
+        returns it as float32 samples at AUDIO_SAMPLE_RATE (raising RuntimeError
+        if FFmpeg failed), and a generator of (timestamp, frame_bytes) tuples
+    """
+    import threading
+    
+    print("  Decoding audio to memory (and streaming frames from the same pass)")
+    sys.stdout.flush()
+    
+    targets = _sample_targets(0, duration, 1.0, interval)
+    audio_read, audio_write = os.pipe()
+    cmd = [
+        'ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+        '-i', video_path,
+        '-map', '0:a:0', '-vn',
+        '-ac', '1',
+        '-ar', str(AUDIO_SAMPLE_RATE),
+        '-f', 's16le', f'pipe:{audio_write}',
+        *_ffmpeg_frame_output_args(interval),
+    ]
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, pass_fds=(audio_write,))
+    except FileNotFoundError:
+        os.close(audio_read)
+        raise RuntimeError("FFmpeg not found. Please install FFmpeg: brew install ffmpeg")
+    finally:
+        os.close(audio_write)
+    
+    # Both pipes must be drained at once or FFmpeg stalls on whichever fills first
+    audio = {}
+    
+    def read_audio():
+        with os.fdopen(audio_read, 'rb') as stream:
+            audio['samples'] = _read_pcm(stream, duration)
+    
+    audio_thread = threading.Thread(target=read_audio, daemon=True)
+    audio_thread.start()
+    stderr_lines, stderr_thread = _drain_stderr(process)
+    stop_event, t = _start_progress_ticker(progress_callback)
+    
+    def frames():
+        drained = False
+        try:
+            yield from _iter_ffmpeg_frames(process, 0, interval, len(targets))
+            drained = True
+        finally:
+            if not drained and process.poll() is None:
+                # Consumer stopped early - FFmpeg would block on the frame pipe
+                process.kill()
+    
+    # Started before returning, so FFmpeg is drained even before anyone asks for a frame
+    frame_stream = spool_frames(frames())
+    
+    def wait_audio() -> np.ndarray:
+        try:
+            audio_thread.join()
+            process.wait(timeout=3600)
+            stderr_thread.join(timeout=2)
+        finally:
+            stop_event.set()
+            t.join(timeout=2)
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        
+        if progress_callback:
+            progress_callback(20)
+        
+        if process.returncode != 0:
+            raise _ffmpeg_error(process.returncode, ''.join(stderr_lines), video_path)
+        samples = audio.get('samples')
+        if samples is None or len(samples) == 0:
+            raise RuntimeError("FFmpeg decoded no audio - video may have no audio track")
+        
+        print(f"  ✓ Audio decoded ({len(samples) / AUDIO_SAMPLE_RATE:.0f}s, {samples.nbytes / 1024 / 1024:.2f} MB in memory)")
+        sys.stdout.flush()
+        return samples
+    
+    return wait_audio, frame_stream
+
+
 def extract_frames_for_chunk(video_path: str, start_time: float, end_time: float, 
-                              fps: float, interval: float = 10.0) -> list[tuple[int, bytes]]:
+                              fps: float, interval: float = 10.0,
+                              strategy: str = None, backend: str = None):
     """
     Extract frames from a specific time range of the video.
     
+    This is a generator: frames are decoded and JPEG-encoded one at a time as
+    the caller consumes them, so memory stays flat whatever the video length.
+    
     Args:
         video_path: Path to video file
         start_time: Start time in seconds
         end_time: End time in seconds
         fps: Video FPS
         interval: Seconds between frame extractions (extracts 1 frame per interval, can be fractional)
+        strategy: "auto", "grab", "keyframe" or "seek" (default: FRAME_SAMPLING_STRATEGY)
+        backend: "opencv" or "ffmpeg" (default: FRAME_BACKEND)
     
-    Returns:
-        List of (timestamp, frame_bytes) tuples
+    Yields:
+        (timestamp, frame_bytes) tuples in time order
     """
+    if (backend or FRAME_BACKEND) == "ffmpeg":
+        yield from extract_frames_ffmpeg(video_path, start_time, end_time, interval)
+        return
+    
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise ValueError(f"Could not open video file: {video_path}")
     
-    frames = []
-    current_time = start_time
+    strategy = strategy or FRAME_SAMPLING_STRATEGY
+    targets = _sample_targets(start_time, end_time, fps, interval)
     
-    while current_time < end_time:
-        # Extract 1 frame per interval (audio transcription fills the gaps)
-        frame_number = int(current_time * fps)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+    try:
+        keyframes = None
+        if strategy in ("auto", "keyframe"):
+            keyframes = probe_keyframes(video_path, fps)
+        if strategy == "auto":
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            strategy = choose_sampling_strategy(fps, interval, keyframes, total_frames)
+        print(f"[{strategy} sampling]", end=' ', flush=True)
         
-        ret, frame = cap.read()
-        if ret:
-            # Encode frame as JPEG bytes
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            frame_bytes = buffer.tobytes()
-            frames.append((int(current_time), frame_bytes))
+        if strategy == "seek" or (strategy == "keyframe" and not keyframes):
+            yield from _sample_frames_seek(cap, targets)
+        elif strategy == "keyframe":
+            yield from _sample_frames_forward(cap, targets, keyframes)
+        else:
+            yield from _sample_frames_forward(cap, targets)
+    finally:
+        cap.release()
+
+
+def prefetch_frames(frames, maxsize: int = None):
+    """
+    Run a frame generator on a background thread and hand its frames over
+    through a bounded queue, so decoding overlaps with the describe stage while
+    at most `maxsize` frames wait in memory.
+    
+    Errors raised by the generator are re-raised in the consumer. Closing the
+    consumer early stops the producer and closes the generator (releasing the
+    decoder / FFmpeg process).
+    
+    Args:
+        frames: Iterable of (timestamp, frame_bytes) tuples
+        maxsize: Queue bound (default: FRAME_QUEUE_SIZE)
+    
+    Yields:
+        (timestamp, frame_bytes) tuples in the producer's order
+    """
+    import queue
+    import threading
+    
+    q = queue.Queue(maxsize=maxsize or FRAME_QUEUE_SIZE)
+    stop_event = threading.Event()
+    
+    def put(item) -> bool:
+        while not stop_event.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def producer():
+        try:
+            for frame in frames:
+                if not put(('frame', frame)):
+                    break
+            else:
+                put(('done', None))
+        except Exception as e:
+            put(('error', e))
+        finally:
+            close = getattr(frames, 'close', None)
+            if close:
+                close()
+    
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    try:
+        while True:
+            kind, payload = q.get()
+            if kind == 'done':
+                return
+            if kind == 'error':
+                raise payload
+            yield payload
+    finally:
+        stop_event.set()
+        thread.join(timeout=5)
+
+
+def spool_frames(frames):
+    """
+    Drain a frame generator on a background thread into an anonymous temp file
+    as fast as it produces, and hand the frames back from the file as the
+    consumer asks for them.
+    
+    Unlike prefetch_frames, the producer never waits on the consumer, so a
+    process writing another output in the same pass (the single-pass demux's
+    audio) isn't paced by the describe stage. Only the frames' offsets are held
+    in memory. Draining starts right away, before the first frame is requested.
+    
+    Errors raised by the generator are re-raised in the consumer. Closing the
+    consumer early stops the producer and closes the generator.
+    
+    Args:
+        frames: Iterable of (timestamp, frame_bytes) tuples
+    
+    Returns:
+        Generator of (timestamp, frame_bytes) tuples in the producer's order
+    """
+    import threading
+    
+    spool = tempfile.TemporaryFile()
+    index = []  # (timestamp, offset, length) of each spooled frame
+    state = {'done': False, 'error': None, 'stopped': False}
+    changed = threading.Condition()
+    
+    def release():
+        # Called under `changed` by whichever side finishes last
+        if state['done'] and state['stopped']:
+            spool.close()
+    
+    def producer():
+        offset = 0
+        try:
+            for timestamp, frame_bytes in frames:
+                if state['stopped']:
+                    break
+                spool.write(frame_bytes)
+                spool.flush()
+                with changed:
+                    index.append((timestamp, offset, len(frame_bytes)))
+                    changed.notify_all()
+                offset += len(frame_bytes)
+        except Exception as e:
+            state['error'] = e
+        finally:
+            close = getattr(frames, 'close', None)
+            if close:
+                close()
+            with changed:
+                state['done'] = True
+                changed.notify_all()
+                release()
+    
+    threading.Thread(target=producer, daemon=True).start()
+    
+    def read():
+        position = 0
+        try:
+            while True:
+                with changed:
+                    while position == len(index) and not state['done']:
+                        changed.wait()
+                    if position == len(index):
+                        if state['error'] is not None:
+                            raise state['error']
+                        return
+                    timestamp, offset, length = index[position]
+                position += 1
+                yield timestamp, os.pread(spool.fileno(), length, offset)
+        finally:
+            with changed:
+                state['stopped'] = True
+                release()
+    
+    return read()
+
+
+def frame_signature(frame_bytes: bytes) -> tuple[int, float] | None:
+    """
+    Compute a cheap perceptual signature for a JPEG frame: a 64-bit difference
+    hash (dHash) plus mean brightness.
+    
+    The JPEG is decoded at 1/8 scale in grayscale, so this costs a fraction of
+    a full decode.
+    
+    Returns:
+        (dhash, mean_brightness), or None if the frame can't be decoded
+    """
+    data = np.frombuffer(frame_bytes, dtype=np.uint8)
+    gray = cv2.imdecode(data, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None:
+        return None
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    dhash = 0
+    for bit in bits:
+        dhash = (dhash << 1) | int(bit)
+    return dhash, float(small.mean())
+
+
+def frames_are_similar(a: tuple[int, float] | None, b: tuple[int, float] | None,
+                       max_distance: int = None) -> bool:
+    """Compare two frame signatures from frame_signature()."""
+    if max_distance is None:
+        max_distance = DEDUPE_MAX_DISTANCE
+    if a is None or b is None or max_distance < 0:
+        return False
+    distance = bin(a[0] ^ b[0]).count('1')
+    return distance <= max_distance and abs(a[1] - b[1]) <= DEDUPE_MAX_BRIGHTNESS_DELTA
+
+
+def fold_duplicate_frames(frames, max_distance: int = None, scene_cuts: list = None):
+    """
+    Fold runs of near-identical consecutive frames (static shots, title cards,
+    black frames) so each run needs only one describe_frame call.
+    
+    Every frame is compared against the first frame of the current run, so a
+    slow pan can't drift through the threshold one frame at a time.
+    
+    Args:
+        frames: Iterable of (timestamp, frame_bytes) tuples, in time order
+        max_distance: Max dHash bit difference (default: DEDUPE_MAX_DISTANCE, -1 disables)
+        scene_cuts: Optional list; timestamps of frames that differ from the previous frame by
+            at least SCENE_CUT_MIN_DISTANCE bits (hard cuts) are appended to it
+    
+    Yields:
+        (timestamp, frame_bytes, covered_timestamps) for the first frame of each run
+    """
+    if max_distance is None:
+        max_distance = DEDUPE_MAX_DISTANCE
+    run = None  # [timestamp, frame_bytes, signature, covered_timestamps]
+    previous = None
+    for timestamp, frame_bytes in frames:
+        signature = frame_signature(frame_bytes) if max_distance >= 0 or scene_cuts is not None else None
+        if (scene_cuts is not None and previous is not None and signature is not None
+                and bin(previous[0] ^ signature[0]).count('1') >= SCENE_CUT_MIN_DISTANCE):
+            scene_cuts.append(timestamp)
+        previous = signature
+        if run is not None and frames_are_similar(run[2], signature, max_distance):
+            run[3].append(timestamp)
+            continue
+        if run is not None:
+            yield run[0], run[1], run[3]
+        run = [timestamp, frame_bytes, signature, [timestamp]]
+    if run is not None:
+        yield run[0], run[1], run[3]
+
+
+class CircuitBreaker:
+    """
+    Process-wide pause shared by every OpenAI call.
+    
+    When the provider throttles with a Retry-After, or keeps answering with
+    overload errors, every caller (threads and asyncio tasks alike) waits out
+    the same window before its next attempt instead of retrying in lockstep.
+    """
+    
+    def __init__(self, threshold: int = None, cooldown: float = None):
+        import threading
         
-        current_time += interval
+        self.threshold = threshold or CIRCUIT_BREAKER_THRESHOLD
+        self.cooldown = cooldown or CIRCUIT_BREAKER_COOLDOWN
+        self.open_until = 0.0
+        self.consecutive_overloads = 0
+        self.trips = 0
+        self._lock = threading.Lock()
+    
+    def pause(self, seconds: float):
+        """Hold every caller for at least `seconds` from now."""
+        with self._lock:
+            self.open_until = max(self.open_until, time.monotonic() + seconds)
+    
+    def record_overload(self) -> bool:
+        """Count an overload error; returns True if this one tripped the breaker."""
+        with self._lock:
+            self.consecutive_overloads += 1
+            if self.consecutive_overloads < self.threshold:
+                return False
+            self.consecutive_overloads = 0
+            self.trips += 1
+            self.open_until = max(self.open_until,
+                                  time.monotonic() + self.cooldown * random.uniform(1.0, 1.5))
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            self.consecutive_overloads = 0
+    
+    def remaining(self) -> float:
+        return max(0.0, self.open_until - time.monotonic())
+
+
+PROVIDER_BREAKER = CircuitBreaker()
+
+# Exported retry counters (printed in the run summary)
+RETRY_STATS = {'retries': 0, 'retry_wait_seconds': 0.0, 'breaker_trips': 0, 'breaker_wait_seconds': 0.0}
+_RETRY_STATS_LOCK = threading.Lock()
+
+
+def _count_retry_stats(**amounts):
+    """Add to RETRY_STATS (frame, narrative and stage threads all retry at once)."""
+    with _RETRY_STATS_LOCK:
+        for name, amount in amounts.items():
+            RETRY_STATS[name] += amount
+
+
+def _parse_duration(value: str) -> float | None:
+    """Parse OpenAI reset durations such as '20ms', '1.5s' or '6m0s' into seconds."""
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value or '')
+    if not parts:
+        return None
+    scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def _retry_after_seconds(error: Exception) -> float | None:
+    """
+    Read how long the server asked us to wait: retry-after-ms, Retry-After
+    (seconds or HTTP date), or the x-ratelimit-reset-* header of whichever
+    limit is exhausted.
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            from email.utils import parsedate_to_datetime
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    
+    resets = []
+    for kind in ('requests', 'tokens'):
+        reset = _parse_duration(headers.get(f'x-ratelimit-reset-{kind}'))
+        if reset is not None and headers.get(f'x-ratelimit-remaining-{kind}') in ('0', None):
+            resets.append(reset)
+    return max(resets) if resets else None
+
+
+def _is_quota_error(error: Exception) -> bool:
+    """True for OpenAI's insufficient_quota error (sent with status 429)."""
+    return getattr(error, 'code', None) == 'insufficient_quota' or 'insufficient_quota' in str(error).lower()
+
+
+def _classify_error(error: Exception) -> str:
+    """
+    Sort an API error into "rate_limit", "overloaded", "transient" or "fatal".
+    
+    Exhausted quota is a 429 too, but waiting won't fix it, so it is fatal.
+    """
+    status = getattr(error, 'status_code', None)
+    message = str(error).lower()
+    if _is_quota_error(error):
+        return "fatal"
+    if status == 429 or (status is None and ("429" in message or "rate" in message)):
+        return "rate_limit"
+    if status in (500, 502, 503, 504, 529) or "overloaded" in message:
+        return "overloaded"
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return "transient"
+    return "fatal"
+
+
+def _plan_retry(error: Exception, previous_delay: float | None, retry_all_errors: bool) -> float | None:
+    """
+    Decide whether to retry `error` and for how long to wait.
+    
+    Waits follow the server's Retry-After / rate-limit reset headers plus a
+    little jitter when present, otherwise decorrelated jitter:
+    uniform(base, previous * 3), capped at MAX_RETRY_DELAY.
+    
+    Returns:
+        Seconds to wait, or None if the error shouldn't be retried
+    """
+    kind = _classify_error(error)
+    # Exhausted quota and auth/bad-request errors fail even when every other error is retried
+    if _is_quota_error(error):
+        return None
+    if kind == "fatal" and not (retry_all_errors and getattr(error, 'status_code', None) not in (400, 401, 403, 404)):
+        return None
+    
+    hint = _retry_after_seconds(error)
+    if hint is not None:
+        delay = min(MAX_RETRY_DELAY, hint + random.uniform(0, 0.1 + hint * 0.2))
+    else:
+        delay = min(MAX_RETRY_DELAY, random.uniform(INITIAL_RETRY_DELAY, (previous_delay or INITIAL_RETRY_DELAY) * 3))
+    
+    if kind == "rate_limit" and hint is not None:
+        # The limit is per organisation - every worker would hit it, so pause them all
+        PROVIDER_BREAKER.pause(delay)
+    elif kind == "overloaded" and PROVIDER_BREAKER.record_overload():
+        _count_retry_stats(breaker_trips=1)
+        print(f"\n  [Circuit breaker] Provider overloaded - pausing all API calls for "
+              f"{PROVIDER_BREAKER.remaining():.0f}s", flush=True)
+    return delay
+
+
+def _log_retry(label: str, error: Exception, attempt: int, delay: float):
+    kind = _classify_error(error)
+    reason = "rate limited" if kind == "rate_limit" else f"{'error' if kind == 'fatal' else kind}: {str(error)[:120]}"
+    print(f" ({label} {reason}, attempt {attempt + 1}/{MAX_RETRIES}, waiting {delay:.1f}s)", end='', flush=True)
+
+
+def call_with_retries(fn, label: str = "request", retry_all_errors: bool = False):
+    """
+    Call `fn()` under the shared retry policy: honours Retry-After and rate-limit
+    headers, backs off with decorrelated jitter, and waits out the process-wide
+    circuit breaker before every attempt.
+    
+    Args:
+        fn: Zero-argument callable making one API attempt
+        label: Name used in retry log lines
+        retry_all_errors: Retry any error except auth/bad-request ones (narratives also
+            retry short responses); by default only rate limits, overloads and
+            connection errors are retried
+    
+    Returns:
+        fn()'s result; the last error is re-raised once MAX_RETRIES is exhausted
+    """
+    delay = None
+    for attempt in range(MAX_RETRIES):
+        pause = PROVIDER_BREAKER.remaining()
+        if pause:
+            _count_retry_stats(breaker_wait_seconds=pause)
+            time.sleep(pause)
+        try:
+            result = fn()
+            PROVIDER_BREAKER.record_success()
+            return result
+        except Exception as e:
+            delay = _plan_retry(e, delay, retry_all_errors)
+            if delay is None or attempt == MAX_RETRIES - 1:
+                raise
+            _log_retry(label, e, attempt, delay)
+            _count_retry_stats(retries=1, retry_wait_seconds=delay)
+            time.sleep(delay)
+
+
+async def call_with_retries_async(fn, label: str = "request", retry_all_errors: bool = False):
+    """Async call_with_retries: `fn` returns an awaitable; waits use asyncio.sleep."""
+    delay = None
+    for attempt in range(MAX_RETRIES):
+        pause = PROVIDER_BREAKER.remaining()
+        if pause:
+            _count_retry_stats(breaker_wait_seconds=pause)
+            await asyncio.sleep(pause)
+        try:
+            result = await fn()
+            PROVIDER_BREAKER.record_success()
+            return result
+        except Exception as e:
+            delay = _plan_retry(e, delay, retry_all_errors)
+            if delay is None or attempt == MAX_RETRIES - 1:
+                raise
+            _log_retry(label, e, attempt, delay)
+            _count_retry_stats(retries=1, retry_wait_seconds=delay)
+            await asyncio.sleep(delay)
+
+
+class DescriptionCache:
+    """
+    Persistent, content-addressed cache of frame descriptions (SQLite).
+    
+    Entries are keyed by the SHA-256 of the encoded JPEG plus a version hash of
+    the description prompts, model and vision image settings, so a re-upload
+    or retried job reuses every description it already paid for, and a change
+    to any of them starts fresh. The table is capped at `max_entries` with least-recently-used
+    eviction. Hit/miss counts are kept for this run and cumulatively.
+    """
+    
+    def __init__(self, path: str, max_entries: int = None):
+        import sqlite3
+        import threading
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries or DESCRIPTION_CACHE_MAX_ENTRIES
+        # The image settings change what the model sees, so they version descriptions too
+        self.version = hashlib.sha256(
+            (DESCRIBE_MODEL + _frame_prompt(0) + _batch_prompt([0, 0])
+             + f"|{VISION_IMAGE_DETAIL}|{VISION_MAX_EDGE}|{VISION_JPEG_QUALITY}").encode('utf-8')
+        ).hexdigest()[:16]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS descriptions ("
+            " key TEXT PRIMARY KEY, description TEXT NOT NULL,"
+            " created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS descriptions_last_used ON descriptions (last_used)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM descriptions").fetchone()[0]
+    
+    def key(self, frame_bytes: bytes) -> str:
+        return f"{self.version}:{hashlib.sha256(frame_bytes).hexdigest()}"
+    
+    def lookup(self, frames: list[tuple[int, bytes]]) -> list[str | None]:
+        """Return the cached description for each (timestamp, frame_bytes), or None."""
+        keys = [self.key(frame_bytes) for _, frame_bytes in frames]
+        with self._lock:
+            placeholders = ','.join('?' * len(keys))
+            rows = dict(self._db.execute(
+                f"SELECT key, description FROM descriptions WHERE key IN ({placeholders})", keys
+            ).fetchall()) if keys else {}
+            found = [rows.get(k) for k in keys]
+            hits = sum(1 for d in found if d is not None)
+            if hits:
+                self._db.executemany("UPDATE descriptions SET last_used = ? WHERE key = ?",
+                                     [(time.time(), k) for k in keys if k in rows])
+            self._bump(hits, len(keys) - hits)
+            self._db.commit()
+        return found
+    
+    def store(self, frames: list[tuple[int, bytes]], descriptions: list[str]):
+        """Cache fresh descriptions (failure placeholders are not cached)."""
+        now = time.time()
+        rows = [(self.key(frame_bytes), desc, now, now)
+                for (_, frame_bytes), desc in zip(frames, descriptions)
+                if desc and not desc.startswith('[')]
+        if not rows:
+            return
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO descriptions VALUES (?, ?, ?, ?)", rows)
+            self._count += self._db.total_changes - before
+            if self._count > self.max_entries:
+                # Evict the least recently used entries, plus 5% headroom so this doesn't run on every store
+                excess = self._count - int(self.max_entries * 0.95)
+                self._db.execute(
+                    "DELETE FROM descriptions WHERE key IN "
+                    "(SELECT key FROM descriptions ORDER BY last_used LIMIT ?)", (excess,))
+                self._count = self._db.execute("SELECT COUNT(*) FROM descriptions").fetchone()[0]
+            self._db.commit()
+    
+    def _bump(self, hits: int, misses: int):
+        self.hits += hits
+        self.misses += misses
+        self._db.executemany(
+            "INSERT INTO stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [('hits', hits), ('misses', misses)])
+    
+    def stats(self) -> dict:
+        """Hit/miss counts for this run and for the cache's lifetime."""
+        with self._lock:
+            totals = dict(self._db.execute("SELECT name, value FROM stats").fetchall())
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': self._count,
+            'total_hits': totals.get('hits', 0),
+            'total_misses': totals.get('misses', 0),
+        }
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _merge_cached(known: list[str | None], fresh: list[str]) -> list[str]:
+    """Fill the None slots of a cache lookup with freshly generated descriptions, in order."""
+    fresh_iter = iter(fresh)
+    return [desc if desc is not None else next(fresh_iter) for desc in known]
+
+
+def _frame_prompt(timestamp: int) -> str:
+    """Rules prompt for a single-frame description."""
+    return f"""Describe this video frame at {timestamp}s.
+CRITICAL RULES:
+- Only describe actions, objects, and locations that are clearly visible in this frame.
+- Do NOT invent names for people. Say "a person", "someone", "they" - never make up a character name.
+- Do NOT describe appearance details (clothing, hairstyle, skin color, accessories, background blur) unless essential to the action.
+- Do NOT invent or infer details not directly visible. No invented scenes, places, or events.
+- Do NOT use poetic, artistic, or descriptive language (no 'bokeh', 'textured', 'dangling', etc.).
+- Focus on WHAT IS HAPPENING (actions, movements, events) - the main activity in this frame only.
+- If uncertain about anything, say 'unclear' or omit it.
+- Keep it brief (1 sentence max) and factual.
+- If someone is skateboarding, say 'A person skateboards' not 'A person with [appearance details] skateboards'.
+
+Example GOOD: 'A person skateboards down a street.'
+Example BAD: 'Marcus skateboards down a leafy street with bokeh in the background.' (invented name and extra details)"""
+
+
+def _jpeg_size(data) -> tuple[int, int] | None:
+    """Read (width, height) from a JPEG's SOF header without decoding it."""
+    data = memoryview(data).cast('B')  # Indexable by byte, whatever the buffer's shape
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(data[i + 5:i + 7], 'big')
+            width = int.from_bytes(data[i + 7:i + 9], 'big')
+            return width, height
+        i += 2 + int.from_bytes(data[i + 2:i + 4], 'big')
+    return None
+
+
+def estimate_image_tokens(width: int, height: int, detail: str = None) -> int:
+    """
+    Estimate the prompt tokens an image costs: 85 at low detail; at high/auto,
+    85 + 170 per 512px tile after fitting into 2048x2048 and scaling the short
+    side to 768.
+    """
+    if (detail or VISION_IMAGE_DETAIL) == "low":
+        return 85
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+# Running totals of what was actually sent to the vision model this run (requests are
+# counted as they're issued, so cache hits and folded duplicates never add to them)
+VISION_PAYLOAD_STATS = {'requests': 0, 'images': 0, 'bytes': 0, 'image_tokens': 0}
+
+
+def _image_part(frame_bytes) -> dict:
+    """Build an image content part (base64 data URL at VISION_IMAGE_DETAIL) and count its payload."""
+    image_base64 = base64.b64encode(frame_bytes).decode('ascii')
+    size = _jpeg_size(frame_bytes)
+    VISION_PAYLOAD_STATS['images'] += 1
+    VISION_PAYLOAD_STATS['bytes'] += len(image_base64)
+    VISION_PAYLOAD_STATS['image_tokens'] += estimate_image_tokens(*size) if size else 85
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": f"data:image/jpeg;base64,{image_base64}",
+            "detail": VISION_IMAGE_DETAIL,
+        }
+    }
+
+
+def _frame_messages(frame_bytes: bytes, timestamp: int) -> list[dict]:
+    """Chat messages for describing one frame (image + rules prompt)."""
+    return [
+        {
+            "role": "user",
+            "content": [
+                _image_part(frame_bytes),
+                {
+                    "type": "text",
+                    "text": _frame_prompt(timestamp)
+                }
+            ]
+        }
+    ]
+
+
+def describe_frame(client: OpenAI, frame_bytes: bytes, timestamp: int) -> str:
+    """Send a frame to GPT-5-nano and get a description."""
+    messages = _frame_messages(frame_bytes, timestamp)
+    VISION_PAYLOAD_STATS['requests'] += 1
+    response = call_with_retries(
+        lambda: client.chat.completions.create(
+            model=DESCRIBE_MODEL,
+            messages=messages,
+            max_completion_tokens=400
+        ),
+        label="frame",
+    )
+    content = response.choices[0].message.content
+    return content if content else "[No description]"
+
+
+def _batch_prompt(timestamps: list[int]) -> str:
+    """Rules prompt for describing several consecutive frames in one request."""
+    listing = "\n".join(f"[{i + 1}] frame at {ts}s" for i, ts in enumerate(timestamps))
+    return f"""You are given {len(timestamps)} consecutive video frames, in order:
+{listing}
+
+Describe EACH frame in exactly one sentence, on its own line, prefixed with its number in brackets, e.g.:
+[1] A person skateboards down a street.
+[2] A person jumps off the skateboard.
+
+CRITICAL RULES:
+- Only describe actions, objects, and locations that are clearly visible in that frame.
+- Do NOT invent names for people. Say "a person", "someone", "they" - never make up a character name.
+- Do NOT describe appearance details (clothing, hairstyle, skin color, accessories, background blur) unless essential to the action.
+- Do NOT invent or infer details not directly visible. No invented scenes, places, or events.
+- Do NOT use poetic, artistic, or descriptive language (no 'bokeh', 'textured', 'dangling', etc.).
+- Focus on WHAT IS HAPPENING (actions, movements, events) in each frame.
+- If uncertain about anything, say 'unclear' or omit it.
+- Output exactly {len(timestamps)} lines and nothing else."""
+
+
+def _batch_messages(frames: list[tuple[int, bytes]]) -> list[dict]:
+    """Chat messages for a batch: the rules once, then each frame labelled with its number."""
+    content = [{"type": "text", "text": _batch_prompt([ts for ts, _ in frames])}]
+    for i, (timestamp, frame_bytes) in enumerate(frames):
+        content.append({"type": "text", "text": f"[{i + 1}] frame at {timestamp}s:"})
+        content.append(_image_part(frame_bytes))
+    return [{"role": "user", "content": content}]
+
+
+_BATCH_LINE = re.compile(r'^\s*\[(\d+)\]\s*[:.\-–]?\s*(.+?)\s*$')
+
+
+def _parse_batch_response(content: str, count: int) -> list[str | None]:
+    """
+    Split a batched reply into one description per frame.
+    
+    Returns:
+        List of `count` descriptions; None where the reply had no usable line for that frame
+    """
+    descriptions = [None] * count
+    for line in (content or '').splitlines():
+        match = _BATCH_LINE.match(line)
+        if not match:
+            continue
+        index = int(match.group(1)) - 1
+        if 0 <= index < count and descriptions[index] is None:
+            descriptions[index] = match.group(2)
+    return descriptions
+
+
+def describe_frames_batch(client: OpenAI, frames: list[tuple[int, bytes]],
+                          cache: DescriptionCache = None) -> list[str]:
+    """
+    Describe several consecutive frames in one request (the rules prompt is sent
+    once instead of once per frame).
+    
+    Frames whose line is missing or malformed in the reply - or the whole batch,
+    if the request fails - fall back to describe_frame; a frame whose fallback
+    fails too gets "[Could not analyze]" without affecting the others.
+    
+    Args:
+        client: OpenAI client
+        frames: List of (timestamp, frame_bytes) tuples
+        cache: Optional DescriptionCache; only frames it doesn't know are sent
+    
+    Returns:
+        One description per frame, in order
+    """
+    if cache is not None:
+        known = cache.lookup(frames)
+        missing = [frame for frame, desc in zip(frames, known) if desc is None]
+        fresh = describe_frames_batch(client, missing) if missing else []
+        cache.store(missing, fresh)
+        return _merge_cached(known, fresh)
+    
+    parsed = [None] * len(frames)
+    if len(frames) > 1:  # A single frame goes straight to describe_frame
+        try:
+            messages = _batch_messages(frames)
+            VISION_PAYLOAD_STATS['requests'] += 1
+            response = call_with_retries(
+                lambda: client.chat.completions.create(
+                    model=DESCRIBE_MODEL,
+                    messages=messages,
+                    max_completion_tokens=400 * len(frames)
+                ),
+                label="batch",
+            )
+            parsed = _parse_batch_response(response.choices[0].message.content, len(frames))
+        except Exception as e:
+            print(f" (batch failed, describing {len(frames)} frames individually: {str(e)[:100]})", end='', flush=True)
+    
+    for i, (timestamp, frame_bytes) in enumerate(frames):
+        if not parsed[i]:
+            try:
+                parsed[i] = describe_frame(client, frame_bytes, timestamp)
+            except Exception:
+                parsed[i] = "[Could not analyze]"
+    return parsed
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket refilled continuously at a per-minute rate.
+    
+    Used twice for the vision calls: one bucket counts requests (RPM), the other
+    estimated tokens (TPM). The burst is capped at a few seconds' worth so a
+    run doesn't open with a full minute of requests at once.
+    """
+    
+    def __init__(self, per_minute: float, burst_seconds: float = 5.0):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    async def acquire(self, amount: float = 1.0):
+        """Wait until `amount` tokens are available, then take them."""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+    
+    def adjust(self, amount: float):
+        """Charge (positive) or refund (negative) tokens once the real usage is known."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+async def _limited_create(client: AsyncOpenAI, request_bucket: TokenBucket, token_bucket: TokenBucket,
+                          estimate: float, **kwargs):
+    """One vision request, after taking a request and `estimate` tokens from the buckets."""
+    if request_bucket:
+        await request_bucket.acquire(1)
+    if token_bucket:
+        await token_bucket.acquire(estimate)
+    response = await client.chat.completions.create(model=DESCRIBE_MODEL, **kwargs)
+    usage = getattr(response, 'usage', None)
+    if token_bucket and usage and usage.total_tokens:
+        token_bucket.adjust(usage.total_tokens - estimate)
+    return response
+
+
+async def describe_frame_async(client: AsyncOpenAI, frame_bytes: bytes, timestamp: int,
+                               request_bucket: TokenBucket = None,
+                               token_bucket: TokenBucket = None) -> str:
+    """Async describe_frame: waits on the rate-limit buckets instead of sleeping a fixed delay."""
+    messages = _frame_messages(frame_bytes, timestamp)
+    VISION_PAYLOAD_STATS['requests'] += 1
+    response = await call_with_retries_async(
+        lambda: _limited_create(client, request_bucket, token_bucket, DESCRIBE_TOKENS_ESTIMATE,
+                                messages=messages, max_completion_tokens=400),
+        label="frame",
+    )
+    content = response.choices[0].message.content
+    return content if content else "[No description]"
+
+
+async def describe_frames_batch_async(client: AsyncOpenAI, frames: list[tuple[int, bytes]],
+                                     request_bucket: TokenBucket = None,
+                                     token_bucket: TokenBucket = None,
+                                     cache: DescriptionCache = None) -> list[str]:
+    """
+    Async describe_frames_batch; missing or malformed entries fall back to
+    describe_frame_async, and frames whose fallback fails get "[Could not analyze]".
+    """
+    if cache is not None:
+        known = cache.lookup(frames)
+        missing = [frame for frame, desc in zip(frames, known) if desc is None]
+        fresh = await describe_frames_batch_async(client, missing, request_bucket, token_bucket) if missing else []
+        cache.store(missing, fresh)
+        return _merge_cached(known, fresh)
+    
+    parsed = [None] * len(frames)
+    if len(frames) > 1:  # A single frame goes straight to describe_frame_async
+        try:
+            messages = _batch_messages(frames)
+            VISION_PAYLOAD_STATS['requests'] += 1
+            response = await call_with_retries_async(
+                lambda: _limited_create(client, request_bucket, token_bucket,
+                                        DESCRIBE_TOKENS_ESTIMATE * len(frames),
+                                        messages=messages, max_completion_tokens=400 * len(frames)),
+                label="batch",
+            )
+            parsed = _parse_batch_response(response.choices[0].message.content, len(frames))
+        except Exception as e:
+            print(f" (batch failed, describing {len(frames)} frames individually: {str(e)[:100]})", end='', flush=True)
+    
+    missing = [i for i, desc in enumerate(parsed) if not desc]
+    if missing:
+        fallbacks = await asyncio.gather(
+            *(describe_frame_async(client, frames[i][1], frames[i][0], request_bucket, token_bucket)
+              for i in missing),
+            return_exceptions=True,
+        )
+        for i, desc in zip(missing, fallbacks):
+            parsed[i] = "[Could not analyze]" if isinstance(desc, Exception) else desc
+    return parsed
+
+
+async def describe_frames_concurrently(frame_groups, api_key: str, concurrency: int = None,
+                                       rpm: float = None, tpm: float = None,
+                                       on_result=None, batch_size: int = None,
+                                       cache: DescriptionCache = None) -> list[tuple[int, str, list[int]]]:
+    """
+    Describe frames with up to `concurrency` requests in flight, rate-limited by
+    request and token buckets.
+    
+    The next frames are only pulled from `frame_groups` once a request slot is
+    free, so a streaming source still holds just a few frames in memory.
+    
+    Args:
+        frame_groups: Iterable of (timestamp, frame_bytes, covered_timestamps) in time order
+            (blocking iterables are advanced on a worker thread)
+        api_key: OpenAI API key
+        concurrency: Max in-flight requests (default: DESCRIBE_CONCURRENCY)
+        rpm: Requests per minute (default: DESCRIBE_RPM)
+        tpm: Tokens per minute (default: DESCRIBE_TPM)
+        on_result: Optional callback(timestamp, description, covered, ok) as each frame finishes
+        batch_size: Frames per request (default: DESCRIBE_BATCH_SIZE)
+        cache: Optional DescriptionCache consulted before any request is made
+    
+    Returns:
+        List of (timestamp, description, covered_timestamps) in time order; frames
+        that fail get "[Could not analyze]"
+    """
+    concurrency = concurrency or DESCRIBE_CONCURRENCY
+    batch_size = batch_size or DESCRIBE_BATCH_SIZE
+    request_bucket = TokenBucket(rpm or DESCRIBE_RPM)
+    token_bucket = TokenBucket(tpm or DESCRIBE_TPM)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+    tasks = []
+    iterator = iter(frame_groups)
+    
+    async with AsyncOpenAI(api_key=api_key, timeout=NARRATIVE_API_TIMEOUT, max_retries=0) as client:
+        async def run(first_index: int, groups: list[tuple[int, bytes, list[int]]]):
+            try:
+                descs = await describe_frames_batch_async(
+                    client, [(ts, frame_bytes) for ts, frame_bytes, _ in groups],
+                    request_bucket, token_bucket, cache)
+                ok = True
+            except Exception as e:
+                descs, ok = ["[Could not analyze]"] * len(groups), False
+                print(f"\n    Frames at {groups[0][0]}s-{groups[-1][0]}s failed: {e}", flush=True)
+            finally:
+                semaphore.release()
+            for offset, ((timestamp, _, covered), desc) in enumerate(zip(groups, descs)):
+                results[first_index + offset] = (timestamp, desc, covered)
+                if on_result:
+                    on_result(timestamp, desc, covered, ok)
+        
+        index = 0
+        exhausted = False
+        while not exhausted:
+            await semaphore.acquire()
+            batch = []
+            while len(batch) < batch_size:
+                group = await asyncio.to_thread(next, iterator, None)
+                if group is None:
+                    exhausted = True
+                    break
+                batch.append(group)
+            if not batch:
+                semaphore.release()
+                break
+            tasks.append(asyncio.create_task(run(index, batch)))
+            index += len(batch)
+        if tasks:
+            await asyncio.gather(*tasks)
+    
+    return [results[i] for i in range(len(results))]
+
+
+_TOKENIZER = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count prompt tokens with tiktoken's o200k encoding when available (it is
+    installed alongside openai-whisper), otherwise estimate from CHARS_PER_TOKEN.
+    """
+    global _TOKENIZER
+    if _TOKENIZER is None:
+        try:
+            import tiktoken
+            _TOKENIZER = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _TOKENIZER = False
+    if _TOKENIZER:
+        return len(_TOKENIZER.encode(text, disallowed_special=()))
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def plan_narrative_chunks(timeline: Timeline, duration: float,
+                          scene_cuts: list[int] = None, budget: int = None) -> list[tuple[float, float]]:
+    """
+    Split the video into narrative chunks sized by prompt tokens instead of by time.
+    
+    Each snapshot line and dialogue line is costed with count_tokens(); chunks are
+    packed greedily up to `budget`. When a chunk is full, its boundary is moved back
+    (but not below NARRATIVE_CHUNK_MIN_FILL of the budget) to the latest point that
+    isn't mid-dialogue, preferring a hard scene cut.
+    
+    Args:
+        timeline: Frame descriptions and Whisper segments
+        duration: Video duration in seconds
+        scene_cuts: Timestamps where a hard cut starts (from fold_duplicate_frames)
+        budget: Prompt tokens per chunk (default: NARRATIVE_CHUNK_TOKEN_BUDGET)
+    
+    Returns:
+        List of (start, end) time ranges covering the video; a single range means
+        everything fits in one narrative call
+    """
+    budget = budget or NARRATIVE_CHUNK_TOKEN_BUDGET
+    times = timeline.times.tolist()
+    if not times:
+        return [(0, duration)]
+    
+    # Dialogue is charged to the snapshot it starts after
+    costs = [count_tokens(format_snapshot(item)) + 2 for item in timeline.snapshots]
+    for start, _, text in timeline.segments:
+        costs[max(0, timeline.description_index(start))] += count_tokens(f"- {text}") + 1
     
-    cap.release()
-    return frames
+    cuts = set(scene_cuts or ())
+    boundaries = []
+    first = 0
+    while True:
+        total = costs[first]
+        last = first + 1
+        while last < len(costs) and total + costs[last] <= budget:
+            total += costs[last]
+            last += 1
+        if last >= len(costs):
+            break
+        # Full: choose the best boundary between min fill and the budget
+        best, best_rank, filled = last, None, 0
+        for k in range(first + 1, last + 1):
+            filled += costs[k - 1]
+            if filled < budget * NARRATIVE_CHUNK_MIN_FILL and k < last:
+                continue
+            rank = (not timeline.in_dialogue(times[k]), times[k] in cuts, k)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = k, rank
+        boundaries.append(times[best])
+        first = best
+    
+    edges = [0] + boundaries + [max(duration, times[-1] + 1)]
+    return list(zip(edges[:-1], edges[1:]))
 
 
-def describe_frame(client: OpenAI, frame_bytes: bytes, timestamp: int) -> str:
-    """Send a frame to GPT-5-nano and get a description."""
-    image_base64 = base64.b64encode(frame_bytes).decode('utf-8')
+class PartialNarrative:
+    """
+    Text file the final narrative is streamed into while it is being generated.
     
-    prompt = f"""Describe this video frame at {timestamp}s.
-CRITICAL RULES:
-- Only describe actions, objects, and locations that are clearly visible in this frame.
-- Do NOT invent names for people. Say "a person", "someone", "they" - never make up a character name.
-- Do NOT describe appearance details (clothing, hairstyle, skin color, accessories, background blur) unless essential to the action.
-- Do NOT invent or infer details not directly visible. No invented scenes, places, or events.
-- Do NOT use poetic, artistic, or descriptive language (no 'bokeh', 'textured', 'dangling', etc.).
-- Focus on WHAT IS HAPPENING (actions, movements, events) - the main activity in this frame only.
-- If uncertain about anything, say 'unclear' or omit it.
-- Keep it brief (1 sentence max) and factual.
-- If someone is skateboarding, say 'A person skateboards' not 'A person with [appearance details] skateboards'.
+    Lives next to the output as `<stem>_partial.txt` - its existence is the
+    partial-result marker (the API server serves it until the real output file
+    appears). Each retry attempt starts it over.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+    
+    def reset(self):
+        self.close()
+        self._file = open(self.path, 'w', encoding='utf-8')
+    
+    def write(self, text: str):
+        if self._file is None:
+            self.reset()
+        self._file.write(text)
+        self._file.flush()
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def discard(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
 
-Example GOOD: 'A person skateboards down a street.'
-Example BAD: 'Marcus skateboards down a leafy street with bokeh in the background.' (invented name and extra details)"""
 
-    retry_delay = INITIAL_RETRY_DELAY
+def _complete_text(client: OpenAI, partial: PartialNarrative = None, **kwargs) -> str | None:
+    """
+    One chat completion, returning the message text.
     
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-5-nano",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_base64}"
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": prompt
-                            }
-                        ]
-                    }
-                ],
-                max_completion_tokens=400
-            )
-            content = response.choices[0].message.content
-            return content if content else "[No description]"
-        except Exception as e:
-            if "429" in str(e) or "rate" in str(e).lower():
-                if attempt < MAX_RETRIES - 1:
-                    print(f" (rate limited, waiting {retry_delay}s)", end='', flush=True)
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                else:
-                    raise
-            else:
-                raise
+    With `partial`, the completion is requested with stream=True and every delta
+    is appended to the partial file as it arrives.
+    """
+    if partial is None:
+        response = client.chat.completions.create(**kwargs)
+        return response.choices[0].message.content
     
-    return "[Could not analyze frame]"
+    partial.reset()
+    parts = []
+    for chunk in client.chat.completions.create(stream=True, **kwargs):
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            partial.write(delta)
+    return ''.join(parts)
+
+
+def _require_narrative(content: str | None) -> str:
+    """Raise (so the retry engine tries again) if a narrative reply is empty or too short."""
+    if not content or len(content.strip()) < NARRATIVE_MIN_LENGTH:
+        print(f"  Warning: Short or empty response (length: {len(content) if content else 0})")
+        raise ValueError("API returned empty or very short content")
+    return content
 
 
-def create_final_narrative(client: OpenAI, descriptions: list[tuple[int, str]], 
-                           dialogue: list[str] = None) -> str:
-    """Create a final narrative from frame descriptions (for single-chunk videos)."""
-    formatted = "\n\n".join(f"[{ts}s] {desc}" for ts, desc in descriptions)
+def create_final_narrative(client: OpenAI, descriptions: list[tuple], 
+                           dialogue: list[str] = None, partial: PartialNarrative = None) -> str:
+    """
+    Create a final narrative from frame descriptions (for single-chunk videos).
+    
+    Descriptions are (timestamp, text) pairs or compacted (start, until, text) spans.
+    With `partial`, the narrative is streamed into that file as it is generated.
+    """
+    formatted = "\n\n".join(format_snapshot(item) for item in descriptions)
     
     dialogue_text = ""
     if dialogue and len(dialogue) > 0:
@@ -381,75 +2075,50 @@ Visual snapshots (factual observations):
 
 Write a natural, engaging narrative story that reads like a novel. Make it immersive and descriptive while staying true to what's shown:"""
 
-    retry_delay = INITIAL_RETRY_DELAY
+    def attempt():
+        content = _complete_text(
+            client, partial,
+            model="gpt-5-nano",
+            messages=[
+                {"role": "system", "content": "You write narrative only from the provided visual snapshots and dialogue. You never invent character names, scenes, or events. Use 'the person', 'they', 'someone' unless a name is in the dialogue. Every detail must come from the source material."},
+                {"role": "user", "content": prompt}
+            ],
+            max_completion_tokens=6000,
+        )
+        return _require_narrative(content)
     
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-5-nano",
-                messages=[
-                    {"role": "system", "content": "You write narrative only from the provided visual snapshots and dialogue. You never invent character names, scenes, or events. Use 'the person', 'they', 'someone' unless a name is in the dialogue. Every detail must come from the source material."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_completion_tokens=6000,
-            )
-            content = response.choices[0].message.content
-            min_length = 500  # Require at least 500 characters for a valid narrative
-            if not content or len(content.strip()) < min_length:
-                print(f"  Warning: Short or empty response (length: {len(content) if content else 0})")
-                if attempt < MAX_RETRIES - 1:
-                    print(f"  Retrying... (attempt {attempt + 2}/{MAX_RETRIES})")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                else:
-                    raise ValueError("API returned empty or very short content after all retries")
-            
-            # Post-process: If content looks like a list (many single-sentence lines), convert to narrative
-            lines = [line.strip() for line in content.split('\n') if line.strip()]
-            # Check if it's a list format (many lines, each starting with capital letter, few transitions)
-            if len(lines) > 5 and all(len(line) < 150 for line in lines[:5]):
-                # Looks like a list - convert to flowing narrative
-                print("  Converting list format to narrative...")
-                # Join with transitions
-                transitions = ['Then', 'Next', 'As', 'While', 'After', 'When']
-                narrative_parts = []
-                for i, line in enumerate(lines):
-                    if i == 0:
-                        narrative_parts.append(line)
-                    else:
-                        # Add transition occasionally, otherwise just connect
-                        if i % 3 == 0 and i < len(transitions):
-                            narrative_parts.append(f"{transitions[i % len(transitions)].lower()}, {line.lower()}")
-                        else:
-                            narrative_parts.append(line.lower())
-                content = '. '.join(narrative_parts) + '.'
-            
-            return content
-        except Exception as e:
-            error_msg = str(e)
-            print(f"  Error on attempt {attempt + 1}/{MAX_RETRIES}: {error_msg[:200]}")
-            if "429" in error_msg or "rate" in error_msg.lower():
-                if attempt < MAX_RETRIES - 1:
-                    print(f"  Rate limited, waiting {retry_delay}s...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                else:
-                    raise RuntimeError(f"Narrative generation failed after {MAX_RETRIES} attempts: {error_msg}")
-            elif attempt < MAX_RETRIES - 1:
-                print(f"  Retrying in {retry_delay}s...")
-                time.sleep(retry_delay)
-                retry_delay *= 2
+    try:
+        content = call_with_retries(attempt, label="narrative", retry_all_errors=True)
+    except Exception as e:
+        raise RuntimeError(f"Narrative generation failed: {str(e)[:500]}") from e
+    
+    # Post-process: If content looks like a list (many single-sentence lines), convert to narrative
+    lines = [line.strip() for line in content.split('\n') if line.strip()]
+    # Check if it's a list format (many lines, each starting with capital letter, few transitions)
+    if len(lines) > 5 and all(len(line) < 150 for line in lines[:5]):
+        # Looks like a list - convert to flowing narrative
+        print("  Converting list format to narrative...")
+        # Join with transitions
+        transitions = ['Then', 'Next', 'As', 'While', 'After', 'When']
+        narrative_parts = []
+        for i, line in enumerate(lines):
+            if i == 0:
+                narrative_parts.append(line)
             else:
-                raise RuntimeError(f"Narrative generation failed: {error_msg}")
+                # Add transition occasionally, otherwise just connect
+                if i % 3 == 0 and i < len(transitions):
+                    narrative_parts.append(f"{transitions[i % len(transitions)].lower()}, {line.lower()}")
+                else:
+                    narrative_parts.append(line.lower())
+        content = '. '.join(narrative_parts) + '.'
     
-    raise RuntimeError("Narrative generation failed after all retries")
+    return content
 
 
-def create_chunk_narrative(client: OpenAI, descriptions: list[tuple[int, str]], 
+def create_chunk_narrative(client: OpenAI, descriptions: list[tuple], 
                            chunk_num: int, dialogue: list[str] = None) -> str:
-    """Create a mini-narrative for a chunk of frame descriptions."""
-    formatted = "\n\n".join(f"[{ts}s] {desc}" for ts, desc in descriptions)
+    """Create a mini-narrative for a chunk of frame descriptions (pairs or compacted spans)."""
+    formatted = "\n\n".join(format_snapshot(item) for item in descriptions)
     
     dialogue_text = ""
     if dialogue and len(dialogue) > 0:
@@ -475,52 +2144,31 @@ Visual snapshots:
 
 Write a natural narrative using only the above material:"""
 
-    retry_delay = INITIAL_RETRY_DELAY
-    
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-5-nano",
-                messages=[
-                    {"role": "system", "content": "You write narrative only from the provided visual snapshots and dialogue. Never invent character names, scenes, or events. Use 'the person', 'they', 'someone' unless a name is in the dialogue. Every detail must come from the source material."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_completion_tokens=4000,
-            )
-            content = response.choices[0].message.content
-            min_length = 500  # Require at least 500 characters for a valid chunk narrative
-            if not content or len(content.strip()) < min_length:
-                print(f"  Warning: Short or empty response (length: {len(content) if content else 0})")
-                if attempt < MAX_RETRIES - 1:
-                    print(f"  Retrying... (attempt {attempt + 2}/{MAX_RETRIES})")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                else:
-                    raise ValueError("API returned empty or very short content after all retries")
-            return content
-        except Exception as e:
-            error_msg = str(e)
-            print(f"  Error on attempt {attempt + 1}/{MAX_RETRIES}: {error_msg[:200]}")
-            if "429" in error_msg or "rate" in error_msg.lower():
-                if attempt < MAX_RETRIES - 1:
-                    print(f"  Rate limited, waiting {retry_delay}s...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                else:
-                    raise RuntimeError(f"Chunk narrative generation failed after {MAX_RETRIES} attempts: {error_msg}")
-            elif attempt < MAX_RETRIES - 1:
-                print(f"  Retrying in {retry_delay}s...")
-                time.sleep(retry_delay)
-                retry_delay *= 2
-            else:
-                raise RuntimeError(f"Chunk narrative generation failed: {error_msg}")
+    def attempt():
+        response = client.chat.completions.create(
+            model="gpt-5-nano",
+            messages=[
+                {"role": "system", "content": "You write narrative only from the provided visual snapshots and dialogue. Never invent character names, scenes, or events. Use 'the person', 'they', 'someone' unless a name is in the dialogue. Every detail must come from the source material."},
+                {"role": "user", "content": prompt}
+            ],
+            max_completion_tokens=4000,
+        )
+        return _require_narrative(response.choices[0].message.content)
     
-    raise RuntimeError("Chunk narrative generation failed after all retries")
+    try:
+        return call_with_retries(attempt, label=f"chunk {chunk_num} narrative", retry_all_errors=True)
+    except Exception as e:
+        raise RuntimeError(f"Chunk narrative generation failed: {str(e)[:500]}") from e
 
 
-def combine_narratives(client: OpenAI, chunk_narratives: list[str]) -> str:
-    """Combine all chunk narratives into one flowing story."""
+def combine_narratives(client: OpenAI, chunk_narratives: list[str], partial: PartialNarrative = None) -> str:
+    """
+    Combine all chunk narratives into one flowing story.
+    
+    With `partial`, the combined story is streamed into that file as it is generated.
+    An empty or short reply is retried like any other failure, so a placeholder never
+    reaches the next level of the reduce as if it were story text.
+    """
     formatted = "\n\n---\n\n".join(
         f"Chapter {i+1}:\n{narrative}" for i, narrative in enumerate(chunk_narratives)
     )
@@ -538,35 +2186,554 @@ Chapter summaries:
 
 Write the complete, seamless narrative using only the above:"""
 
-    retry_delay = INITIAL_RETRY_DELAY
+    def attempt():
+        content = _complete_text(
+            client, partial,
+            model="gpt-5-nano",
+            messages=[
+                {"role": "system", "content": "You combine the provided chapter summaries into one narrative. Do not add any new characters, names, scenes, or events. Use only what is in the summaries."},
+                {"role": "user", "content": prompt}
+            ],
+            max_completion_tokens=8000,
+        )
+        return _require_narrative(content)
     
-    for attempt in range(MAX_RETRIES):
+    try:
+        return call_with_retries(attempt, label="combine", retry_all_errors=True)
+    except Exception as e:
+        raise RuntimeError(f"Combining narratives failed: {str(e)[:500]}") from e
+
+
+def create_chunk_narratives(client: OpenAI, chunks: list[tuple[list[tuple[int, str]], list[str]]],
+                            concurrency: int = None, on_done=None) -> list[str]:
+    """
+    Run create_chunk_narrative for every chunk with up to `concurrency` calls in flight.
+    
+    Args:
+        client: OpenAI client (shared across worker threads)
+        chunks: (descriptions, dialogue) per chunk, in story order
+        concurrency: Max calls in flight (default: NARRATIVE_CONCURRENCY)
+        on_done: Optional callback(chunk_index, narrative, finished_count) as each chunk completes
+    
+    Returns:
+        Chunk narratives in story order; the first failure is re-raised
+    """
+    concurrency = concurrency or NARRATIVE_CONCURRENCY
+    narratives = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(create_chunk_narrative, client, descs, i + 1, dialogue): i
+                   for i, (descs, dialogue) in enumerate(chunks)}
+        for finished, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            narratives[index] = future.result()
+            if on_done:
+                on_done(index, narratives[index], finished)
+    return narratives
+
+
+def reduce_narratives(client: OpenAI, narratives: list[str], group_size: int = None,
+                      concurrency: int = None, on_level=None, partial: PartialNarrative = None) -> str:
+    """
+    Combine narratives with a tree reduce: each level merges groups of `group_size`
+    consecutive narratives in parallel, until one is left.
+    
+    Every combine prompt holds at most `group_size` parts, and the number of
+    sequential rounds grows with log(chunks) instead of the chunk count.
+    
+    Args:
+        client: OpenAI client
+        narratives: Chunk narratives in story order
+        group_size: Parts per combine call (default: COMBINE_GROUP_SIZE)
+        concurrency: Max merges in flight (default: NARRATIVE_CONCURRENCY)
+        on_level: Optional callback(level, parts_in, parts_out) before each level runs
+        partial: Optional PartialNarrative the last merge is streamed into
+    
+    Returns:
+        The combined narrative
+    """
+    group_size = max(2, group_size or COMBINE_GROUP_SIZE)
+    concurrency = concurrency or NARRATIVE_CONCURRENCY
+    level = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while len(narratives) > 1:
+            level += 1
+            groups = [narratives[i:i + group_size] for i in range(0, len(narratives), group_size)]
+            if on_level:
+                on_level(level, len(narratives), len(groups))
+            # A trailing single part has nothing to merge with - carry it up a level
+            final = partial if len(groups) == 1 else None
+            futures = [pool.submit(combine_narratives, client, group, final) if len(group) > 1 else None
+                       for group in groups]
+            narratives = [future.result() if future else group[0] for future, group in zip(futures, groups)]
+    return narratives[0]
+
+
+def video_fingerprint(video_path: str) -> str:
+    """Cheap identity for a video file: its size plus a hash of the first and last MiB."""
+    size = os.path.getsize(video_path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(video_path, 'rb') as f:
+        digest.update(f.read(1 << 20))
+        if size > 2 << 20:
+            f.seek(-(1 << 20), os.SEEK_END)
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class RunCheckpoint:
+    """
+    Append-only JSONL record of a run's finished work, written next to _progress.json.
+    
+    The first line is a header (video fingerprint, settings, resume attempts); after
+    it, one line per completed unit: the transcript, each described frame, the chunk
+    plan and each chunk narrative. A crash loses at most the line being written.
+    
+    With resume=True the existing file is validated and whatever still applies is
+    kept: a different video discards everything, different frame settings keep only
+    the transcript, a different chunk budget drops the plan and chunk narratives.
+    
+    While open, the checkpoint holds an exclusive lock (<stem>_checkpoint.lock) so
+    two processes can't resume the same job.
+    """
+    
+    def __init__(self, path: str, fingerprint: str, settings: dict, resume: bool = False):
+        self.path = path
+        self.lock_path = path[:-len('.jsonl')] + '.lock' if path.endswith('.jsonl') else path + '.lock'
+        self.fingerprint = fingerprint
+        self.settings = settings
+        self.attempts = 0
+        self.transcript = None
+        self.frames = {}  # group timestamp -> (description, covered_timestamps, is_scene_cut)
+        self.frames_done = False
+        self.plan = None
+        self.chunks = {}  # plan index -> chunk narrative
+        import threading
+        self._append_lock = threading.Lock()
+        
+        self._lock_file = open(self.lock_path, 'w')
         try:
-            response = client.chat.completions.create(
-                model="gpt-5-nano",
-                messages=[
-                    {"role": "system", "content": "You combine the provided chapter summaries into one narrative. Do not add any new characters, names, scenes, or events. Use only what is in the summaries."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_completion_tokens=8000,
-            )
-            content = response.choices[0].message.content
-            return content if content else "[No final narrative generated]"
-        except Exception as e:
-            if "429" in str(e) or "rate" in str(e).lower():
-                if attempt < MAX_RETRIES - 1:
-                    print(f" (rate limited, waiting {retry_delay}s)", end='', flush=True)
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                else:
-                    raise
-            else:
-                raise
+            import fcntl
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:
+            pass
+        except OSError:
+            self._lock_file.close()
+            raise RuntimeError(f"Checkpoint {path} is in use by another run")
+        
+        if resume and os.path.exists(path):
+            self._load()
+            self.attempts += 1
+            if self.attempts > RESUME_MAX_ATTEMPTS:
+                self.discard()
+                raise RuntimeError(f"Giving up after {RESUME_MAX_ATTEMPTS} resume attempts")
+        self._rewrite()
+        self._file = open(path, 'a', encoding='utf-8')
+    
+    def _load(self):
+        records = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break  # Torn final line from a crash
+        if not records or records[0].get('t') != 'header':
+            return
+        header = records[0]
+        if header.get('version') != CHECKPOINT_VERSION or header.get('video') != self.fingerprint:
+            print("  Checkpoint is for a different video or version - starting over")
+            return
+        self.attempts = header.get('attempts', 0)
+        same_frames = header.get('settings', {}).get('frames') == self.settings['frames']
+        same_narrative = same_frames and header.get('settings', {}).get('narrative') == self.settings['narrative']
+        if not same_frames:
+            print("  Frame settings changed since the checkpoint - keeping only the transcript")
+        elif not same_narrative:
+            print("  Narrative settings changed since the checkpoint - keeping transcript and frame descriptions")
+        
+        for record in records[1:]:
+            kind = record.get('t')
+            if kind == 'transcript':
+                self.transcript = [tuple(segment) for segment in record['segments']]
+            elif kind == 'frame' and same_frames:
+                self.frames[record['ts']] = (record['desc'], record['covered'], record.get('cut', False))
+            elif kind == 'frames_done' and same_frames:
+                self.frames_done = True
+            elif kind == 'plan' and same_narrative:
+                self.plan = [tuple(chunk) for chunk in record['chunks']]
+            elif kind == 'chunk' and same_narrative:
+                self.chunks[record['i']] = record['text']
+    
+    def _rewrite(self):
+        """Write a compacted checkpoint (header + everything still valid) atomically."""
+        lines = [{'t': 'header', 'version': CHECKPOINT_VERSION, 'video': self.fingerprint,
+                  'settings': self.settings, 'attempts': self.attempts}]
+        if self.transcript is not None:
+            lines.append({'t': 'transcript', 'segments': self.transcript})
+        for ts, (desc, covered, cut) in sorted(self.frames.items()):
+            lines.append({'t': 'frame', 'ts': ts, 'desc': desc, 'covered': covered, 'cut': cut})
+        if self.frames_done:
+            lines.append({'t': 'frames_done'})
+        if self.plan is not None:
+            lines.append({'t': 'plan', 'chunks': self.plan})
+        for index, text in sorted(self.chunks.items()):
+            lines.append({'t': 'chunk', 'i': index, 'text': text})
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for line in lines:
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+    
+    def _append(self, record: dict, sync: bool = False):
+        # The audio and frame stages record from their own threads
+        with self._append_lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+    
+    def record_transcript(self, segments: list[tuple[float, float, str]]):
+        self.transcript = list(segments)
+        self._append({'t': 'transcript', 'segments': self.transcript}, sync=True)
+    
+    def record_frame(self, timestamp: int, description: str, covered: list[int], cut: bool):
+        self.frames[timestamp] = (description, covered, cut)
+        self._append({'t': 'frame', 'ts': timestamp, 'desc': description, 'covered': covered, 'cut': cut})
+    
+    def record_frames_done(self):
+        self.frames_done = True
+        self._append({'t': 'frames_done'}, sync=True)
+    
+    def record_plan(self, chunks: list[tuple[float, float]]):
+        self.plan = list(chunks)
+        self._append({'t': 'plan', 'chunks': self.plan}, sync=True)
+    
+    def record_chunk(self, index: int, text: str):
+        self.chunks[index] = text
+        self._append({'t': 'chunk', 'i': index, 'text': text}, sync=True)
+    
+    def resume_from(self, targets: list[int]) -> int | None:
+        """
+        First of the sample timestamps `targets` (in order) that no recorded frame
+        covers, or None if all of them are covered.
+        
+        Frames are described concurrently and recorded as their requests finish,
+        and failed descriptions aren't recorded at all, so the latest recorded
+        timestamp says nothing about the frames before it: the run resumes at the
+        first gap, and keep_frames_before() drops whatever was recorded after it.
+        """
+        covered = {ts for _, frame_covered, _ in self.frames.values() for ts in frame_covered}
+        return next((ts for ts in targets if ts not in covered), None)
+    
+    def keep_frames_before(self, timestamp: int):
+        """Forget frames recorded at or after `timestamp` (they'll be described again)."""
+        dropped = [ts for ts in self.frames if ts >= timestamp]
+        if not dropped and not self.frames_done:
+            return
+        with self._append_lock:
+            for ts in dropped:
+                del self.frames[ts]
+            self.frames_done = False
+            # A resumed run records those frames again, so rewrite rather than leave stale lines
+            self._file.close()
+            self._rewrite()
+            self._file = open(self.path, 'a', encoding='utf-8')
+    
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self._lock_file.closed:
+            self._lock_file.close()
+    
+    def discard(self):
+        """Remove the checkpoint (the run finished, or it can't be resumed)."""
+        if hasattr(self, '_file'):
+            self._file.close()
+        for path in (self.path, self.lock_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._lock_file.close()
+
+
+class StageError(Exception):
+    """A pipeline stage failed; `stage` names it and `error` is what it raised."""
+    
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+        self.error = error
+
+
+def run_stage_graph(stages: dict, abort=None, timings: dict = None) -> dict:
+    """
+    Run pipeline stages on threads, each as soon as the stages it depends on finish.
+    
+    Args:
+        stages: name -> (fn, dependencies); fn is called with the dependencies'
+            results as positional arguments, in the order listed
+        abort: Optional threading.Event set when a stage fails, so long-running
+            stages on other branches can stop early
+        timings: Optional dict that gets name -> wall-clock seconds for every
+            stage that finished (successfully or not)
+    
+    Returns:
+        name -> result for every stage no other stage depends on (intermediate
+        results are released once their last dependent finishes)
+    
+    Raises:
+        StageError: For the first stage that failed, after the stages already
+            running have finished; no further stages are started
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+    
+    def timed(name, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            if timings is not None:
+                timings[name] = round(time.perf_counter() - started, 2)
+    
+    dependents = {name: sum(name in deps for _, deps in stages.values()) for name in stages}
+    results = {}
+    failed = None
+    pending = dict(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix='stage') as pool:
+        try:
+            while pending or running:
+                if failed is not None:
+                    pending.clear()
+                for name, (fn, deps) in list(pending.items()):
+                    if all(dep in results for dep in deps):
+                        running[pool.submit(timed, name, fn, *(results[dep] for dep in deps))] = name
+                        del pending[name]
+                if not running:
+                    if pending:
+                        raise ValueError(f"Stages can never start: {', '.join(pending)}")
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        failed = failed or StageError(name, e)
+                        if abort is not None:
+                            abort.set()
+                        continue
+                    for dep in stages[name][1]:
+                        dependents[dep] -= 1
+                        if dependents[dep] == 0:
+                            results[dep] = None  # Free it (e.g. decoded audio) but keep it marked done
+        except BaseException:
+            if abort is not None:
+                abort.set()
+            raise
+    if failed is not None:
+        raise failed
+    return {name: result for name, result in results.items() if not any(name in deps for _, deps in stages.values())}
+
+
+class ProgressReporter:
+    """
+    Sends run progress to whoever started the run, and keeps a snapshot on disk.
+    
+    Every update goes out at once as one line of JSON on the progress channel
+    (a pipe api_server.py passes as PROGRESS_FD), along with other events such
+    as stage timings. <output>_progress.json is only a coalesced snapshot for
+    crash recovery and readers without a channel: it is rewritten when the
+    step (status_index) changes, when the run ends or fails, and otherwise at
+    most every PROGRESS_SNAPSHOT_SECONDS.
+    """
+    
+    def __init__(self, snapshot_path: str, channel_fd: int = None, snapshot_interval: float = None):
+        import threading
+        
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = PROGRESS_SNAPSHOT_SECONDS if snapshot_interval is None else snapshot_interval
+        self._channel = os.fdopen(channel_fd, 'w', buffering=1, encoding='utf-8') if channel_fd is not None else None
+        self._lock = threading.Lock()  # Stages report from several threads
+        self._pending = None  # Latest progress not yet in the snapshot
+        self._written_at = 0.0
+        self._written_index = None
+    
+    def update(self, status: str, progress: int, status_index: int = 0, chunk_progress: dict = None):
+        progress_data = {
+            'status': status,
+            'progress': int(progress),
+            'status_index': int(status_index),
+            'chunk_progress': chunk_progress or {'current': 0, 'total': 1},
+            'timestamp': time.time()
+        }
+        with self._lock:
+            self._send({'type': 'progress', **progress_data})
+            self._pending = progress_data
+            final = progress_data['progress'] >= 100 or status.startswith('Error')
+            if (final or progress_data['status_index'] != self._written_index
+                    or progress_data['timestamp'] - self._written_at >= self.snapshot_interval):
+                self._write_snapshot()
+    
+    def event(self, event_type: str, **fields):
+        """Send a non-progress event (e.g. stage_timings) on the channel."""
+        with self._lock:
+            self._send({'type': event_type, **fields})
+    
+    def flush(self):
+        """Write the latest progress to the snapshot if it isn't there yet."""
+        with self._lock:
+            if self._pending is not None:
+                self._write_snapshot()
+    
+    def _send(self, message: dict):
+        if self._channel is None:
+            return
+        try:
+            self._channel.write(json.dumps(message) + '\n')
+        except (BrokenPipeError, ValueError, OSError) as e:
+            # Whoever was listening is gone; the snapshot still gets written
+            print(f"[Warning] Progress channel closed ({e})", flush=True)
+            self._channel = None
+    
+    def _write_snapshot(self):
+        # Atomic write, so readers never see partial JSON
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._pending, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._written_at = self._pending['timestamp']
+        self._written_index = self._pending['status_index']
+        self._pending = None
+
+
+class BranchProgress:
+    """
+    Folds the progress of pipeline branches running side by side into single
+    update_progress calls.
+    
+    Each branch owns a share of the overall percentage (weight, in points above
+    `start`). The reported status joins the statuses of the unfinished branches,
+    and status_index is the earliest step still in progress.
+    """
     
-    return "[Could not generate final narrative]"
+    def __init__(self, report, start: int, branches: dict[str, tuple[int, int]]):
+        import threading
+        
+        self._report = report
+        self._start = start
+        self._branches = branches  # name -> (weight, status_index)
+        self._state = {name: (0.0, None) for name in branches}  # name -> (fraction, status)
+        self._lock = threading.Lock()
+    
+    def update(self, name: str, status: str, fraction: float):
+        with self._lock:
+            fraction = min(max(fraction, self._state[name][0]), 1.0)  # Never step backwards
+            self._state[name] = (fraction, status)
+            self._publish()
+    
+    def finish(self, name: str):
+        with self._lock:
+            self._state[name] = (1.0, None)
+            self._publish()
+    
+    def _publish(self):
+        progress = self._start + sum(self._branches[name][0] * fraction
+                                     for name, (fraction, _) in self._state.items())
+        active = sorted((self._branches[name][1], status)
+                        for name, (_, status) in self._state.items() if status is not None)
+        if active:
+            self._report(' | '.join(status for _, status in active), int(progress), active[0][0])
+
+
+def _stage_limit(stage: str, limits: str = None) -> int:
+    for item in (STAGE_LIMITS if limits is None else limits).split(','):
+        name, _, value = item.partition('=')
+        if name.strip() == stage and value.strip():
+            return int(value)
+    return 0
+
+
+@contextlib.contextmanager
+def stage_slot(stage: str, on_wait=None, limits: str = None):
+    """
+    Hold one of this host's slots for `stage` while the block runs.
+    
+    STAGE_LIMITS caps how many runs on the host may be in a stage at once, so
+    concurrent jobs take turns at Whisper or the vision API instead of all
+    piling in. Slots are flock()ed files in STAGE_LOCK_DIR, freed by the kernel
+    if a run dies. Stages without a limit (or platforms without fcntl) don't wait.
+    
+    Args:
+        stage: Stage name as used in STAGE_LIMITS (transcribe, frames, narrative)
+        on_wait: Called once if every slot is taken and the run has to wait
+        limits: Overrides STAGE_LIMITS
+    """
+    limit = _stage_limit(stage, limits)
+    try:
+        import fcntl
+    except ImportError:
+        limit = 0
+    if limit <= 0:
+        yield
+        return
+    
+    os.makedirs(STAGE_LOCK_DIR, exist_ok=True)
+    waited = False
+    while True:
+        for slot in range(limit):
+            lock_file = open(os.path.join(STAGE_LOCK_DIR, f"{stage}.{slot}.lock"), 'w')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            try:
+                yield
+            finally:
+                lock_file.close()
+            return
+        if not waited:
+            waited = True
+            print(f"  Waiting for a free '{stage}' slot ({limit} in use)...", flush=True)
+            if on_wait:
+                on_wait()
+        time.sleep(0.5)
+
+
+def _skip_frames_before(frames, timestamp: float):
+    """Yield the (timestamp, frame_bytes) tuples from `frames` after `timestamp`, then close it."""
+    try:
+        for frame in frames:
+            if frame[0] > timestamp:
+                yield frame
+    finally:
+        close = getattr(frames, 'close', None)
+        if close:
+            close()
+
+
+def _until_set(event, iterable):
+    """Yield from `iterable` until `event` is set, then close it."""
+    try:
+        for item in iterable:
+            if event.is_set():
+                return
+            yield item
+    finally:
+        close = getattr(iterable, 'close', None)
+        if close:
+            close()
 
 
 def main():
+    global VISION_MAX_EDGE, VISION_JPEG_QUALITY, VISION_IMAGE_DETAIL
+    
     parser = argparse.ArgumentParser(
         description="Convert a video into a prose narrative using GPT-5-nano (chunked processing)"
     )
@@ -575,8 +2742,53 @@ def main():
     parser.add_argument("-k", "--api-key", help="OpenAI API key")
     parser.add_argument("--frame-interval", type=float, default=10,
                         help="Extract 1 frame every N seconds (default: auto-calculated based on video length: 3 frames/10s for short videos, 1 frame/10s for 2+ hour videos)")
+    parser.add_argument("--dedupe-threshold", type=int, default=DEDUPE_MAX_DISTANCE,
+                        help=f"Max perceptual-hash difference (0-64 bits) for consecutive frames to share one description; -1 disables (default: {DEDUPE_MAX_DISTANCE})")
+    parser.add_argument("--concurrency", type=int, default=DESCRIBE_CONCURRENCY,
+                        help=f"Frame descriptions in flight at once via asyncio; 1 = sequential with a fixed delay (default: {DESCRIBE_CONCURRENCY})")
+    parser.add_argument("--rpm", type=float, default=DESCRIBE_RPM,
+                        help=f"Requests per minute budget for frame descriptions (default: {DESCRIBE_RPM})")
+    parser.add_argument("--tpm", type=float, default=DESCRIBE_TPM,
+                        help=f"Tokens per minute budget for frame descriptions (default: {DESCRIBE_TPM})")
+    parser.add_argument("--chunk-tokens", type=int, default=NARRATIVE_CHUNK_TOKEN_BUDGET,
+                        help=f"Prompt tokens of snapshots and dialogue per narrative call; videos that fit make one call (default: {NARRATIVE_CHUNK_TOKEN_BUDGET})")
+    parser.add_argument("--compact-similarity", type=float, default=PROMPT_COMPACTION_SIMILARITY,
+                        help=f"Merge consecutive snapshot descriptions at least this similar (0-1) into one time-span line and collapse repeated dialogue; 0 disables (default: {PROMPT_COMPACTION_SIMILARITY})")
+    parser.add_argument("--narrative-concurrency", type=int, default=NARRATIVE_CONCURRENCY,
+                        help=f"Chunk narratives and merges generated in parallel (default: {NARRATIVE_CONCURRENCY})")
+    parser.add_argument("--combine-group-size", type=int, default=COMBINE_GROUP_SIZE,
+                        help=f"Narratives merged per combine call; longer stories are combined level by level (default: {COMBINE_GROUP_SIZE})")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reuse the transcript, frame descriptions and chunk narratives saved in <output>_checkpoint.jsonl by an interrupted run")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Don't stream the final narrative into <output>_partial.txt while it is generated")
+    parser.add_argument("--batch-size", type=int, default=DESCRIBE_BATCH_SIZE,
+                        help=f"Consecutive frames described per vision request (default: {DESCRIBE_BATCH_SIZE})")
+    parser.add_argument("--cache", default=DESCRIPTION_CACHE_PATH,
+                        help="SQLite file caching frame descriptions by content hash (default: cache/frame_descriptions.sqlite)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Describe every frame even if it was described before")
+    parser.add_argument("--vision-max-edge", type=int, default=VISION_MAX_EDGE,
+                        help=f"Downscale frames to this long edge before upload; 0 keeps native resolution (default: {VISION_MAX_EDGE})")
+    parser.add_argument("--vision-quality", type=int, default=VISION_JPEG_QUALITY,
+                        help=f"JPEG quality of uploaded frames (default: {VISION_JPEG_QUALITY})")
+    parser.add_argument("--image-detail", choices=["low", "high", "auto"], default=VISION_IMAGE_DETAIL,
+                        help=f"Vision image detail level (default: {VISION_IMAGE_DETAIL})")
+    parser.add_argument("--transcribe-workers", type=int, default=TRANSCRIBE_WORKERS,
+                        help=f"Split long audio at silences and transcribe the pieces in this many processes (default: {TRANSCRIBE_WORKERS})")
+    parser.add_argument("--no-vad", action="store_true",
+                        help="Send the whole soundtrack to Whisper instead of only the spans where speech was detected")
+    parser.add_argument("--frame-backend", choices=["opencv", "ffmpeg"], default=FRAME_BACKEND,
+                        help="Frame decoder: opencv (full-resolution decode) or ffmpeg (one downscaled pass that also extracts the audio)")
     
     args = parser.parse_args()
+    args.batch_size = max(1, args.batch_size)
+    args.narrative_concurrency = max(1, args.narrative_concurrency)
+    
+    # Payload shaping settings are read by the frame encoders and message builders
+    VISION_MAX_EDGE = max(0, args.vision_max_edge)
+    VISION_JPEG_QUALITY = min(100, max(1, args.vision_quality))
+    VISION_IMAGE_DETAIL = args.image_detail
     
     # Validate video path
     if not os.path.exists(args.video_path):
@@ -602,40 +2814,31 @@ def main():
     os.makedirs(output_dir, exist_ok=True)  # Ensure directory exists
     progress_path = os.path.join(output_dir, os.path.basename(output_path).replace('.txt', '_progress.json'))
     
+    # Started by api_server.py: progress and stage timings go back over the PROGRESS_FD pipe
+    channel_fd = os.environ.get('PROGRESS_FD')
+    try:
+        reporter = ProgressReporter(progress_path, int(channel_fd) if channel_fd else None)
+    except (OSError, ValueError) as e:
+        print(f"[Warning] Progress channel unavailable ({e}); progress goes to {progress_path} only")
+        reporter = ProgressReporter(progress_path)
+    stage_timings = {}
+    run_started = time.perf_counter()
+    
     # Write initial progress immediately
     try:
-        initial_progress = {
-            'status': 'Starting...',
-            'progress': 0,
-            'status_index': 0,
-            'chunk_progress': {'current': 0, 'total': 1},
-            'timestamp': time.time()
-        }
-        with open(progress_path, 'w') as f:
-            json.dump(initial_progress, f)
+        reporter.update('Starting...', 0, 0)
         print(f"[Progress] Initial progress written to {progress_path}")
     except Exception as e:
         print(f"[Warning] Could not write initial progress: {e}")
     
+    def record_timings():
+        reporter.event('stage_timings', timings=stage_timings)
+    
     def update_progress(status: str, progress: int, status_index: int = 0, chunk_progress: dict = None):
-        """Write progress to JSON file for API to read (atomic write to avoid partial JSON)."""
+        """Report progress on the channel and in the (throttled) progress file."""
         try:
             os.makedirs(output_dir, exist_ok=True)
-            progress_data = {
-                'status': status,
-                'progress': int(progress),
-                'status_index': int(status_index),
-                'chunk_progress': chunk_progress or {'current': 0, 'total': 1},
-                'timestamp': time.time()
-            }
-
-            tmp_path = progress_path + ".tmp"
-            with open(tmp_path, 'w') as f:
-                json.dump(progress_data, f)
-                f.flush()
-                os.fsync(f.fileno())
-            os.replace(tmp_path, progress_path)
-
+            reporter.update(status, progress, status_index, chunk_progress)
             print(f"\n[Progress Update] {status} - {progress}%", flush=True)
         except Exception as e:
             print(f"\n[Progress Update Failed] {e}", flush=True)
@@ -644,7 +2847,7 @@ def main():
     
     # Initialize client (long timeout for narrative calls on 20+ min episodes)
     try:
-        client = OpenAI(api_key=api_key, timeout=NARRATIVE_API_TIMEOUT)
+        client = OpenAI(api_key=api_key, timeout=NARRATIVE_API_TIMEOUT, max_retries=0)
         update_progress('Initializing...', 5, 0)
     except Exception as e:
         error_msg = f"Failed to initialize OpenAI client: {e}"
@@ -675,13 +2878,44 @@ def main():
         frames_per_10s = 10.0 / frame_interval
         print(f"Video info: {fps:.2f} FPS, {total_frames} frames, {duration:.2f} seconds ({duration/60:.1f} minutes)")
         print(f"Dynamic frame extraction: {frames_per_10s:.1f} frames per 10 seconds (1 frame every {frame_interval:.2f} seconds)")
+    
+    # Checkpoint finished work so a crashed or restarted run can pick up where it stopped
+    checkpoint = None
+    checkpoint_path = os.path.join(output_dir, Path(output_path).stem + '_checkpoint.jsonl')
+    checkpoint_settings = {
+        # The backends sample and timestamp frames differently, so their records don't mix
+        'frames': {'interval': frame_interval, 'dedupe': args.dedupe_threshold, 'model': DESCRIBE_MODEL,
+                   'vision': [VISION_MAX_EDGE, VISION_JPEG_QUALITY, VISION_IMAGE_DETAIL],
+                   'backend': args.frame_backend},
+        'narrative': {'chunk_tokens': args.chunk_tokens, 'compact': args.compact_similarity},
+    }
+    try:
+        checkpoint = RunCheckpoint(checkpoint_path, video_fingerprint(args.video_path),
+                                   checkpoint_settings, resume=args.resume)
+        if args.resume and not checkpoint.attempts:
+            print("No usable checkpoint to resume - starting from the beginning")
+        elif args.resume:
+            print(f"Resuming from checkpoint (attempt {checkpoint.attempts}): "
+                  f"transcript {'done' if checkpoint.transcript is not None else 'pending'}, "
+                  f"{len(checkpoint.frames)} frames described{' (all)' if checkpoint.frames_done else ''}, "
+                  f"{len(checkpoint.chunks)} chunk narratives")
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        update_progress(f'Error: {e}', 0, 0)
+        sys.exit(1)
+    except Exception as e:
+        print(f"[Warning] Checkpointing disabled: {e}")
     print("-" * 60)
     
-    # Extract and transcribe audio
+    # Audio (FFmpeg + Whisper, CPU-bound) and frames (decode + network-bound vision calls)
+    # don't need each other until the narrative, so they run side by side as a stage graph:
+    #
+    #   audio --> transcript --+
+    #   frames ----------------+--> narrative
+    #
+    # With --frame-backend ffmpeg a single demux stage feeds both branches.
     update_progress('Starting...', 5, 0)
-    update_progress('Extracting audio...', 10, 0)
     print("\n[Audio Processing]")
-    print("  Extracting audio from video...")
     print(f"  Video file: {args.video_path}")
     print(f"  Video file exists: {os.path.exists(args.video_path)}")
     if os.path.exists(args.video_path):
@@ -689,126 +2923,343 @@ def main():
         print(f"  Video file size: {file_size:.2f} MB")
     sys.stdout.flush()
     
-    audio_path = None
-    transcription = []
-    try:
-        # Create progress callback for audio extraction
-        def audio_progress(pct):
-            update_progress('Extracting audio...', pct, 0)
-        
-        audio_path = extract_audio(args.video_path, progress_callback=audio_progress)
-        print("  ✓ Audio extraction complete")
-        sys.stdout.flush()
-        update_progress('Transcribing dialogue...', 20, 1)
-        print("  Transcribing audio (this may take a while, especially on first run - downloading Whisper model)...")
-        sys.stdout.flush()
-        
-        transcription = transcribe_audio(audio_path)
-        print(f"  Found {len(transcription)} dialogue segments")
-        if transcription:
-            print(f"  Sample dialogue: {transcription[0][2][:100] if len(transcription) > 0 else 'N/A'}...")
+    progress = BranchProgress(update_progress, 10, {'audio': (20, 0), 'frames': (50, 2)})
+    
+    def audio_progress(pct):
+        # load_audio reports 10-20% of the old sequential scale; extraction is the first half of the branch
+        progress.update('audio', 'Extracting audio...', (pct - 10) / 20)
+    
+    def load_audio_stage():
+        progress.update('audio', 'Extracting audio...', 0)
+        print("  Extracting audio from video...", flush=True)
+        samples = load_audio(args.video_path, duration, progress_callback=audio_progress)
+        print("  ✓ Audio extraction complete", flush=True)
+        return samples
+    
+    def demux_stage():
+        progress.update('audio', 'Extracting audio...', 0)
+        print("  Extracting audio and frames in one FFmpeg pass...", flush=True)
+        wait_audio, frames = extract_audio_and_frames(args.video_path, duration, frame_interval,
+                                                      progress_callback=audio_progress)
+        return {'audio': wait_audio, 'frames': frames}
+    
+    def transcribe_stage(samples):
+        if isinstance(samples, dict):
+            # Wait for the demux's audio, dropping its reference so it's freed once transcribed
+            samples = samples.pop('audio')()
+        with stage_slot('transcribe', on_wait=lambda: progress.update('audio', 'Waiting to transcribe...', 0.5)):
+            progress.update('audio', 'Transcribing dialogue...', 0.5)
+            print("  Transcribing audio (this may take a while, especially on first run - downloading Whisper model)...", flush=True)
+            segments = transcribe_audio(samples, args.transcribe_workers, vad=not args.no_vad)
+        if checkpoint:
+            checkpoint.record_transcript(segments)
+        print(f"  Found {len(segments)} dialogue segments")
+        if segments:
+            print(f"  Sample dialogue: {segments[0][2][:100]}...")
         else:
             print("  ⚠️  WARNING: No dialogue was transcribed. The video may have no audio or very quiet audio.")
         sys.stdout.flush()
-        update_progress('Analyzing frames...', 30, 2)
-    except Exception as e:
-        error_msg = f"Audio processing failed: {e}"
+        progress.finish('audio')
+        return segments
+    
+    all_descriptions = []
+    descriptions = []
+    scene_cuts = []
+    frames_seen = 0
+    groups_described = 0  # Frames described this run after duplicate folding (cache hits included)
+    cache = None
+    import threading
+    abort = threading.Event()  # Set by run_stage_graph when a stage fails
+    
+    # Frames already described in the checkpoint are reused up to the first sample
+    # with no recorded description; sampling restarts there
+    start_time = 0
+    resume_from = None
+    if checkpoint and checkpoint.frames:
+        targets = _sample_targets(0, duration, fps, frame_interval)
+        resume_from = checkpoint.resume_from([ts for ts, _ in targets])
+        if resume_from is not None:
+            checkpoint.keep_frames_before(resume_from)
+            # Restart at that sample's exact time, so the re-sampled timestamps line up
+            start_time = next(i * frame_interval for i, (ts, _) in enumerate(targets) if ts == resume_from)
+        else:
+            start_time = duration
+    if checkpoint and checkpoint.frames:
+        for timestamp, (desc, covered, cut) in sorted(checkpoint.frames.items()):
+            for ts in covered:
+                descriptions.append((ts, desc))
+                all_descriptions.append((ts, desc))
+            frames_seen += len(covered)
+            if cut:
+                scene_cuts.append(timestamp)
+        if resume_from is not None:
+            print(f"\n  Reusing {frames_seen} frame descriptions from the checkpoint (resuming at {resume_from}s)")
+        else:
+            print(f"\n  Reusing {frames_seen} frame descriptions from the checkpoint (all frames)")
+    
+    resumed_frames = frames_seen
+    
+    def describe_stage(demuxed=None):
+        nonlocal frames_seen, groups_described, cache
+        frames = demuxed.pop('frames') if demuxed else None
+        
+        # Stream frames: decoding runs on a background thread a few frames ahead of the
+        # describe calls, so only FRAME_QUEUE_SIZE frames are ever held in memory
+        if checkpoint and checkpoint.frames_done:
+            expected_frames = frames_seen
+            frame_stream = iter(())
+        elif frames is None:
+            print(f"\n[Processing Video] Streaming frames...", end=' ', flush=True)
+            expected_frames = frames_seen + len(_sample_targets(start_time, duration, fps, frame_interval))
+            frame_stream = prefetch_frames(extract_frames_for_chunk(args.video_path, start_time, duration, fps,
+                                                                    frame_interval, backend=args.frame_backend))
+        else:
+            print(f"\n[Processing Video] Streaming frames from the audio pass...", end=' ', flush=True)
+            expected_frames = frames_seen + len(_sample_targets(start_time, duration, fps, frame_interval))
+            frame_stream = frames
+            if checkpoint and checkpoint.frames:
+                # The demux decodes from the start; skip to the resume point. Demuxed timestamps
+                # can round a second off the sampler's, and samples are intervals apart
+                frame_stream = _skip_frames_before(frames, resume_from - frame_interval / 2
+                                                   if resume_from is not None else math.inf)
+        print(f"(~{expected_frames} frames)")
+        # Stop decoding and describing if the audio branch fails
+        frame_stream = _until_set(abort, frame_stream)
+        progress.update('frames', 'Analyzing frames...', frames_seen / max(expected_frames, 1))
+        
+        # Describe each frame, folding runs of near-identical frames into one vision call
+        frame_groups = fold_duplicate_frames(frame_stream, args.dedupe_threshold, scene_cuts)
+        if not args.no_cache:
+            try:
+                cache = DescriptionCache(args.cache)
+            except Exception as e:
+                print(f"  [Warning] Description cache unavailable ({e}); describing every frame")
+        if args.concurrency > 1:
+            print(f"  Analyzing frames with GPT-5-nano ({args.concurrency} concurrent, {args.rpm:.0f} RPM / {args.tpm:.0f} TPM)...")
+            
+            def on_described(timestamp, desc, covered, ok):
+                nonlocal frames_seen, groups_described
+                frames_seen += len(covered)
+                groups_described += 1
+                if checkpoint and ok and not desc.startswith('['):
+                    checkpoint.record_frame(timestamp, desc, covered, timestamp in scene_cuts)
+                progress.update('frames', 'Analyzing frames...', frames_seen / max(expected_frames, 1))
+                if groups_described % 10 == 0:
+                    print(f"    {frames_seen}/~{expected_frames} frames described", flush=True)
+            
+            described = asyncio.run(describe_frames_concurrently(
+                frame_groups, api_key, args.concurrency, args.rpm, args.tpm,
+                on_result=on_described, batch_size=args.batch_size, cache=cache))
+            # Results come back in time order; every timestamp in a folded run gets the run's description
+            for timestamp, desc, covered in described:
+                for ts in covered:
+                    descriptions.append((ts, desc))
+                    all_descriptions.append((ts, desc))
+            frame_groups = []
+        else:
+            print(f"  Analyzing frames with GPT-5-nano...")
+        batch = []
+        batch_number = 0
+        for group in itertools.chain(frame_groups, [None]):
+            if group is not None:
+                batch.append(group)
+                if len(batch) < args.batch_size:
+                    continue
+            if not batch:
+                break
+            # Delay between calls (not before the first one)
+            if batch_number > 0:
+                time.sleep(REQUEST_DELAY)
+            progress.update('frames', 'Analyzing frames...', frames_seen / max(expected_frames, 1))
+            if batch_number % 10 == 0:  # Print every 10th request
+                print(f"    Frame {frames_seen + 1}/~{expected_frames} (at {batch[0][0]}s)...", end=' ', flush=True)
+            try:
+                descs = describe_frames_batch(client, [(ts, frame_bytes) for ts, frame_bytes, _ in batch], cache)
+                if batch_number % 10 == 0:
+                    print("done")
+            except Exception as e:
+                if batch_number % 10 == 0:
+                    print(f"failed: {e}")
+                descs = ["[Could not analyze]"] * len(batch)
+            for (timestamp, _, covered), desc in zip(batch, descs):
+                groups_described += 1
+                if checkpoint and not desc.startswith('['):
+                    checkpoint.record_frame(timestamp, desc, covered, timestamp in scene_cuts)
+                # Every timestamp in a folded run gets the run's description
+                for ts in covered:
+                    descriptions.append((ts, desc))
+                    all_descriptions.append((ts, desc))
+                frames_seen += len(covered)
+            batch = []
+            batch_number += 1
+        
+        if abort.is_set():
+            raise RuntimeError("Stopped after another stage failed")
+        if not descriptions:
+            raise RuntimeError("No frames extracted from video")
+        if checkpoint and not checkpoint.frames_done:
+            checkpoint.record_frames_done()
+        progress.finish('frames')
+    
+    def frames_stage(demuxed=None):
+        with stage_slot('frames', on_wait=lambda: progress.update('frames', 'Waiting to analyze frames...', 0)):
+            describe_stage(demuxed)
+    
+    if checkpoint and checkpoint.transcript is not None:
+        print(f"  Using {len(checkpoint.transcript)} dialogue segments from the checkpoint")
+        progress.finish('audio')
+        stages = {'transcript': (lambda: checkpoint.transcript, []), 'frames': (frames_stage, [])}
+    elif args.frame_backend == "ffmpeg" and not (checkpoint and checkpoint.frames_done):
+        # One demux for both audio and frames
+        stages = {'demux': (demux_stage, []),
+                  'transcript': (transcribe_stage, ['demux']),
+                  'frames': (frames_stage, ['demux'])}
+    else:
+        stages = {'audio': (load_audio_stage, []),
+                  'transcript': (transcribe_stage, ['audio']),
+                  'frames': (frames_stage, [])}
+    
+    try:
+        transcription = run_stage_graph(stages, abort, stage_timings)['transcript']
+    except StageError as e:
+        record_timings()
+        if e.stage == 'frames':
+            raise e.error
+        error_msg = f"Audio processing failed: {e.error}"
         print(f"\n❌ Error: {error_msg}")
         import traceback
-        traceback.print_exc()
+        traceback.print_exception(e.error)
         print("\n  Troubleshooting:")
         print("    - Ensure FFmpeg is installed: brew install ffmpeg")
         print("    - Ensure Whisper is installed: pip install openai-whisper")
         print("    - Check video file is valid and not corrupted")
         update_progress(f'Error: {error_msg}', 0, 0)
         sys.exit(1)
-    finally:
-        # Clean up temporary audio file
-        if audio_path and os.path.exists(audio_path):
-            try:
-                os.remove(audio_path)
-            except:
-                pass
-    
+    record_timings()
     print("-" * 60)
     
-    all_descriptions = []
-    
-    # Extract frames for entire video
-    print(f"\n[Processing Video] Extracting frames...", end=' ', flush=True)
-    frames = extract_frames_for_chunk(args.video_path, 0, duration, fps, frame_interval)
-    print(f"got {len(frames)} frames")
-    
-    if not frames:
-        raise RuntimeError("No frames extracted from video")
+    # Requests the batches would have taken had every sampled frame been sent, less
+    # the batches the folded frames actually took
+    frames_folded = len(descriptions) - resumed_frames - groups_described
+    calls_saved = (math.ceil((groups_described + frames_folded) / args.batch_size)
+                   - math.ceil(groups_described / args.batch_size))
+    if cache is not None:
+        cache_stats = cache.stats()
+        cache.close()
+        print(f"  Description cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['entries']} entries; lifetime {cache_stats['total_hits']} hits / {cache_stats['total_misses']} misses)")
+    print(f"  Described {len(descriptions)} frames ({VISION_PAYLOAD_STATS['images']} sent to the vision model "
+          f"in {VISION_PAYLOAD_STATS['requests']} requests, up to {args.batch_size} per request)")
+    if frames_folded:
+        print(f"  Duplicate-frame suppression: {frames_folded} frames folded into a neighbour, {calls_saved} API calls saved")
+    if VISION_PAYLOAD_STATS['images']:
+        images = VISION_PAYLOAD_STATS['images']
+        print(f"  Vision payload: {VISION_PAYLOAD_STATS['bytes'] / 1024 / 1024:.2f} MB uploaded, "
+              f"{VISION_PAYLOAD_STATS['bytes'] / images / 1024:.1f} KB and ~{VISION_PAYLOAD_STATS['image_tokens'] / images:.0f} image tokens per frame "
+              f"(max edge {VISION_MAX_EDGE or 'native'}, quality {VISION_JPEG_QUALITY}, detail {VISION_IMAGE_DETAIL})")
     
-    # Describe each frame
-    print(f"  Analyzing {len(frames)} frames with GPT-5-nano...")
-    descriptions = []
-    for i, (timestamp, frame_bytes) in enumerate(frames):
-        frame_progress = 30 + (i / len(frames)) * 50
-        update_progress('Analyzing frames...', int(frame_progress), 2)
-        if i % 10 == 0 or i == len(frames) - 1:  # Print every 10th frame
-            print(f"    Frame {i+1}/{len(frames)} (at {timestamp}s)...", end=' ', flush=True)
-        try:
-            desc = describe_frame(client, frame_bytes, timestamp)
-            descriptions.append((timestamp, desc))
-            all_descriptions.append((timestamp, desc))
-            if i % 10 == 0 or i == len(frames) - 1:
-                print("done")
-        except Exception as e:
-            if i % 10 == 0 or i == len(frames) - 1:
-                print(f"failed: {e}")
-            descriptions.append((timestamp, "[Could not analyze]"))
-            all_descriptions.append((timestamp, "[Could not analyze]"))
-        
-        # Only delay if not the last frame
-        if i < len(frames) - 1:
-            time.sleep(REQUEST_DELAY)
+    # Index descriptions and dialogue by time for the chunk planner and per-chunk lookups,
+    # compacted first: runs of near-identical snapshots become one spanned line and
+    # repeated dialogue collapses, so the same frames make smaller prompts
+    if args.compact_similarity > 0:
+        timeline = Timeline(compact_descriptions(descriptions, args.compact_similarity),
+                            compact_dialogue(transcription or []))
+    else:
+        timeline = Timeline(descriptions, transcription or [])
+    prompt_tokens_before = (sum(count_tokens(format_snapshot(item)) for item in descriptions)
+                            + sum(count_tokens(f"- {text}") for _, _, text in transcription or []))
+    prompt_tokens_after = (sum(count_tokens(format_snapshot(item)) for item in timeline.snapshots)
+                           + sum(count_tokens(f"- {text}") for text in timeline.lines))
+    if args.compact_similarity > 0:
+        print(f"  Prompt compaction: {len(descriptions)} snapshots -> {len(timeline.texts)} lines, "
+              f"{len(transcription or [])} dialogue segments -> {len(timeline.lines)}, "
+              f"~{prompt_tokens_before - prompt_tokens_after} of {prompt_tokens_before} tokens saved")
     
     # Get dialogue for entire video
     video_dialogue = []
     if transcription:
-        video_dialogue = get_dialogue_for_time_range(transcription, 0, duration)
+        video_dialogue = get_dialogue_for_time_range(timeline, 0, duration)
         if video_dialogue:
             print(f"  Found {len(video_dialogue)} dialogue segments")
     
-    # Create narrative: use chunked flow for long videos (> CHUNK_DURATION) so we don't hang at 80%
+    # Create narrative: chunks are planned by prompt tokens so each call stays a predictable size
+    # The narrative is the last stage, so its slot is held until the output is written
+    narrative_slot = contextlib.ExitStack()
+    narrative_slot.enter_context(stage_slot(
+        'narrative', on_wait=lambda: update_progress('Waiting to write the narrative...', 80, 3)))
     update_progress('Creating narrative...', 80, 3)
+    narrative_started = time.perf_counter()
+    partial = None
+    if not args.no_stream:
+        partial = PartialNarrative(os.path.join(output_dir, Path(output_path).stem + '_partial.txt'))
     try:
         if not descriptions:
             raise ValueError("No frame descriptions available")
-        if duration > CHUNK_DURATION:
-            # Chunked flow: split by time, narrative per chunk, then combine (avoids huge single prompt and timeout)
-            num_chunks = max(1, int(math.ceil(duration / CHUNK_DURATION)))
-            chunk_narratives = []
-            for c in range(num_chunks):
-                chunk_start = c * CHUNK_DURATION
-                chunk_end = min((c + 1) * CHUNK_DURATION, duration)
-                chunk_descs = [(ts, desc) for ts, desc in descriptions if chunk_start <= ts < chunk_end]
+        if checkpoint and checkpoint.plan is not None:
+            chunks = checkpoint.plan
+        else:
+            chunks = plan_narrative_chunks(timeline, duration, scene_cuts, args.chunk_tokens)
+            if checkpoint:
+                checkpoint.record_plan(chunks)
+        if len(chunks) > 1:
+            # Chunked flow: narrative per chunk, then combine (avoids huge single prompt and timeout)
+            num_chunks = len(chunks)
+            print(f"  Planned {num_chunks} narrative chunks (~{args.chunk_tokens} prompt tokens each, "
+                  f"{len(scene_cuts)} scene cuts detected)")
+            chunk_inputs = []
+            chunk_ranges = []
+            chunk_ids = []  # Index in the plan, which is what the checkpoint records
+            for plan_index, (chunk_start, chunk_end) in enumerate(chunks):
+                chunk_descs = timeline.snapshots_between(chunk_start, chunk_end)
                 if not chunk_descs:
                     continue
-                # Cap descriptions per chunk so prompt stays small and API returns (avoids stuck at 82%)
-                if len(chunk_descs) > MAX_DESCRIPTIONS_PER_CHUNK:
-                    step = len(chunk_descs) / MAX_DESCRIPTIONS_PER_CHUNK
-                    indices = [int(i * step) for i in range(MAX_DESCRIPTIONS_PER_CHUNK)]
-                    chunk_descs = [chunk_descs[i] for i in indices]
-                chunk_dialogue = get_dialogue_for_time_range(transcription or [], chunk_start, chunk_end)
-                prog = 80 + int((c + 1) / num_chunks * 10)
-                update_progress(f'Creating narrative (part {c + 1}/{num_chunks})...', prog, 3)
-                print(f"  Chunk {c + 1}/{num_chunks} ({chunk_start:.0f}s–{chunk_end:.0f}s, {len(chunk_descs)} frames)...", end=' ', flush=True)
-                nar = create_chunk_narrative(client, chunk_descs, c + 1, chunk_dialogue)
-                chunk_narratives.append(nar)
-                print("done")
-            if not chunk_narratives:
+                chunk_dialogue = get_dialogue_for_time_range(timeline, chunk_start, chunk_end)
+                chunk_inputs.append((chunk_descs, chunk_dialogue))
+                chunk_ranges.append((chunk_start, chunk_end))
+                chunk_ids.append(plan_index)
+            if not chunk_inputs:
                 raise ValueError("No chunk narratives generated")
-            update_progress('Combining narrative...', 92, 3)
-            print(f"  Combining {len(chunk_narratives)} parts...", end=' ', flush=True)
-            final_narrative = combine_narratives(client, chunk_narratives)
-            print("done")
+            
+            num_chunks = len(chunk_inputs)
+            done_chunks = checkpoint.chunks if checkpoint else {}
+            pending = [i for i in range(num_chunks) if chunk_ids[i] not in done_chunks]
+            finished_before = num_chunks - len(pending)
+            update_progress(f'Creating narrative ({finished_before}/{num_chunks} parts)...',
+                            80 + int(finished_before / num_chunks * 10), 3,
+                            {'current': finished_before, 'total': num_chunks})
+            if finished_before:
+                print(f"  Reusing {finished_before} chunk narratives from the checkpoint")
+            print(f"  Writing {len(pending)} chunk narratives ({args.narrative_concurrency} at a time)...")
+            
+            def on_chunk_done(pending_index, narrative, finished):
+                index = pending[pending_index]
+                chunk_start, chunk_end = chunk_ranges[index]
+                if checkpoint:
+                    checkpoint.record_chunk(chunk_ids[index], narrative)
+                print(f"  Chunk {index + 1}/{num_chunks} ({chunk_start:.0f}s–{chunk_end:.0f}s, "
+                      f"{len(chunk_inputs[index][0])} snapshot lines) done", flush=True)
+                finished += finished_before
+                update_progress(f'Creating narrative ({finished}/{num_chunks} parts)...',
+                                80 + int(finished / num_chunks * 10), 3,
+                                {'current': finished, 'total': num_chunks})
+            
+            written = create_chunk_narratives(client, [chunk_inputs[i] for i in pending],
+                                              args.narrative_concurrency, on_done=on_chunk_done)
+            written = dict(zip(pending, written))
+            chunk_narratives = [written[i] if i in written else done_chunks[chunk_ids[i]]
+                                for i in range(num_chunks)]
+            
+            def on_combine_level(level, parts_in, parts_out):
+                update_progress('Combining narrative...', min(94, 91 + level), 3)
+                print(f"  Combining level {level}: {parts_in} parts -> {parts_out}", flush=True)
+            
+            final_narrative = reduce_narratives(client, chunk_narratives, args.combine_group_size,
+                                                args.narrative_concurrency, on_level=on_combine_level,
+                                                partial=partial)
+            print("  Combining done")
         else:
             print(f"  Creating narrative...", end=' ', flush=True)
-            final_narrative = create_final_narrative(client, descriptions, video_dialogue)
+            final_narrative = create_final_narrative(client, timeline.snapshots, video_dialogue, partial)
             print("done")
         if not final_narrative or len(final_narrative.strip()) < 50:
             raise ValueError("Generated narrative is empty or too short")
@@ -817,7 +3268,14 @@ def main():
         print(f"failed: {error_msg}")
         import traceback
         traceback.print_exc()
+        if partial is not None:
+            # Keep whatever was streamed so far - the API can still serve it
+            partial.close()
         raise RuntimeError(f"Failed to generate narrative: {error_msg}")
+    finally:
+        stage_timings['narrative'] = round(time.perf_counter() - narrative_started, 2)
+        stage_timings['total'] = round(time.perf_counter() - run_started, 2)
+        record_timings()
     
     update_progress('Almost done...', 95, 4)
     
@@ -832,6 +3290,11 @@ def main():
             f.write("\n")
         
         print("  Output file written successfully")
+        narrative_slot.close()
+        if checkpoint:
+            checkpoint.discard()
+        if partial is not None:
+            partial.discard()
     except Exception as e:
         print(f"  ERROR writing output file: {e}")
         raise
@@ -840,8 +3303,22 @@ def main():
     print(f"\n{'='*60}")
     print(f"✅ Complete! Narrative saved to: {output_path}")
     print(f"Total frames analyzed: {len(all_descriptions)}")
+    if calls_saved:
+        print(f"Vision calls saved by duplicate-frame suppression: {calls_saved}")
     if transcription:
         print(f"Dialogue segments: {len(transcription)}")
+    if prompt_tokens_after < prompt_tokens_before:
+        print(f"Prompt tokens saved by compaction: ~{prompt_tokens_before - prompt_tokens_after} "
+              f"({1 - prompt_tokens_after / prompt_tokens_before:.0%})")
+    if TRANSCRIBE_STATS['audio_seconds']:
+        skipped = TRANSCRIBE_STATS['audio_seconds'] - TRANSCRIBE_STATS['speech_seconds']
+        print(f"Audio skipped by speech detection: {skipped / TRANSCRIBE_STATS['audio_seconds']:.0%} "
+              f"({skipped:.0f}s of {TRANSCRIBE_STATS['audio_seconds']:.0f}s)")
+    if RETRY_STATS['retries'] or RETRY_STATS['breaker_wait_seconds']:
+        print(f"API retries: {RETRY_STATS['retries']} ({RETRY_STATS['retry_wait_seconds']:.1f}s backing off, "
+              f"{RETRY_STATS['breaker_wait_seconds']:.1f}s paused by the circuit breaker, "
+              f"{RETRY_STATS['breaker_trips']} trips)")
+    print("Stage times: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in stage_timings.items()))
     print("Done!")
     
     # Update progress to completed status (lowercase for consistency)